@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import aiohttp
+
+import model
+import server
+import utils
+from model import State
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+async def shutdown(broker_disconnect: bool = True) -> None:
+    pass
+
+
+def serve(application: str, pydantic: bool) -> None:
+    """
+    Serve one Stopped node with one Stopped child by selected application
+
+    :param application: fastapi or asgi
+    :param pydantic: whether requests are validated
+    :return: None
+    """
+    server.configuration['REST']['server'] = application
+    server.configuration['REST']['pydantic'] = pydantic
+    server.configuration['node']['time']['get'] = 0
+    node = model.Node('2')
+    node.state = State.Stopped
+    node.children = {'2.1': (State.Stopped, 0)}
+    server.run(node, shutdown=shutdown)
+
+
+def get_url(path: str) -> str:
+    """
+    Full URL of the endpoint of the benchmarked node
+
+    :param path: endpoint path
+    :return: URL
+    """
+    return configuration['URL']['protocol'] + configuration['URL']['address'] + ':' + \
+        str(model.Node('2').address.get_port()) + path
+
+
+async def send_requests(session: aiohttp.ClientSession, endpoint: str, pydantic: bool, deadline: float) -> int:
+    """
+    Send requests one after another until the deadline, notification does not change the state of the node
+
+    :param session: client session
+    :param endpoint: notification or get_state
+    :param pydantic: whether the attributes are sent in json body or as query parameters
+    :param deadline: time when no more requests are sent
+    :return: number of successful requests
+    """
+    url = get_url(configuration['URL'][endpoint])
+    params = {'state': 'State.Stopped', 'sender': '2.1'}
+    successful = 0
+    while time.perf_counter() < deadline:
+        if endpoint == 'get_state':
+            request = session.get(url)
+        elif pydantic:
+            request = session.post(url, json=params)
+        else:
+            request = session.post(url, params=params)
+        async with request as response:
+            await response.read()
+            successful += response.status == 200
+    return successful
+
+
+async def measure(endpoint: str, pydantic: bool, concurrency: int, duration: float) -> float:
+    """
+    Measure requests per second of the endpoint
+
+    :param endpoint: notification or get_state
+    :param pydantic: whether requests are validated
+    :param concurrency: number of requests sent at the same time
+    :param duration: seconds of sending
+    :return: requests per second
+    """
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        start = time.perf_counter()
+        counts = await asyncio.gather(*[send_requests(session, endpoint, pydantic, start + duration)
+                                        for _ in range(concurrency)])
+        return sum(counts) / (time.perf_counter() - start)
+
+
+async def wait_for_server() -> None:
+    """
+    Wait until the server accepts requests
+
+    :return: None
+    """
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(get_url(configuration['URL']['statistics'])) as response:
+                    await response.read()
+                    return
+            except aiohttp.ClientConnectorError:
+                await asyncio.sleep(0.1)
+
+
+def run_measurement(application: str, pydantic: bool, endpoint: str, concurrency: int, duration: float) -> float:
+    """
+    Start the server in separate process and measure requests per second of the endpoint
+
+    :param application: fastapi or asgi
+    :param pydantic: whether requests are validated
+    :param endpoint: notification or get_state
+    :param concurrency: number of requests sent at the same time
+    :param duration: seconds of sending
+    :return: requests per second
+    """
+    process = multiprocessing.Process(target=serve, args=(application, pydantic))
+    process.start()
+    try:
+        asyncio.run(wait_for_server())
+        return asyncio.run(measure(endpoint, pydantic, concurrency, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python asgi_benchmark.py --concurrency 50 --duration 5`
+
+    :return: object having 2 attributes:
+        -concurrency: number of requests sent at the same time
+        -duration: seconds of sending for each measurement
+    """
+    parser = argparse.ArgumentParser(description='Measure requests per second of FastAPI and raw ASGI application.')
+    parser.add_argument('--concurrency', dest='concurrency', action='store', type=int, default=50,
+                        help='number of requests sent at the same time')
+    parser.add_argument('--duration', dest='duration', action='store', type=float, default=5,
+                        help='seconds of sending for each measurement')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    server.configuration['debug'] = False
+    model.configuration['debug'] = False
+    print('| Endpoint     | FastAPI, pydantic [req/s] | FastAPI, no validation [req/s] | ASGI, validation [req/s] | '
+          'Speedup |')
+    print('|--------------|--------------------------:|-------------------------------:|-------------------------:|'
+          '--------:|')
+    for endpoint in ['notification', 'get_state']:
+        fastapi = run_measurement('fastapi', True, endpoint, arguments.concurrency, arguments.duration)
+        unvalidated = run_measurement('fastapi', False, endpoint, arguments.concurrency, arguments.duration)
+        asgi = run_measurement('asgi', True, endpoint, arguments.concurrency, arguments.duration)
+        print('| %-12s | %25.1f | %30.1f | %24.1f | %6.1fx |' % (endpoint, fastapi, unvalidated, asgi, asgi / fastapi))
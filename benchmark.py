@@ -0,0 +1,100 @@
+import argparse
+import time
+
+import model
+import utils
+from model import State
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+def rescan_state(children: dict[str, (State, float)]) -> State:
+    """
+    Original aggregation recounting states of all children on every notification
+
+    :param children: children of the node with their states
+    :return: aggregated state
+    """
+    initialisation: int = 0
+    stopped: int = 0
+    starting: int = 0
+    running: int = 0
+    error: int = 0
+    for child_id in children:
+        child_status = children[child_id][0]
+        if not child_status or child_status == State.Initialisation:
+            initialisation += 1
+        elif child_status == State.Stopped:
+            stopped += 1
+        elif child_status == State.Starting:
+            starting += 1
+        elif child_status == State.Running:
+            running += 1
+        elif child_status == State.Error:
+            error += 1
+    if error:
+        return State.Error
+    elif initialisation:
+        return State.Initialisation
+    elif stopped:
+        return State.Stopped
+    elif starting:
+        return State.Starting
+    return State.Running
+
+
+def measure_rescan(children: int) -> float:
+    """
+    Measure one transition of the parent (Initialisation -> Stopped) aggregated by scanning all children
+
+    :param children: number of children
+    :return: duration in seconds
+    """
+    states = {utils.get_child_id('2', i + 1): (State.Initialisation, 0) for i in range(children)}
+    start = time.perf_counter()
+    for child_id in states:
+        states[child_id] = (State.Stopped, 1)
+        rescan_state(states)
+    return time.perf_counter() - start
+
+
+def measure_counters(children: int) -> float:
+    """
+    Measure one transition of the parent (Initialisation -> Stopped) using Node.update_state with incremental counters
+
+    :param children: number of children
+    :return: duration in seconds
+    """
+    model.Node.depth = 1
+    model.Node.arity = children
+    node = model.Node('2')
+    model.Node.depth = 0
+    model.Node.arity = 0
+    start = time.perf_counter()
+    for child_id in node.children:
+        node.children[child_id] = (State.Stopped, 1)
+        node.update_state()
+    return time.perf_counter() - start
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python benchmark.py --children 10 100 1000 10000`
+
+    :return: object having 1 attribute:
+        -children: list of numbers of children of the measured node
+    """
+    parser = argparse.ArgumentParser(description='Measure aggregation of children states.')
+    parser.add_argument('--children', dest='children', action='store', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000], help='numbers of children of the measured node')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    print('| Children | Rescan [s] | Counters [s] | Speedup |')
+    print('|---------:|-----------:|-------------:|--------:|')
+    for fan_out in parse_input_arguments().children:
+        rescan = measure_rescan(fan_out)
+        counters = measure_counters(fan_out)
+        print('| %8d | %10.5f | %12.5f | %6.0fx |' % (fan_out, rescan, counters, rescan / counters))
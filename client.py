@@ -1,13 +1,82 @@
 import asyncio
+import collections
+import json
+import random
 import time
+from typing import Awaitable, Callable
 
 import aiohttp
 from aiohttp import ClientConnectorError
 
+import records
 from utils import get_configuration
 
 configuration: dict[str, str | dict] = get_configuration()
 
+# aiohttp applies no timeout at all when the total is not positive
+MINIMAL_TIMEOUT = 0.001
+
+session: aiohttp.ClientSession | None = None
+session_loop: asyncio.AbstractEventLoop | None = None
+# closing of sessions left by previous loops
+closing: set[asyncio.Task] = set()
+# counters of sent requests exposed for monitoring
+statistics: collections.Counter[str] = collections.Counter()
+# open streams to parents and children (REST.stream) by the node address, requests are sent as frames over them
+streams: dict[str, Callable[[str], Awaitable[None]]] = dict()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Get HTTP session shared by all requests of this process, connections to other nodes are kept alive and reused.
+    Session of the previous loop is closed once the running loop changes.
+
+    :return: shared session bound to the running loop
+    """
+    global session, session_loop
+    loop = asyncio.get_running_loop()
+    if session is None or session.closed or session_loop is not loop:
+        if session is not None and not session.closed:
+            close_stale_session(session, session_loop)
+        headers = {'content-type': 'application/json'} if configuration['REST']['pydantic'] else {}
+        connector = aiohttp.TCPConnector(limit=configuration['REST']['connections']['limit'],
+                                         limit_per_host=configuration['REST']['connections']['per_host'],
+                                         keepalive_timeout=configuration['REST']['connections']['keepalive'],
+                                         ttl_dns_cache=None)
+        session = aiohttp.ClientSession(headers=headers, connector=connector)
+        session_loop = loop
+    return session
+
+
+def close_stale_session(stale_session: aiohttp.ClientSession, stale_loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Close session bound to another loop, together with its kept alive connections. Session of the loop running in
+    other thread is closed by its loop, otherwise it is closed by the running loop.
+
+    :param stale_session: open session of the previous loop
+    :param stale_loop: loop the session was created in
+    :return: None
+    """
+    if stale_loop.is_running():
+        asyncio.run_coroutine_threadsafe(stale_session.close(), stale_loop)
+        return
+    task = asyncio.create_task(stale_session.close())
+    closing.add(task)
+    task.add_done_callback(closing.discard)
+
+
+async def close_session() -> None:
+    """
+    Close shared HTTP session together with all kept alive connections
+
+    :return: None
+    """
+    global session
+    streams.clear()
+    if session and not session.closed:
+        await session.close()
+    session = None
+
 
 async def post_start(chance_to_fail: str, address: str) -> None:
     """
@@ -19,7 +88,8 @@ async def post_start(chance_to_fail: str, address: str) -> None:
     """
     endpoint = address + configuration['URL']['change_state']
     params = {'start': chance_to_fail}
-    await request_node(endpoint, params)
+    if not await push(address, configuration['URL']['change_state'], params):
+        await request_node(endpoint, params)
 
 
 async def post_stop(address: str) -> None:
@@ -31,52 +101,212 @@ async def post_stop(address: str) -> None:
     """
     params = {'stop': '_'}
     endpoint = address + configuration['URL']['change_state']
-    await request_node(endpoint, params)
+    if not await push(address, configuration['URL']['change_state'], params):
+        await request_node(endpoint, params)
 
 
-async def post_notification(address: str, state: str, sender_address: str) -> None:
+async def post_notification(address: str, state: str, sender_id: str) -> None:
     """
 
     :param address: to which node is notification going
     :param state: node state
-    :param sender_address: from which node is notification coming from
+    :param sender_id: id of the node which is notification coming from
     :return: None
     """
 
     if address:
-        params = {'state': state, 'sender': sender_address, 'time_stamp': time.time()}
+        params = {'state': state, 'sender': sender_id, 'time_stamp': time.time()}
         endpoint = address + configuration['URL']['notification']
+        if not await push(address, configuration['URL']['notification'], params):
+            await request_node(endpoint, params)
+
+
+async def post_notifications(address: str, notifications: list[records.Notification]) -> None:
+    """
+    Sends current states of several children to their parent in one request
+
+    :param address: to which node are notifications going
+    :param notifications: current state, sender id and time stamp of every child
+    :return: None
+    """
+    if address:
+        values = {'notifications': [{'state': notification.state, 'sender': notification.sender,
+                                     'time_stamp': notification.time_stamp} for notification in notifications]}
+        if await push(address, configuration['URL']['notification_batch'], values):
+            return
+        if configuration['REST']['pydantic']:
+            params = values
+        else:
+            # repeated query parameters, i-th values belong to the same child
+            params = [(name, str(value)) for notification in notifications for name, value in
+                      [('state', notification.state), ('sender', notification.sender),
+                       ('time_stamp', notification.time_stamp)]]
+        endpoint = address + configuration['URL']['notification_batch']
         await request_node(endpoint, params)
 
 
+async def push(address: str, path: str, values: dict) -> bool:
+    """
+    Send the request as one frame of the open stream to the node instead of new HTTP request
+
+    :param address: node address
+    :param path: endpoint of the equivalent request
+    :param values: attributes of the request in json form
+    :return: True if the frame was sent, False if there is no open stream to the node
+    """
+    send_frame = streams.get(address)
+    if not send_frame:
+        return False
+    try:
+        await send_frame(json.dumps({'path': path, 'values': values}, separators=(',', ':')))
+    except Exception:
+        # the stream is lost, requests are used from now on
+        if streams.get(address) == send_frame:
+            del streams[address]
+        return False
+    statistics['streamed'] += 1
+    return True
+
+
+async def open_stream(address: str, sender_id: str,
+                      receive_frame: Callable[[dict], Awaitable[None]]) -> asyncio.Task | None:
+    """
+    Open persistent stream (WebSocket) from the node to its parent, the parent sends commands to the node and the node
+    sends notifications to the parent as frames over it. Refused connection is retried with jittered exponential backoff
+    until REST.timeout deadline.
+
+    :param address: parent address
+    :param sender_id: id of the node opening the stream
+    :param receive_frame: processes every frame received from the parent
+    :return: task reading frames from the parent, None if the stream cannot be opened (requests are used instead)
+    """
+    attempts = 0
+    url = configuration['URL']['protocol'].replace('http', 'ws', 1) + address + configuration['URL']['stream']
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + configuration['REST']['timeout']
+    while True:
+        try:
+            connection = await get_session().ws_connect(url)
+            break
+        except ClientConnectorError:
+            statistics['refused'] += 1
+        except aiohttp.ClientError:
+            # e.g. server without WebSocket support
+            print('Stream to ' + url + ' cannot be opened, requests are used instead')
+            return None
+        delay = get_backoff(attempts, True)
+        if loop.time() + delay > deadline:
+            print('Stream to ' + url + ' cannot be opened, requests are used instead')
+            return None
+        await asyncio.sleep(delay)
+        attempts += 1
+    await connection.send_str(json.dumps({'sender': sender_id}))
+    streams[address] = connection.send_str
+    return asyncio.create_task(read_stream(address, connection, receive_frame))
+
+
+async def read_stream(address: str, connection: aiohttp.ClientWebSocketResponse,
+                      receive_frame: Callable[[dict], Awaitable[None]]) -> None:
+    """
+    Process frames received from the parent in the order they were sent until the stream is closed
+
+    :param address: parent address
+    :param connection: open stream
+    :param receive_frame: processes every received frame
+    :return: None
+    """
+    try:
+        async for frame in connection:
+            if frame.type == aiohttp.WSMsgType.TEXT:
+                await receive_frame(json.loads(frame.data))
+    finally:
+        if streams.get(address) == connection.send_str:
+            del streams[address]
+        await connection.close()
+
+
+async def get_snapshot(address: str) -> dict[str, str]:
+    """
+    Sends asynchronous get request to the specific node for states of all nodes in its subtree
+
+    :param address: node address
+    :return: state of every node in the subtree, empty if the node did not reply in REST.timeout
+    """
+    url = configuration['URL']['protocol'] + address + configuration['URL']['snapshot']
+    timeout = aiohttp.ClientTimeout(total=configuration['REST']['timeout'])
+    try:
+        async with get_session().get(url, timeout=timeout) as response:
+            if response.status == 200:
+                return await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        if configuration['debug']:
+            print('Snapshot of ' + url + ' is not available')
+    return dict()
+
+
+def get_backoff(attempt: int, refused: bool) -> float:
+    """
+    Compute jittered exponential delay before next attempt
+
+    :param attempt: number of already failed attempts
+    :param refused: whether the node refused the connection (server is not running yet)
+    :return: delay in seconds
+    """
+    retry = configuration['REST']['retry']
+    initial = retry['initial'] if refused else retry['initial'] * retry['multiplier']
+    delay = min(retry['maximum'], initial * retry['multiplier'] ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
 async def request_node(endpoint, params) -> None:
     """
-    General HTTP post request to specific node with parameters
+    General HTTP post request to specific node with parameters, failed requests are retried with jittered exponential
+    backoff until REST.timeout deadline, requests rejected by the node (4xx) are not retried
+
     :param endpoint: node address, port and path
     :param params: attributes
     :return: None
     """
     attempts = 0
     url = configuration['URL']['protocol'] + endpoint
-    headers = {'content-type': 'application/json'} if configuration['REST']['pydantic'] else {}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        while True:
-            if attempts > configuration['REST']['timeout']:
-                if configuration['debug']:
-                    print(str(params) + ' - message cannot be delivered to ' + url)
-                return
-            try:
-                def validated_post():
-                    return session.post(url, json=params)
-
-                def raw_post():
-                    return session.post(url, params=params)
-
-                async with validated_post() if configuration['REST']['pydantic'] else raw_post() as request:
-                    if request.status == 200:
-                        return
-                    else:
-                        raise Exception("Server didn't responded as expected")
-            except (ClientConnectorError, Exception):
-                await asyncio.sleep(1)
-                attempts += 1
+    shared_session = get_session()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + configuration['REST']['timeout']
+    statistics['requests'] += 1
+    while True:
+        refused = False
+        # single request must not outlive the deadline, aiohttp would wait for the reply up to 5 minutes otherwise
+        timeout = aiohttp.ClientTimeout(total=max(deadline - loop.time(), MINIMAL_TIMEOUT))
+        try:
+            def validated_post():
+                return shared_session.post(url, json=params, timeout=timeout)
+
+            def raw_post():
+                return shared_session.post(url, params=params, timeout=timeout)
+
+            async with validated_post() if configuration['REST']['pydantic'] else raw_post() as request:
+                if request.status == 200:
+                    statistics['delivered'] += 1
+                    return
+                if 400 <= request.status < 500:
+                    statistics['rejected'] += 1
+                    if configuration['debug']:
+                        print(str(params) + ' - message rejected with ' + str(request.status) + ' by ' + url)
+                    return
+                raise Exception("Server didn't responded as expected")
+        except ClientConnectorError:
+            statistics['refused'] += 1
+            refused = True
+        except asyncio.TimeoutError:
+            statistics['timeouts'] += 1
+        except Exception:
+            statistics['errors'] += 1
+        delay = get_backoff(attempts, refused)
+        if loop.time() + delay > deadline:
+            statistics['expired'] += 1
+            if configuration['debug']:
+                print(str(params) + ' - message cannot be delivered to ' + url)
+            return
+        statistics['retries'] += 1
+        await asyncio.sleep(delay)
+        attempts += 1
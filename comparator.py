@@ -1,79 +1,60 @@
 import asyncio
-import json
 import os
 import threading
 import time
 
 import requests
 
+import launcher
 import model
 import send
 import utils
-from rpc_client import StateRpcClient
 
 configuration: dict[str, str | dict[str, int | str | dict]] = utils.get_configuration()
 
-NODE_ROUTING_KEY = '2.0.0.0.0'
+NODE_ID = '2'
+NODE_ROUTING_KEY = NODE_ID
 NODE_PORT = '20000'
 loop = asyncio.new_event_loop()
 
 
-def measurement_runner(depth: int, children: int):
+def measurement_runner(depth: int, children: int, ready: str):
     """
     Start service int the background
 
     :param depth: number of levels in the tree
     :param children: number of children per node
+    :param ready: readiness barrier socket
     :return: None
     """
-    os.system('python service.py --levels ' + str(depth) + ' --children ' + str(children))
+    os.system('python service.py --levels ' + str(depth) + ' --children ' + str(children) + ' --ready ' + ready)
 
 
-def wait_until_node_is_ready(architecture: str) -> None:
+def wait_until_node_is_ready(barrier: launcher.ReadinessBarrier, depth: int, children: int) -> None:
     """
-    Busy wait until node tree structure is ready
+    Wait until all nodes of the tree reported being ready to the readiness barrier
 
-    :param architecture: MOM or REST
+    :param barrier: readiness barrier passed to the started tree
+    :param depth: number of levels in the tree
+    :param children: number of children per node
     :return: None
     """
-    if architecture == 'REST':
-        code = 0
-        state = 'State.Initialisation'
-        while code != 200 or state != 'State.Stopped':
-            try:
-                time.sleep(1)
-                url = 'http://127.0.0.1:' + NODE_PORT + configuration['URL']['get_state']
-                response = requests.get(url)
-                code = response.status_code
-                data = json.loads(response.content)
-                state = data['State']
-            except requests.exceptions.ConnectionError:
-                print("Not initialised yet!")
-                time.sleep(1)
-    else:
-        state = 'Initialisation'
-        while state != 'Stopped':
-            time.sleep(1)
-            get_state = StateRpcClient()
-            print(" [->] Requesting state from node " + NODE_ROUTING_KEY)
-            response = get_state.call(NODE_ROUTING_KEY)
-            print(" [<-] Received %s" % response)
-            time.sleep(2)
-            if response:
-                state = response['state']
+    barrier.wait(sum(children ** level for level in range(depth + 1)))
+    print(" [<-] All " + str(len(barrier.ready)) + " nodes are ready")
 
 
-def start_root(architecture: str, depth: int, children: int) -> None:
+def start_root(architecture: str, depth: int, children: int, barrier: launcher.ReadinessBarrier) -> None:
     """
     Send change state to the tree root.
 
     :param architecture: MOM or REST
     :param depth: number of levels in the tree
     :param children: number of children per node
+    :param barrier: readiness barrier passed to the started tree
     :return: None
     """
     print("\n Starting " + architecture + ' with ' + str(children) + ' children and ' + str(depth) + ' levels!')
-    wait_until_node_is_ready(architecture)
+    wait_until_node_is_ready(barrier, depth, children)
 
     if architecture == 'REST':
         url = 'http://127.0.0.1:' + NODE_PORT + configuration['URL']['change_state']
@@ -106,13 +87,19 @@ def measurement() -> None:
         for depth in range(1, configuration['measurement']['tree']['depth'] + 1):
             for i in range(configuration['measurement']['runs']):
                 original_architecture = utils.set_configuration('MOM', ['architecture'])
+                original_loop = utils.set_configuration('asyncio', ['loop'])
                 for architecture in configuration['measurement']['architecture']:
                     utils.set_configuration(architecture, ['architecture'])
-                    client = threading.Thread(target=lambda: start_root(architecture, depth, children))
-                    client.start()
-                    measurement_runner(depth, children)
-                    client.join()
+                    for event_loop in configuration['measurement']['loop']:
+                        utils.set_configuration(event_loop, ['loop'])
+                        barrier = launcher.ReadinessBarrier()
+                        client = threading.Thread(target=lambda: start_root(architecture, depth, children, barrier))
+                        client.start()
+                        measurement_runner(depth, children, barrier.path)
+                        client.join()
+                        barrier.close()
                 utils.set_configuration(original_architecture, ['architecture'])
+                utils.set_configuration(original_loop, ['loop'])
     utils.set_configuration(False, ['measurement', 'write'])
     utils.set_configuration(original_timeout, ['rabbitmq', 'rpc_timeout'])
     utils.set_configuration(original_starting, ['node', 'time', 'starting'])
@@ -124,12 +111,13 @@ def measurement() -> None:
     loop.close()
 
 
-def collect_data(children, depth) -> dict:
+def collect_data(children, depth, event_loop: str | None = None) -> dict:
     """
     Collect all stored data from 'Measurements' with path /children/depth
 
     :param children:
     :param depth:
+    :param event_loop: only measurements with this loop (asyncio or uvloop), all measurements if None
     :return: dictionary with keys MOM and REST and all data collected from Measurements [children][depth]
     """
     rest_data = []
@@ -142,7 +130,7 @@ def collect_data(children, depth) -> dict:
                 mom_data.append([])
             for j in range(1, depth + 1):
                 time_sum = 0
-                data = get_node_data(NODE_PORT, i, j, architecture)
+                data = get_node_data(NODE_ID, i, j, architecture, event_loop)
                 for element in data:
                     time_sum += element
                 avg = time_sum / len(data)
@@ -206,14 +194,15 @@ def plot_data(children, depth) -> None:
     plt.show()
 
 
-def get_node_data(port, children, depth, architecture) -> list:
+def get_node_data(node_id, children, depth, architecture, event_loop: str | None = None) -> list:
     """
     Get data stored in the file about particular node in tree hierarchy
 
-    :param port: node port
+    :param node_id: node id
     :param children: number of children per node
     :param depth: depth of the ree
     :param architecture: MOM or REST
+    :param event_loop: only measurements with this loop (asyncio or uvloop), all measurements if None
     :return: list of roundtrip duration from root to the leaves
     """
     result = []
@@ -224,14 +213,55 @@ def get_node_data(port, children, depth, architecture) -> list:
         f = open(os.path.join(path, file_name), "r")
         line = f.readline()
         while len(line):
-            if line.split()[0] == port:
-                result.append(float(line.split()[1]))
+            values = line.split()
+            # measurements written before the loop was recorded were using asyncio loop
+            line_loop = values[2] if len(values) > 2 else 'asyncio'
+            if values[0] == node_id and event_loop in [None, line_loop]:
+                result.append(float(values[1]))
             line = f.readline()
     except FileNotFoundError:
         return [0] * depth
     return result
 
 
+def compare_envelopes(repetitions: int = 10000) -> None:
+    """
+    Print average size, encoding and decoding time of all binary envelopes in version 1 and 2
+
+    :param repetitions: number of encoded and decoded envelopes of each type
+    :return: None
+    """
+    # uncached serialisation, cached envelopes would measure only the lookup in the cache
+    encoders = {'white': lambda version: utils.encode_white_envelope.__wrapped__('get_state', 'proto', version),
+                'blue': lambda version: utils.encode_blue_envelope('Running', 'proto', version),
+                'red': lambda version: utils.encode_red_envelope('Running', '2.3.4.5.6', time.time(), 'proto',
+                                                                 version),
+                'orange': lambda version: utils.encode_orange_envelope.__wrapped__('Running', 0.123456, 'proto',
+                                                                                   version)}
+    original_format = utils.configuration['rabbitmq']['envelope_format']
+    original_version = utils.configuration['rabbitmq']['envelope_version']
+    utils.configuration['rabbitmq']['envelope_format'] = 'proto'
+    print('| Envelope | Version | Size [B] | Encode [us] | Decode [us] |')
+    print('|----------|--------:|---------:|------------:|------------:|')
+    for color, encoder in encoders.items():
+        for version in [1, 2]:
+            utils.configuration['rabbitmq']['envelope_version'] = version
+            start = time.perf_counter()
+            for _ in range(repetitions):
+                envelope = encoder(version)
+            encode = (time.perf_counter() - start) / repetitions
+            start = time.perf_counter()
+            for _ in range(repetitions):
+                utils.get_dict_from_envelope(envelope, [color])
+            decode = (time.perf_counter() - start) / repetitions
+            print('| %-8s | %7d | %8d | %11.2f | %11.2f |' % (color, version, len(envelope), encode * 1e6,
+                                                            decode * 1e6))
+    utils.configuration['rabbitmq']['envelope_format'] = original_format
+    utils.configuration['rabbitmq']['envelope_version'] = original_version
+
+
 measurement()
 
 # plot_data(configuration['measurement']['tree']['children'], configuration['measurement']['tree']['depth'])
+
+# compare_envelopes()
@@ -0,0 +1,82 @@
+import argparse
+import time
+
+import records
+import utils
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+def decode_dict(body) -> tuple:
+    """
+    Original decoding of received envelope: conversion to dictionary and reading the values from it
+
+    :param body: received envelope
+    :return: values used by the node
+    """
+    message = utils.get_dict_from_envelope(body, ['orange', 'red'])
+    if message['type'] == 'Notification':
+        return message['toState'], utils.get_node_id(message['sender']), message['time_stamp']
+    return message['name'], message['parameters']['chance_to_fail']
+
+
+def decode_record(body) -> tuple:
+    """
+    Decoding of received envelope directly into the record
+
+    :param body: received envelope
+    :return: values used by the node
+    """
+    message = utils.get_record_from_envelope(body, ['orange', 'red'])
+    if isinstance(message, records.Notification):
+        return message.state, message.sender, message.time_stamp
+    return message.state, message.chance_to_fail
+
+
+def measure(decoder, body, repetitions: int, runs: int = 5) -> float:
+    """
+    Measure average duration of decoding one envelope in the fastest of several runs
+
+    :param decoder: decoding function
+    :param body: encoded envelope
+    :param repetitions: number of decoded envelopes in one run
+    :param runs: number of runs
+    :return: duration in microseconds
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            decoder(body)
+        durations.append(time.perf_counter() - start)
+    return min(durations) / repetitions * 1e6
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python decode_benchmark.py --repetitions 100000`
+
+    :return: object having 1 attribute:
+        -repetitions: number of decoded envelopes of each type and format
+    """
+    parser = argparse.ArgumentParser(description='Measure decoding of received envelopes.')
+    parser.add_argument('--repetitions', dest='repetitions', action='store', type=int, default=100000,
+                        help='number of decoded envelopes of each type and format')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    print('| Envelope | Format   | Dictionary [us] | Record [us] | Speedup |')
+    print('|----------|----------|----------------:|------------:|--------:|')
+    for envelope_format, version in [('json', 1), ('proto', 1), ('proto', 2)]:
+        utils.configuration['rabbitmq']['envelope_format'] = envelope_format
+        utils.configuration['rabbitmq']['envelope_version'] = version
+        envelopes = {'red': utils.get_red_envelope('Running', '2.3.4.5.6'),
+                     'orange': utils.get_orange_envelope('Running', 0.123456)}
+        for color, body in envelopes.items():
+            dictionary = measure(decode_dict, body, arguments.repetitions)
+            record = measure(decode_record, body, arguments.repetitions)
+            name = envelope_format if envelope_format == 'json' else envelope_format + ' v' + str(version)
+            print('| %-8s | %-8s | %15.2f | %11.2f | %6.1fx |' % (color, name, dictionary, record, dictionary / record))
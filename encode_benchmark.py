@@ -0,0 +1,83 @@
+import argparse
+import time
+
+import utils
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+def encode_fresh(color: str, envelope_format: str, version: int):
+    """
+    Original encoding of sent envelope: whole envelope is serialised for every message
+
+    :param color: type of the envelope
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: encoded envelope
+    """
+    if color == 'red':
+        return utils.encode_red_envelope('Running', '2.3.4.5.6', time.time(), envelope_format, version)
+    return utils.encode_orange_envelope.__wrapped__('Running', 0.123456, envelope_format, version)
+
+
+def encode_cached(color: str, envelope_format: str, version: int):
+    """
+    Encoding of sent envelope from the cache, only time stamp of the red envelope is patched
+
+    :param color: type of the envelope
+    :param envelope_format: json or proto (selected by configuration)
+    :param version: binary envelope version (selected by configuration)
+    :return: encoded envelope
+    """
+    if color == 'red':
+        return utils.get_red_envelope('Running', '2.3.4.5.6')
+    return utils.get_orange_envelope('Running', 0.123456)
+
+
+def measure(encoder, color: str, envelope_format: str, version: int, repetitions: int, runs: int = 5) -> float:
+    """
+    Measure average duration of encoding one envelope in the fastest of several runs
+
+    :param encoder: encoding function
+    :param color: type of the envelope
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :param repetitions: number of encoded envelopes in one run (e.g. children of the broadcasting node)
+    :param runs: number of runs
+    :return: duration in microseconds
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            encoder(color, envelope_format, version)
+        durations.append(time.perf_counter() - start)
+    return min(durations) / repetitions * 1e6
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python encode_benchmark.py --repetitions 100000`
+
+    :return: object having 1 attribute:
+        -repetitions: number of encoded envelopes of each type and format
+    """
+    parser = argparse.ArgumentParser(description='Measure encoding of sent envelopes.')
+    parser.add_argument('--repetitions', dest='repetitions', action='store', type=int, default=100000,
+                        help='number of encoded envelopes of each type and format')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    print('| Envelope | Format   | Serialised [us] | Cached [us] | Speedup |')
+    print('|----------|----------|----------------:|------------:|--------:|')
+    for envelope_format, version in [('json', 1), ('proto', 1), ('proto', 2)]:
+        utils.configuration['rabbitmq']['envelope_format'] = envelope_format
+        utils.configuration['rabbitmq']['envelope_version'] = version
+        for color in ['red', 'orange']:
+            fresh = measure(encode_fresh, color, envelope_format, version, arguments.repetitions)
+            cached = measure(encode_cached, color, envelope_format, version, arguments.repetitions)
+            name = envelope_format if envelope_format == 'json' else envelope_format + ' v' + str(version)
+            print('| %-8s | %-8s | %15.2f | %11.2f | %6.1fx |' % (color, name, fresh, cached, fresh / cached))
@@ -1,10 +1,12 @@
 import envelope_pb2
-import model
+import envelope_v2_pb2
+import utils
 
 from errors import ValidationError
 
 
-def validator(data: envelope_pb2.White | envelope_pb2.Blue | envelope_pb2.Red | envelope_pb2.Orange, color: str):
+def validator(data: envelope_pb2.White | envelope_pb2.Blue | envelope_pb2.Red | envelope_pb2.Purple |
+                    envelope_pb2.Orange, color: str):
     """
     Validate any envelope
 
@@ -13,18 +15,24 @@ def validator(data: envelope_pb2.White | envelope_pb2.Blue | envelope_pb2.Red |
     :return:
     """
     if color == 'white':
-        if data.action != 'get_state':
+        if data.action not in ['get_state', 'get_snapshot']:
             raise ValidationError('White envelope contains wrong action', data.action)
     elif color == 'blue':
-        if data.state not in model.State._member_names_:
+        if data.state not in utils.STATE_NAMES:
             raise ValidationError('Blue envelope contains unsupported state', data.state)
+        for node_id, state in data.states.items():
+            if state not in utils.STATE_NAMES:
+                raise ValidationError('Blue envelope contains unsupported state of node ' + node_id, state)
     elif color == 'red':
         if data.type != 'Notification':
             raise ValidationError('Red envelope contains wrong type', data.type)
         if not is_valid_id(data.sender):
             raise ValidationError('Red envelope contains wrong sender', data.sender)
-        if data.toState.split(".")[-1] not in model.State._member_names_:
+        if data.toState.split(".")[-1] not in utils.STATE_NAMES:
             raise ValidationError('Red envelope contains wrong state', data.toState)
+    elif color == 'purple':
+        for red in data.red:
+            validator(red, 'red')
     elif color == 'orange':
         if data.type != 'Input':
             raise ValidationError('Orange envelope contains wrong type', data.type)
@@ -34,23 +42,60 @@ def validator(data: envelope_pb2.White | envelope_pb2.Blue | envelope_pb2.Red |
             raise ValidationError('Orange envelope contains wrong fail probability', data.parameters.chance_to_fail)
 
 
+def validator_v2(data: envelope_v2_pb2.White | envelope_v2_pb2.Blue | envelope_v2_pb2.Red | envelope_v2_pb2.Purple |
+                       envelope_v2_pb2.Orange, color: str):
+    """
+    Validate any envelope v2, states and actions are enums -> unknown values are not set after parsing
+
+    :param data: envelope
+    :param color: type of the envelope
+    :return:
+    """
+    if color == 'white':
+        if not data.HasField('action'):
+            raise ValidationError('White envelope contains wrong action')
+    elif color == 'blue':
+        if not data.HasField('state'):
+            raise ValidationError('Blue envelope contains unsupported state')
+        for node in data.states:
+            if not node.HasField('state') or not is_valid_path(node.id):
+                raise ValidationError('Blue envelope contains unsupported state of node', list(node.id))
+    elif color == 'red':
+        if not is_valid_path(data.sender):
+            raise ValidationError('Red envelope contains wrong sender', list(data.sender))
+        if not data.HasField('toState'):
+            raise ValidationError('Red envelope contains wrong state')
+    elif color == 'purple':
+        for red in data.red:
+            validator_v2(red, 'red')
+    elif color == 'orange':
+        if data.name not in [envelope_v2_pb2.Running, envelope_v2_pb2.Stopped]:
+            raise ValidationError('Orange envelope contains wrong name', data.name)
+        if not 0 <= data.chance_to_fail <= 1:
+            raise ValidationError('Orange envelope contains wrong fail probability', data.chance_to_fail)
+
+
+def is_valid_path(path) -> bool:
+    """
+    Check that node id of the envelope v2 is not empty and contains only positive numbers
+
+    :param path: node id as list of unsigned integers
+    :return: True if the path is valid
+    """
+    return len(path) > 0 and 0 not in path
+
+
 def is_valid_id(routing_key) -> bool:
     """
-    Check that id contains exactly 5 digits [0-9] separated by dot and in valid range defined in configuration
-    file
+    Check that id is a node id (dot separated path of positive integers), routing keys of the original fixed 5 digits
+    addressing (2.1.0.0.0) are accepted as well
 
     :param routing_key: input to check
     :return: True if the message is valid otherwise raise ValidationError
     """
-    from utils import get_port, get_configuration
-    configuration: dict[str, str | dict[str, str | dict]] = get_configuration()
-    port = get_port(routing_key)
-    if len(port) != 5:
-        raise ValidationError('Red envelope contains invalid routing key length', routing_key)
-    for digit in port:
-        if not '0' <= digit <= '9':
+    for number in utils.get_node_id(routing_key).split('.'):
+        if not number.isdigit():
             raise ValidationError('Red envelope contains invalid routing key character', routing_key)
-    routing_key = get_port(routing_key)
-    if configuration['node']['port']['min'] > int(routing_key) > configuration['node']['port']['max']:
-        raise ValidationError('Red envelope contains routing key out of range', routing_key)
+        if int(number) == 0:
+            raise ValidationError('Red envelope contains routing key out of range', routing_key)
     return True
@@ -13,7 +13,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0e\x65nvelope.proto\x12\x08\x65nvelope\"\x17\n\x05White\x12\x0e\n\x06\x61\x63tion\x18\x01 \x01(\t\"\x15\n\x04\x42lue\x12\r\n\x05state\x18\x01 \x01(\t\"H\n\x03Red\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x0e\n\x06sender\x18\x02 \x01(\t\x12\x0f\n\x07toState\x18\x03 \x01(\t\x12\x12\n\ntime_stamp\x18\x04 \x01(\x02\"y\n\x06Orange\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12.\n\nparameters\x18\x03 \x01(\x0b\x32\x1a.envelope.Orange.Parameter\x1a#\n\tParameter\x12\x16\n\x0e\x63hance_to_fail\x18\x01 \x01(\x02\"\xa4\x01\n\x07Rainbow\x12\r\n\x05\x63olor\x18\x01 \x01(\t\x12 \n\x05white\x18\x02 \x01(\x0b\x32\x0f.envelope.WhiteH\x00\x12\x1e\n\x04\x62lue\x18\x03 \x01(\x0b\x32\x0e.envelope.BlueH\x00\x12\x1c\n\x03red\x18\x04 \x01(\x0b\x32\r.envelope.RedH\x00\x12\"\n\x06orange\x18\x05 \x01(\x0b\x32\x10.envelope.OrangeH\x00\x42\x06\n\x04\x64\x61ta')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0e\x65nvelope.proto\x12\x08\x65nvelope\"\x17\n\x05White\x12\x0e\n\x06\x61\x63tion\x18\x01 \x01(\t\"p\n\x04\x42lue\x12\r\n\x05state\x18\x01 \x01(\t\x12*\n\x06states\x18\x02 \x03(\x0b\x32\x1a.envelope.Blue.StatesEntry\x1a-\n\x0bStatesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"H\n\x03Red\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x0e\n\x06sender\x18\x02 \x01(\t\x12\x0f\n\x07toState\x18\x03 \x01(\t\x12\x12\n\ntime_stamp\x18\x04 \x01(\x02\"$\n\x06Purple\x12\x1a\n\x03red\x18\x01 \x03(\x0b\x32\r.envelope.Red\"y\n\x06Orange\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12.\n\nparameters\x18\x03 \x01(\x0b\x32\x1a.envelope.Orange.Parameter\x1a#\n\tParameter\x12\x16\n\x0e\x63hance_to_fail\x18\x01 \x01(\x02\"\xc8\x01\n\x07Rainbow\x12\r\n\x05\x63olor\x18\x01 \x01(\t\x12 \n\x05white\x18\x02 \x01(\x0b\x32\x0f.envelope.WhiteH\x00\x12\x1e\n\x04\x62lue\x18\x03 \x01(\x0b\x32\x0e.envelope.BlueH\x00\x12\x1c\n\x03red\x18\x04 \x01(\x0b\x32\r.envelope.RedH\x00\x12\"\n\x06orange\x18\x05 \x01(\x0b\x32\x10.envelope.OrangeH\x00\x12\"\n\x06purple\x18\x06 \x01(\x0b\x32\x10.envelope.PurpleH\x00\x42\x06\n\x04\x64\x61ta')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -21,16 +21,22 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'envelope_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
+  _BLUE_STATESENTRY._options = None
+  _BLUE_STATESENTRY._serialized_options = b'8\001'
   _globals['_WHITE']._serialized_start=28
   _globals['_WHITE']._serialized_end=51
   _globals['_BLUE']._serialized_start=53
-  _globals['_BLUE']._serialized_end=74
-  _globals['_RED']._serialized_start=76
-  _globals['_RED']._serialized_end=148
-  _globals['_ORANGE']._serialized_start=150
-  _globals['_ORANGE']._serialized_end=271
-  _globals['_ORANGE_PARAMETER']._serialized_start=236
-  _globals['_ORANGE_PARAMETER']._serialized_end=271
-  _globals['_RAINBOW']._serialized_start=274
-  _globals['_RAINBOW']._serialized_end=438
+  _globals['_BLUE']._serialized_end=165
+  _globals['_BLUE_STATESENTRY']._serialized_start=120
+  _globals['_BLUE_STATESENTRY']._serialized_end=165
+  _globals['_RED']._serialized_start=167
+  _globals['_RED']._serialized_end=239
+  _globals['_PURPLE']._serialized_start=241
+  _globals['_PURPLE']._serialized_end=277
+  _globals['_ORANGE']._serialized_start=279
+  _globals['_ORANGE']._serialized_end=400
+  _globals['_ORANGE_PARAMETER']._serialized_start=365
+  _globals['_ORANGE_PARAMETER']._serialized_end=400
+  _globals['_RAINBOW']._serialized_start=403
+  _globals['_RAINBOW']._serialized_end=603
 # @@protoc_insertion_point(module_scope)
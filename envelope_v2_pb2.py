@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: envelope_v2.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11\x65nvelope_v2.proto\x12\x0b\x65nvelope_v2\",\n\x05White\x12#\n\x06\x61\x63tion\x18\x01 \x01(\x0e\x32\x13.envelope_v2.Action\">\n\tNodeState\x12\x0e\n\x02id\x18\x01 \x03(\rB\x02\x10\x01\x12!\n\x05state\x18\x02 \x01(\x0e\x32\x12.envelope_v2.State\"Q\n\x04\x42lue\x12!\n\x05state\x18\x01 \x01(\x0e\x32\x12.envelope_v2.State\x12&\n\x06states\x18\x02 \x03(\x0b\x32\x16.envelope_v2.NodeState\"R\n\x03Red\x12#\n\x07toState\x18\x01 \x01(\x0e\x32\x12.envelope_v2.State\x12\x12\n\x06sender\x18\x02 \x03(\rB\x02\x10\x01\x12\x12\n\ntime_stamp\x18\x03 \x01(\x01\"\'\n\x06Purple\x12\x1d\n\x03red\x18\x01 \x03(\x0b\x32\x10.envelope_v2.Red\"B\n\x06Orange\x12 \n\x04name\x18\x01 \x01(\x0e\x32\x12.envelope_v2.State\x12\x16\n\x0e\x63hance_to_fail\x18\x02 \x01(\x02\"\xd9\x01\n\x07Rainbow\x12\x0f\n\x07version\x18\x01 \x01(\r\x12#\n\x05white\x18\x02 \x01(\x0b\x32\x12.envelope_v2.WhiteH\x00\x12!\n\x04\x62lue\x18\x03 \x01(\x0b\x32\x11.envelope_v2.BlueH\x00\x12\x1f\n\x03red\x18\x04 \x01(\x0b\x32\x10.envelope_v2.RedH\x00\x12%\n\x06orange\x18\x05 \x01(\x0b\x32\x13.envelope_v2.OrangeH\x00\x12%\n\x06purple\x18\x06 \x01(\x0b\x32\x13.envelope_v2.PurpleH\x00\x42\x06\n\x04\x64\x61ta*N\n\x05State\x12\x12\n\x0eInitialisation\x10\x00\x12\x0b\n\x07Stopped\x10\x01\x12\x0c\n\x08Starting\x10\x02\x12\x0b\n\x07Running\x10\x03\x12\t\n\x05\x45rror\x10\x04*)\n\x06\x41\x63tion\x12\r\n\tget_state\x10\x00\x12\x10\n\x0cget_snapshot\x10\x01')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'envelope_v2_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _NODESTATE.fields_by_name['id']._options = None
+  _NODESTATE.fields_by_name['id']._serialized_options = b'\020\001'
+  _RED.fields_by_name['sender']._options = None
+  _RED.fields_by_name['sender']._serialized_options = b'\020\001'
+  _globals['_STATE']._serialized_start=640
+  _globals['_STATE']._serialized_end=718
+  _globals['_ACTION']._serialized_start=720
+  _globals['_ACTION']._serialized_end=761
+  _globals['_WHITE']._serialized_start=34
+  _globals['_WHITE']._serialized_end=78
+  _globals['_NODESTATE']._serialized_start=80
+  _globals['_NODESTATE']._serialized_end=142
+  _globals['_BLUE']._serialized_start=144
+  _globals['_BLUE']._serialized_end=225
+  _globals['_RED']._serialized_start=227
+  _globals['_RED']._serialized_end=309
+  _globals['_PURPLE']._serialized_start=311
+  _globals['_PURPLE']._serialized_end=350
+  _globals['_ORANGE']._serialized_start=352
+  _globals['_ORANGE']._serialized_end=418
+  _globals['_RAINBOW']._serialized_start=421
+  _globals['_RAINBOW']._serialized_end=638
+# @@protoc_insertion_point(module_scope)
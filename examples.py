@@ -92,7 +92,7 @@ def send_invalid_state_mom() -> None:
 
     :return: None
     """
-    asyncio.new_event_loop().run_until_complete(post_state_change('invalid', '2.0.0.0.0'))
+    asyncio.new_event_loop().run_until_complete(post_state_change('invalid', '2'))
 
 
 def send_invalid_notification_mom() -> None:
@@ -101,4 +101,4 @@ def send_invalid_notification_mom() -> None:
 
     :return: None
     """
-    asyncio.new_event_loop().run_until_complete(post_state_notification('state.invalid', '2.0.0.0.0', '2.1.0.0.0'))
+    asyncio.new_event_loop().run_until_complete(post_state_notification('state.invalid', '2', '2.1'))
@@ -0,0 +1,228 @@
+import asyncio
+import functools
+import signal
+from asyncio import Future
+
+import model
+import records
+import utils
+
+client = utils.lazy_import('client')
+receive = utils.lazy_import('receive')
+send = utils.lazy_import('send')
+server = utils.lazy_import('server')
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+class NodeHost:
+    """
+    Group of nodes living in one process and sharing one asyncio loop.
+
+    Messages between nodes hosted by the same NodeHost are delivered in-process, the transport selected by
+    `architecture` in configuration.yaml is used only for nodes hosted elsewhere (host boundary).
+    """
+
+    def __init__(self):
+        self.nodes: dict[str, model.Node] = dict()
+        self.tasks: set[asyncio.Task] = set()
+        self.notifications: int = 0
+        # notifications to be sent at the end of the loop iteration by parent id
+        self.outbox: dict[str, list[records.Notification]] = dict()
+
+    def add(self, node: model.Node) -> None:
+        """
+        Host given node by this process
+
+        :param node: node instance
+        :return: None
+        """
+        node.host = self
+        self.nodes[node.id] = node
+
+    def add_subtree(self, root: model.Node) -> None:
+        """
+        Host given node together with all its descendants
+
+        :param root: top node of the subtree
+        :return: None
+        """
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            self.add(node)
+            for child_id in node.children:
+                pending.append(model.Node(child_id))
+
+    def is_local(self, node_id: str) -> bool:
+        """
+        Check whether the node with given id is hosted by this process
+
+        :param node_id: node id
+        :return: True if node is hosted here
+        """
+        return node_id in self.nodes
+
+    def deliver_state_change(self, node_id: str, new_state: model.State, chance_to_fail: float = 0) -> None:
+        """
+        In-process equivalent of sending change state command to the hosted node
+
+        :param node_id: receiver id
+        :param new_state: requested state
+        :param chance_to_fail: probability to end in Error state
+        :return: None
+        """
+        if new_state == model.State.Running:
+            self.schedule(self.nodes[node_id].process_state_change(start_argument=chance_to_fail))
+        elif new_state == model.State.Stopped:
+            self.schedule(self.nodes[node_id].process_state_change(stop=True))
+
+    def deliver_notification(self, node_id: str, state: str, sender_id: str, time_stamp: float) -> None:
+        """
+        In-process equivalent of sending notification to the hosted node
+
+        :param node_id: receiver id
+        :param state: current state of the sender
+        :param sender_id: sender id
+        :param time_stamp: when was notification issued
+        :return: None
+        """
+        self.notifications += 1
+        self.schedule(self.nodes[node_id].process_notification(state, sender_id, time_stamp))
+
+    def post_notification(self, node_id: str, state: str, sender_id: str, time_stamp: float) -> None:
+        """
+        Queue notification of the hosted node to its parent, all notifications to the same parent queued within one
+        iteration of the loop are delivered together as one batch (one message if the parent is hosted elsewhere)
+
+        :param node_id: receiver id
+        :param state: current state of the sender
+        :param sender_id: sender id
+        :param time_stamp: when was notification issued
+        :return: None
+        """
+        if not self.outbox:
+            asyncio.get_running_loop().call_soon(self.flush_notifications)
+        if self.is_local(node_id):
+            self.notifications += 1
+        self.outbox.setdefault(node_id, []).append(records.Notification(state, sender_id, time_stamp))
+
+    def flush_notifications(self) -> None:
+        """
+        Deliver queued notifications, single notification to the remote parent is sent in the red envelope
+
+        :return: None
+        """
+        outbox, self.outbox = self.outbox, dict()
+        for node_id, notifications in outbox.items():
+            if self.is_local(node_id):
+                self.schedule(self.nodes[node_id].process_notifications(notifications))
+            elif configuration['architecture'] == 'MOM':
+                if len(notifications) == 1:
+                    self.schedule(send.post_state_notification(notifications[0].state, node_id,
+                                                               notifications[0].sender))
+                else:
+                    self.schedule(send.post_state_notifications(notifications, node_id))
+            else:
+                address = model.addresses.get_address(node_id)
+                if len(notifications) == 1:
+                    self.schedule(client.post_notification(address, notifications[0].state, notifications[0].sender))
+                else:
+                    self.schedule(client.post_notifications(address, notifications))
+
+    def schedule(self, coroutine) -> None:
+        """
+        Run coroutine as a task on the shared loop and keep reference to it until it is finished
+
+        :param coroutine: coroutine to execute
+        :return: None
+        """
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def initialise(self) -> None:
+        """
+        Equivalent of node initialisation for all hosted nodes, leaves are Stopped immediately and all nodes notify
+        their parents about being ready
+
+        :return: None
+        """
+        for node in self.nodes.values():
+            if not node.children:
+                node.state = model.State.Stopped
+        await asyncio.gather(*[node.report_state() for node in self.nodes.values()])
+        if configuration['debug']:
+            print('Host with ' + str(len(self.nodes)) + ' nodes - initialized')
+
+
+server_task: None | Future[None] = None
+receiver_task: None | Future[None] = None
+reload_task: None | Future[None] = None
+
+
+async def setup(node_host: NodeHost) -> None:
+    """
+    Starts one MOM consumer and one rpc server for all hosted nodes and handle task cancellation
+
+    :param node_host: hosted nodes
+    :return: None
+    """
+    global receiver_task, server_task, reload_task
+    nodes = list(node_host.nodes.values())
+    receiver_task = asyncio.create_task(receive.consume(nodes, node_host.initialise))
+    server_task = asyncio.create_task(model.serve_get_state(nodes))
+    if configuration['reload']:
+        reload_task = asyncio.create_task(utils.watch_configuration())
+    try:
+        await receiver_task
+    except asyncio.CancelledError:
+        if configuration['debug']:
+            print('Host consumer stopped')
+    try:
+        await server_task
+    except asyncio.CancelledError:
+        if configuration['debug']:
+            print('Host RPC server stopped')
+
+
+async def shutdown_event(node_host: NodeHost, broker_disconnect: bool = True) -> None:
+    """
+    Cancel pending in-process deliveries before termination
+
+    :param node_host: hosted nodes
+    :param broker_disconnect: whether stop consuming and terminate the loop inside the function
+    :return: None
+    """
+    if configuration['debug']:
+        print('Host with ' + str(len(node_host.nodes)) + ' nodes is going to be terminated!')
+    for task in node_host.tasks:
+        task.cancel()
+    if broker_disconnect:
+        node = next(iter(node_host.nodes.values()))
+        if node.kill_consumer:
+            node.kill_consumer()
+        if node.kill_rpc_serer:
+            node.kill_rpc_serer()
+        loop = asyncio.get_running_loop()
+        server_task.cancel()
+        receiver_task.cancel()
+        if reload_task:
+            reload_task.cancel()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def run(node_host: NodeHost) -> None:
+    """
+    Serve all hosted nodes by one process using transport selected in configuration.yaml
+
+    :param node_host: hosted nodes
+    :return: None
+    """
+    if configuration['architecture'] == 'MOM':
+        async_loop = asyncio.get_event_loop()
+        async_loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(shutdown_event(node_host)))
+        async_loop.create_task(setup(node_host))
+        async_loop.run_forever()
+    elif configuration['architecture'] == 'REST':
+        server.run_host(node_host, shutdown=functools.partial(shutdown_event, node_host))
@@ -0,0 +1,207 @@
+import importlib
+import multiprocessing
+import multiprocessing.context
+import os
+import signal
+import socket
+import tempfile
+import time
+
+import host
+import model
+import utils
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+def preload() -> None:
+    """
+    Import all modules of the selected architecture before node processes are forked, so they are imported only once by
+    the zygote and shared by all forked node processes
+
+    :return: None
+    """
+    if configuration['architecture'] == 'REST':
+        importlib.import_module('server')
+        importlib.import_module('client')
+    elif configuration['architecture'] == 'MOM':
+        importlib.import_module('receive')
+        importlib.import_module('send')
+        importlib.import_module('rpc_client')
+
+
+class NodeProcess(multiprocessing.context.ForkProcess):
+    """
+    Node process forked from its already initialised parent (zygote) instead of starting new interpreter which imports
+    and configures everything again. Provides the part of Popen interface used for termination of the children.
+    """
+
+    def send_signal(self, signal_number: int) -> None:
+        """
+        Send signal to the node process
+
+        :param signal_number: e.g. signal.SIGTERM
+        :return: None
+        """
+        os.kill(self.pid, signal_number)
+
+    def poll(self) -> int | None:
+        """
+        Check whether the node process is terminated
+
+        :return: exit code or None if the process is still running
+        """
+        return self.exitcode
+
+
+class ReadinessBarrier:
+    """
+    Local datagram socket which every node of the tree reports to once it is ready (Stopped after the initialisation,
+    so the whole subtree of the node is ready as well). The process starting the tree waits until all nodes reported
+    instead of polling the state of the root.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path: str = path or os.path.join(tempfile.gettempdir(), 'readiness-' + str(os.getpid()) + '.sock')
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(self.path)
+        self.ready: set[str] = set()
+
+    def wait(self, nodes: int, timeout: float | None = None) -> bool:
+        """
+        Block until given number of nodes reported being ready
+
+        :param nodes: number of nodes in the tree
+        :param timeout: maximal waiting time in seconds, None means no limit
+        :return: True if all nodes are ready, False after timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.ready) < nodes:
+            self.socket.settimeout(None if deadline is None else max(deadline - time.monotonic(), 0))
+            try:
+                self.ready.add(self.socket.recv(1024).decode())
+            except socket.timeout:
+                return False
+        return True
+
+    def close(self) -> None:
+        """
+        Close the socket and remove its file
+
+        :return: None
+        """
+        self.socket.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def report_ready(path: str, node_id: str) -> None:
+    """
+    Report to the readiness barrier that the node is ready
+
+    :param path: socket of the readiness barrier
+    :param node_id: id of the ready node
+    :return: None
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+        try:
+            client.sendto(node_id.encode(), path)
+        except OSError as e:
+            if configuration['debug']:
+                print('Readiness of ' + node_id + ' cannot be reported: ' + str(e))
+
+
+def get_tree(root: model.Node) -> dict[str, list[str]]:
+    """
+    Compute structure of the whole tree below the root node
+
+    :param root: root node
+    :return: dictionary where key is node id and value list of its children ids
+    """
+    tree = {root.id: list(root.children)}
+    pending = list(root.children)
+    while pending:
+        node_id = pending.pop()
+        tree[node_id] = list(model.Node(node_id).children)
+        pending.extend(tree[node_id])
+    return tree
+
+
+def get_subtree(tree: dict[str, list[str]], node_id: str) -> list[str]:
+    """
+    Get all node ids of the subtree
+
+    :param tree: structure of the whole tree
+    :param node_id: root of the subtree
+    :return: list of node ids where parent is always before its children
+    """
+    subtree = [node_id]
+    for subtree_node in subtree:
+        subtree.extend(tree[subtree_node])
+    return subtree
+
+
+def partition(tree: dict[str, list[str]], root_id: str, workers: int) -> list[list[str]]:
+    """
+    Split the tree into at most `workers` partitions. The tree is cut at the shallowest level having at least `workers`
+    nodes, whole subtrees below the cut are kept together and assigned to the least loaded partition, nodes above the
+    cut stay in the first partition. Only edges crossing the cut are leaving the partition.
+
+    :param tree: structure of the whole tree
+    :param root_id: root node id
+    :param workers: maximal number of partitions
+    :return: list of partitions where each partition is list of node ids
+    """
+    levels = [[root_id]]
+    while len(levels[-1]) < workers and tree[levels[-1][0]]:
+        levels.append([child for node_id in levels[-1] for child in tree[node_id]])
+    subtrees = sorted((get_subtree(tree, node_id) for node_id in levels[-1]), key=len, reverse=True)
+    partitions = [[] for _ in range(min(workers, len(subtrees)))]
+    partitions[0].extend(node_id for level in levels[:-1] for node_id in level)
+    for subtree in subtrees:
+        min(partitions, key=len).extend(subtree)
+    return partitions
+
+
+def run_partition(node_ids: list[str], depth: int, arity: int) -> None:
+    """
+    Worker process hosting all nodes of one partition
+
+    :param node_ids: hosted nodes
+    :param depth: number of levels in the tree
+    :param arity: number of children per node
+    :return: None
+    """
+    model.Node.depth = depth
+    model.Node.arity = arity
+    node_host = host.NodeHost()
+    for node_id in node_ids:
+        node_host.add(model.Node(node_id))
+    host.run(node_host)
+
+
+def run(root: model.Node, workers: int) -> None:
+    """
+    Partition the tree and run each partition in separate worker process, wait until all workers are terminated
+
+    :param root: root node
+    :param workers: number of worker processes
+    :return: None
+    """
+    partitions = partition(get_tree(root), root.id, workers)
+    processes = [multiprocessing.Process(target=run_partition, args=(node_ids, model.Node.depth, model.Node.arity))
+                 for node_ids in partitions]
+
+    def terminate(_signum, _frame):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+    for process in processes:
+        process.start()
+    if configuration['debug']:
+        print('Tree is hosted by ' + str(len(processes)) + ' workers: ' + str(list(map(len, partitions))))
+    for process in processes:
+        process.join()
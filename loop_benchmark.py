@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+import host
+import launcher
+import model
+import utils
+from model import State
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+def configure(value: str | bool | int, path: list) -> None:
+    """
+    Set configuration value of the modules used by this process and of the started nodes
+
+    :param value: new value
+    :param path: path to the value
+    :return: None
+    """
+    utils.set_configuration(value, path)
+    for module_configuration in [utils.configuration, model.configuration, host.configuration]:
+        utils.set_value(module_configuration, path, value)
+
+
+async def start_in_process(levels: int, children: int) -> float:
+    """
+    Measure start of the whole tree hosted by this process without any transport (interpreter and loop overhead)
+
+    :param levels: number of levels in the tree
+    :param children: number of children per node
+    :return: duration from sending start to the root until the root is Running in seconds
+    """
+    model.Node.depth = levels
+    model.Node.arity = children
+    node_host = host.NodeHost()
+    root = model.Node('2')
+    node_host.add_subtree(root)
+    loop = asyncio.get_running_loop()
+    running = loop.create_future()
+    enter_running_state = root.enter_running_state
+
+    async def root_running() -> None:
+        await enter_running_state()
+        # clock of uvloop has millisecond resolution
+        running.set_result(time.perf_counter())
+
+    root.enter_running_state = root_running
+    await node_host.initialise()
+    while root.state != State.Stopped:
+        await asyncio.sleep(0)
+    start = time.perf_counter()
+    node_host.deliver_state_change(root.id, State.Running)
+    return await running - start
+
+
+def start_rest(levels: int, children: int, directory: str) -> float:
+    """
+    Measure start of the tree of REST nodes, the root writes the duration into the measurement file and terminates
+
+    :param levels: number of levels in the tree
+    :param children: number of children per node
+    :param directory: working directory of the tree where the measurement file is written
+    :return: duration from sending start to the root until the root is Running in seconds
+    """
+    barrier = launcher.ReadinessBarrier()
+    root = subprocess.Popen([sys.executable, os.path.abspath('service.py'), '--levels', str(levels), '--children',
+                             str(children), '--ready', barrier.path], cwd=directory, stdout=subprocess.DEVNULL)
+    try:
+        barrier.wait(sum(children ** level for level in range(levels + 1)))
+        url = configuration['URL']['protocol'] + configuration['URL']['address'] + ':' + \
+            str(model.Node('2').address.get_port()) + configuration['URL']['change_state']
+        requests.post(url, json={'start': '0'})
+        root.wait()
+    finally:
+        barrier.close()
+    with open(os.path.join(directory, 'measurements', str(children), str(levels), 'REST_duration.txt')) as f:
+        durations = [line.split() for line in f]
+    return [float(duration) for node_id, duration, event_loop in durations if node_id == '2'][-1]
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python loop_benchmark.py --levels 1 2 3 --children 3 --runs 3`
+
+    :return: object having 3 attributes:
+        -levels: list of numbers of levels in the tree
+        -children: number of children per node
+        -runs: number of measurements of each combination, the fastest is reported
+    """
+    parser = argparse.ArgumentParser(description='Measure start of the tree with asyncio and uvloop loop.')
+    parser.add_argument('--levels', dest='levels', action='store', type=int, nargs='+', default=[1, 2, 3],
+                        help='numbers of levels in the tree')
+    parser.add_argument('--children', dest='children', action='store', type=int, default=3,
+                        help='number of children per node')
+    parser.add_argument('--runs', dest='runs', action='store', type=int, default=3,
+                        help='number of measurements of each combination, the fastest is reported')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    for path, value in [(['debug'], False), (['architecture'], 'REST'), (['node', 'time', 'starting'], 0),
+                        (['node', 'time', 'get'], 0), (['measurement', 'write'], False)]:
+        configure(value, path)
+    loops = []
+    for event_loop in ['asyncio', 'uvloop']:
+        configure(event_loop, ['loop'])
+        loops.append(utils.use_event_loop())
+    header = ['Nodes'] + ['In-process %s [ms]' % event_loop for event_loop in loops] + \
+        ['REST %s [ms]' % event_loop for event_loop in loops]
+    print('| ' + ' | '.join(header) + ' |')
+    print('|' + '|'.join('-' * (len(cell) + 1) + ':' for cell in header) + '|')
+    with tempfile.TemporaryDirectory() as measurements:
+        for levels in arguments.levels:
+            in_process = []
+            rest = []
+            for event_loop in ['asyncio', 'uvloop']:
+                configure(event_loop, ['loop'])
+                utils.use_event_loop()
+                in_process.append(min(asyncio.run(start_in_process(levels, arguments.children))
+                                      for _ in range(arguments.runs)))
+                configure(True, ['measurement', 'write'])
+                rest.append(min(start_rest(levels, arguments.children, measurements) for _ in range(arguments.runs)))
+                configure(False, ['measurement', 'write'])
+            nodes = sum(arguments.children ** level for level in range(levels + 1))
+            values = [str(nodes)] + ['%.2f' % (duration * 1e3) for duration in in_process + rest]
+            print('| ' + ' | '.join(value.rjust(len(cell)) for value, cell in zip(values, header)) + ' |')
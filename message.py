@@ -6,6 +6,7 @@ from errors import ValidationError
 from utils import get_configuration
 
 configuration: dict[str, str | dict[str, str | dict]] = get_configuration()
+STATES = frozenset(['Initialisation', 'Stopped', 'Starting', 'Running', 'Error'])
 
 
 class ChangeState(pydantic.BaseModel):
@@ -44,14 +45,79 @@ class Notification(pydantic.BaseModel):
     @pydantic.validator("state")
     @classmethod
     def state_valid(cls, value):
-        if value.split('.')[-1] not in ['Initialisation', 'Stopped', 'Starting', 'Running', 'Error']:
+        if value.split('.')[-1] not in STATES:
             raise ValidationError('Invalid state in Notification', value)
         return value
 
     @pydantic.validator("sender")
     @classmethod
     def sender_valid(cls, value):
-        port = int(value.split(':')[-1])
-        if configuration['node']['port']['min'] > port > configuration['node']['port']['max']:
-            raise ValidationError('Invalid sender port in Notification:', value)
+        if not all(number.isdigit() and int(number) > 0 for number in value.split('.')):
+            raise ValidationError('Invalid sender id in Notification:', value)
         return value
+
+
+class NotificationItem(Notification):
+    time_stamp: float = 0
+
+
+class NotificationBatch(pydantic.BaseModel):
+    notifications: list[NotificationItem]
+
+
+def validate_change_state(values: dict) -> (str | None, str | None):
+    """
+    Hand-written equivalent of ChangeState validation used by the raw ASGI application
+
+    :param values: received attributes
+    :return: validated start and stop
+    """
+    if 'start' in values and 'stop' in values:
+        raise ValidationError('Start and Stop at the same time!')
+    if 'start' not in values and 'stop' not in values:
+        raise ValidationError('Start neither Stop is defined!')
+    start = values.get('start')
+    stop = values.get('stop')
+    if start is not None:
+        start = str(start)
+        try:
+            probability = float(start)
+        except ValueError:
+            raise ValidationError('Invalid probability of Start state', start)
+        if probability < 0 or probability > 1:
+            raise ValidationError('Invalid probability of Start state', start)
+    if stop is not None and stop != '_':
+        raise ValidationError('Invalid attribute of Stop state', stop)
+    return start, stop
+
+
+def validate_notification(values: dict) -> (str, str):
+    """
+    Hand-written equivalent of Notification validation used by the raw ASGI application
+
+    :param values: received attributes
+    :return: validated state and sender
+    """
+    state = coerce_str(values.get('state'))
+    sender = coerce_str(values.get('sender'))
+    if state is None or state.split('.')[-1] not in STATES:
+        raise ValidationError('Invalid state in Notification', values.get('state'))
+    if sender is None or not all(number.isdigit() and int(number) > 0 for number in sender.split('.')):
+        raise ValidationError('Invalid sender id in Notification:', values.get('sender'))
+    return state, sender
+
+
+def coerce_str(value) -> str | None:
+    """
+    Convert received attribute to string in the same way as pydantic str field, numbers are converted and bytes decoded
+
+    :param value: received attribute
+    :return: string value or None if the value cannot be converted
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    return None
@@ -1,16 +1,22 @@
 import asyncio
+import functools
 import time
 from datetime import datetime
 from enum import Enum
 import random
 from subprocess import Popen
-import pika
+from typing import Callable
 
-import send
-import client
+import records
 import utils
 from writer import add_measurement
 
+# transport modules are imported on the first use
+pika = utils.lazy_import('pika')
+send = utils.lazy_import('send')
+client = utils.lazy_import('client')
+rpc_client = utils.lazy_import('rpc_client')
+
 configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
 
 
@@ -58,59 +64,211 @@ class NodeAddress:
         return not (self == other)
 
 
+class AddressTable:
+    """
+    Lookup table translating node id into REST address in following format: 127.0.0.1:20000
+
+    Trees up to 4 levels and 9 children keep the original 5 digits ports where each digit is one level of the path (2.1.3
+    -> 21300), ports of bigger trees are assigned consecutively in breadth-first order starting from the root port (2 ->
+    20000). Addresses registered explicitly (e.g. REST.addresses in configuration.yaml) take precedence.
+    """
+    PORT_DIGITS = 5
+
+    def __init__(self, addresses: dict[str, str] | None = None):
+        self.addresses: dict[str, str] = dict(addresses or {})
+
+    def register(self, node_id: str, address: str) -> None:
+        """
+        Assign address to the node explicitly
+
+        :param node_id: node id
+        :param address: IP:port
+        :return: None
+        """
+        self.addresses[node_id] = address
+
+    def get_address(self, node_id: str) -> str:
+        """
+        Find address of the node
+
+        :param node_id: node id
+        :return: IP:port
+        """
+        if node_id in self.addresses:
+            return self.addresses[node_id]
+        return configuration['URL']['address'] + ':' + str(AddressTable.compute_port(node_id))
+
+    @staticmethod
+    def compute_port(node_id: str) -> int:
+        """
+        Compute default port of the node based on its position in the tree
+
+        :param node_id: node id
+        :return: port number
+        """
+        path = [int(number) for number in node_id.split('.')]
+        root_port = path[0] * 10 ** (AddressTable.PORT_DIGITS - 1)
+        if Node.depth < AddressTable.PORT_DIGITS and Node.arity < 10:
+            return root_port + sum(number * 10 ** (AddressTable.PORT_DIGITS - 1 - level)
+                                   for level, number in enumerate(path) if level)
+        # number of nodes on all levels above the node
+        index = sum(Node.arity ** level for level in range(len(path) - 1))
+        position = 0
+        for number in path[1:]:
+            position = position * Node.arity + number - 1
+        return root_port + index + position
+
+    def check_ports(self, node_id: str) -> None:
+        """
+        Check that computed ports of the whole tree containing the node do not exceed node.port.max, the last node in
+        breadth-first order has the highest port
+
+        :param node_id: id of any node in the tree
+        :return: None
+        :raises ValueError: highest port of the tree is out of the range and the node has no explicit address
+        """
+        last_id = '.'.join([node_id.split('.')[0]] + [str(Node.arity)] * Node.depth)
+        port = AddressTable.compute_port(last_id)
+        if last_id not in self.addresses and port > configuration['node']['port']['max']:
+            raise ValueError('Tree of depth ' + str(Node.depth) + ' with ' + str(Node.arity) + ' children needs port '
+                             + str(port) + ' for node ' + last_id + ' which exceeds node.port.max (' +
+                             str(configuration['node']['port']['max']) + '), set node addresses in REST.addresses '
+                             'in configuration.yaml')
+
+
+class Children(dict):
+    """
+    Children of the node mapped to their last known state and time stamp: {child_id: (State, time_stamp)}
+
+    Number of children in each state is updated whenever an entry is overwritten, so the state of the parent can be
+    aggregated in constant time regardless of the number of children.
+    """
+
+    def __init__(self, children: dict[str, (State, float)] | None = None):
+        super().__init__()
+        self.counter: dict[State, int] = {state: 0 for state in State}
+        if children:
+            self.update(children)
+
+    @staticmethod
+    def get_state(entry: tuple[State, float] | None) -> State:
+        """
+        Extract state from the entry, missing state is considered as Initialisation
+
+        :param entry: tuple of state and time stamp
+        :return: child state
+        """
+        if entry and entry[0]:
+            return entry[0]
+        return State.Initialisation
+
+    def __setitem__(self, child_id: str, entry: (State, float)) -> None:
+        if child_id in self:
+            self.counter[Children.get_state(self[child_id])] -= 1
+        super().__setitem__(child_id, entry)
+        self.counter[Children.get_state(entry)] += 1
+
+    def __delitem__(self, child_id: str) -> None:
+        self.counter[Children.get_state(self[child_id])] -= 1
+        super().__delitem__(child_id)
+
+    def update(self, *args, **kwargs) -> None:
+        for child_id, entry in dict(*args, **kwargs).items():
+            self[child_id] = entry
+
+    def pop(self, child_id: str, *default):
+        if child_id in self:
+            self.counter[Children.get_state(self[child_id])] -= 1
+        return super().pop(child_id, *default)
+
+    def clear(self) -> None:
+        super().clear()
+        self.counter = {state: 0 for state in State}
+
+    def count(self, state: State) -> int:
+        """
+        Number of children in given state
+
+        :param state: child state
+        :return: number of children
+        """
+        return self.counter[state]
+
+
 class Node:
     """
     Representation of one Node in the hierarchy.
 
-    MAXIMUM_DEPTH number of hierarchies that cannot be exceeded otherwise the script will crash, it can't be changed
-    depth configuration number from range [0-4] referring to number of hierarchies
-    arity configuration number from range [1-9] referring to number of children than each node except the leaves has
+    Node is identified by dot separated path from the root (e.g. 2.1.3 is the third child of the first child of the
+    root 2), so there is no limit of depth or arity.
+    depth configuration number referring to number of hierarchies
+    arity configuration number referring to number of children than each node except the leaves has
     """
-    MAXIMUM_DEPTH = configuration['node']['depth']['max'] - 1  # maximum achievable depth
     depth: int = 0
     arity: int = 0
 
-    def __init__(self, address: NodeAddress):
+    def __init__(self, node_id: str):
         self.state: State = State.Initialisation
-        self.level: int = utils.compute_hierarchy_level(address.get_port())
-        self.address: NodeAddress = address
-        self.children: dict[int, (State, float)] = dict()
+        self.id: str = node_id
+        self.level: int = utils.compute_hierarchy_level(node_id)
+        self.parent_id: str | None = utils.get_parent_id(node_id)
+        self.address: NodeAddress = NodeAddress(addresses.get_address(node_id))
+        self._children: Children = Children()
         self.started_processes: [Popen] = []
         self.chance_to_fail: float = 0
         self.build()
         self.kill_rpc_serer = None
         self.kill_consumer = None
         self.initialisation_timestamp = None
+        self.host = None  # NodeHost when the node shares the process with other nodes
+        self.reported_state: State | None = None
+        self.coalescing: asyncio.Task | None = None
+        self.on_ready: Callable[[], None] | None = None  # executed once the node is Stopped after initialisation
 
-    async def set_state(self, new_state: State, probability_to_fail: float = 0, transition_time: int = 0) -> None:
+    @property
+    def children(self) -> Children:
+        return self._children
+
+    @children.setter
+    def children(self, children: dict[str, (State, float)]) -> None:
+        self._children = children if isinstance(children, Children) else Children(children)
+
+    async def set_state(self, new_state: State, probability_to_fail: float = 0, transition_time: int = 0,
+                        propagate: bool = True) -> None:
         """
         Change state from current to new state or fail.
 
         :param new_state:
         :param probability_to_fail: percentage value between 0 and 1
         :param transition_time: how long should transition last
+        :param propagate: whether the command has to be sent to the children, False if they received it already
         :return: None
         """
 
         if new_state == State.Running:
             self.chance_to_fail = probability_to_fail
             self.state = State.Starting
+            if not propagate:
+                # children are starting together with this node, so they can all report Running during the sleep
+                if not self.initialisation_timestamp:
+                    self.initialisation_timestamp = asyncio.get_running_loop().time()
+                self.expect_children(new_state)
             await asyncio.sleep(transition_time)
             if len(self.children):
-                await self.send_to_children(new_state)
+                await self.send_to_children(new_state, propagate)
             else:
                 await self.enter_running_state()
 
         elif new_state == State.Stopped:
             if len(self.children):
-                await self.send_to_children(new_state)
+                await self.send_to_children(new_state, propagate)
             else:
                 self.state = State.Stopped
                 await self.notify_parent()
         if configuration['debug']:
             now = datetime.now()
             print(
-                "Node " + self.address.get_port() + " is in " + str(self.state) + " at" + now.strftime(" %H:%M:%S"))
+                "Node " + self.id + " is in " + str(self.state) + " at" + now.strftime(" %H:%M:%S"))
 
     async def enter_running_state(self) -> None:
         """
@@ -126,33 +284,53 @@ class Node:
         if configuration['debug']:
             now = datetime.now()
             print(
-                "Node " + self.address.get_port() + " is in " + str(self.state) + " at" + now.strftime(
+                "Node " + self.id + " is in " + str(self.state) + " at" + now.strftime(
                     " %H:%M:%S"))
 
-    async def send_to_children(self, new_state: State) -> None:
+    def expect_children(self, new_state: State) -> None:
         """
-        Propagate received message to all children
+        Mark all children as being in transition, children which already reported the requested state are kept
+
+        :param new_state: requested state
+        :return: None
+        """
+        for child_id in self.children:
+            if Children.get_state(self.children[child_id]) != new_state:
+                self.children[child_id] = (State.Starting, self.children[child_id][1])
+
+    async def send_to_children(self, new_state: State, propagate: bool = True) -> None:
+        """
+        Propagate received message to all children, in MOM architecture one broadcast message can reach all children
+        or the whole subtree based on rabbitmq.broadcast in configuration.yaml
 
         :param new_state: propagated state
+        :param propagate: whether the message has to be sent, False if the children received it already
         :return: None
         """
         if not self.initialisation_timestamp:
-            self.initialisation_timestamp = time.perf_counter()
+            self.initialisation_timestamp = asyncio.get_running_loop().time()
+        self.expect_children(new_state)
+        broadcast = configuration['rabbitmq']['broadcast']
+        if configuration['architecture'] == 'MOM' and not self.host and (broadcast != 'none' or not propagate):
+            if propagate:
+                if configuration['debug']:
+                    print(self.id + ' is broadcasting ' + str(new_state) + ' to ' + broadcast)
+                await send.post_state_change(str(new_state), self.id + '.' + broadcast, self.chance_to_fail)
+            return
         tasks = []
-        for child_port in self.children:
-            self.children[child_port] = (State.Starting, self.children[child_port][1])
+        for child_id in self.children:
             if configuration['debug']:
-                print(self.address.get_port() + ' is sending ' + str(new_state) + ' to ' + str(child_port))
-            if configuration['architecture'] == 'MOM':
-                routing_key = utils.get_bounding_key(str(child_port))
+                print(self.id + ' is sending ' + str(new_state) + ' to ' + child_id)
+            if self.host and self.host.is_local(child_id):
+                self.host.deliver_state_change(child_id, new_state, self.chance_to_fail)
+            elif configuration['architecture'] == 'MOM':
                 message = str(new_state)
-                tasks.append(send.post_state_change(message, routing_key, self.chance_to_fail))
+                tasks.append(send.post_state_change(message, child_id, self.chance_to_fail))
             else:
                 if new_state == State.Running:
-                    tasks.append(client.post_start(str(self.chance_to_fail),
-                                                   configuration['URL']['address'] + ':' + str(child_port)))
+                    tasks.append(client.post_start(str(self.chance_to_fail), addresses.get_address(child_id)))
                 elif new_state == State.Stopped:
-                    tasks.append(client.post_stop(configuration['URL']['address'] + str(child_port)))
+                    tasks.append(client.post_stop(addresses.get_address(child_id)))
         await asyncio.gather(*tasks)
 
     def add_child(self) -> None:
@@ -162,10 +340,7 @@ class Node:
         :return: None
         """
         child_number: int = len(self.children) + 1
-        child_level: int = self.level + 1
-        child_offset: int = child_number * (10 ** (Node.MAXIMUM_DEPTH - child_level))
-        child_port: int = int(self.address.get_port()) + child_offset
-        self.children[child_port] = (State.Initialisation, time.time())
+        self.children[utils.get_child_id(self.id, child_number)] = (State.Initialisation, time.time())
 
     def build(self) -> None:
         """
@@ -179,9 +354,9 @@ class Node:
     def update_state(self) -> bool:
         """
         Update own state based on received notifications from the children with following rules:
-        At least 1 child_port in error state -> error
-        At least 1 child_port in stopped state -> stopped
-        At least 1 child_port in starting state -> starting
+        At least 1 child in error state -> error
+        At least 1 child in stopped state -> stopped
+        At least 1 child in starting state -> starting
         All children in running state -> running
 
         :return: whether there is a need to notify parent
@@ -189,23 +364,11 @@ class Node:
         before = self.state
         if before == State.Error:
             return False
-        initialisation: int = 0
-        stopped: int = 0
-        starting: int = 0
-        running: int = 0
-        error: int = 0
-        for child_port in self.children:
-            child_status = self.children[child_port][0]
-            if not child_status or child_status == State.Initialisation:
-                initialisation += 1
-            elif child_status == State.Stopped:
-                stopped += 1
-            elif child_status == State.Starting:
-                starting += 1
-            elif child_status == State.Running:
-                running += 1
-            elif child_status == State.Error:
-                error += 1
+        initialisation: int = self.children.count(State.Initialisation)
+        stopped: int = self.children.count(State.Stopped)
+        starting: int = self.children.count(State.Starting)
+        running: int = self.children.count(State.Running)
+        error: int = self.children.count(State.Error)
         if error:
             self.state = State.Error
         elif initialisation:
@@ -216,10 +379,11 @@ class Node:
             self.state = State.Starting
         elif running == len(self.children):
             if self.state != State.Running:
-                if configuration['measurement']['write']:
+                if configuration['measurement']['write'] and not self.has_local_parent():
                     add_measurement(configuration['architecture'] + '_duration.txt',
-                                    self.address.get_port(),
-                                    time.perf_counter() - self.initialisation_timestamp, len(self.children), Node.depth)
+                                    self.id,
+                                    asyncio.get_running_loop().time() - self.initialisation_timestamp,
+                                    len(self.children), Node.depth, utils.event_loop)
                 asyncio.create_task(self.enter_running_state())
                 return False
         return self.state != before
@@ -235,7 +399,7 @@ class Node:
             if self.chance_to_fail > random.uniform(0, 1):
                 await self.change_state(State.Error)
             if configuration['debug']:
-                print(self.address.get_port() + ' -> ' + str(self.state))
+                print(self.id + ' -> ' + str(self.state))
 
     async def change_state(self, new_state: State) -> None:
         """
@@ -247,40 +411,147 @@ class Node:
         self.state = new_state
         await self.notify_parent()
         if configuration['debug']:
-            print(str(self.address.get_port()) + ' is changing State to ' + str(new_state))
+            print(self.id + ' is changing State to ' + str(new_state))
+
+    async def process_state_change(self, start_argument: float = None, stop: bool = False,
+                                   propagate: bool = True) -> None:
+        """
+        Handle received command to change the state.
+
+        :param start_argument: probability between 0 and 1 of getting into Error state
+        :param stop: any non None input means stop
+        :param propagate: whether the command has to be sent to the children, False if they received it already
+        :return: None
+        """
+        if self.state == State.Error:
+            return
+        if start_argument is not None and self.state == State.Stopped:
+            await self.set_state(State.Running, start_argument, configuration['node']['time']['starting'], propagate)
+        elif stop and self.state == State.Running:
+            await self.set_state(State.Stopped, propagate=propagate)
+        elif configuration['debug']:
+            print('Wrong operation! Node remains in : %r' % str(self.state))
+        if configuration['debug']:
+            now = datetime.now()
+            new_state = 'State.Running' if start_argument is not None else 'State.Stopped'
+            print("Node " + self.id + " received " + new_state + " at " + now.strftime(" %H:%M:%S"))
+
+    async def process_notification(self, state: str = None, sender_id: str = None, time_stamp: float = 0) -> None:
+        """
+        Handle child current state notification that is recursively propagating to the root and updating states on
+        the way
+
+        :param state: state of the child that sent notification
+        :param sender_id: child's id
+        :param time_stamp: when was notification issued
+        :return: None
+        """
+        await self.process_notifications([records.Notification(state, sender_id, time_stamp)])
+
+    async def process_notifications(self, notifications: list[records.Notification]) -> None:
+        """
+        Handle current state notifications of several children at once, own state is updated and reported only once
+        per batch
+
+        :param notifications: state, sender id and time stamp of every notifying child
+        :return: None
+        """
+        updated = False
+        for notification in notifications:
+            if notification.state and self.children[notification.sender][1] <= notification.time_stamp:
+                try:
+                    self.children[notification.sender] = (State[notification.state.split('.')[-1]],
+                                                          notification.time_stamp)
+                    updated = True
+                except KeyError:
+                    if configuration['debug']:
+                        print('Invalid notification! Node remains in : %r' % str(self.state))
+            else:
+                print('Message is being ignored { state: ' + str(notification.state) + ', sender: ' +
+                      str(notification.sender) + ', timestamp: ' + str(notification.time_stamp) + '}')
+
+        notification_needed = updated and self.update_state()
+        if notification_needed or self.coalescing:
+            await self.report_state()
+
+    async def report_state(self) -> None:
+        """
+        Notify parent about the state aggregated from children notifications. All changes within the coalescing window
+        (node.time.coalescing in configuration.yaml) are merged and only the latest state is sent. The window is closed
+        earlier once no child is pending (Initialisation or Starting) or the node ended in Error state.
+
+        :return: None
+        """
+        window = configuration['node']['time']['coalescing']
+        if not window:
+            await self.notify_parent()
+            return
+        pending = self.children.count(State.Initialisation) + self.children.count(State.Starting)
+        if pending and self.state != State.Error:
+            if not self.coalescing:
+                self.coalescing = asyncio.create_task(self.flush_notification(window))
+            return
+        if self.coalescing:
+            self.coalescing.cancel()
+            self.coalescing = None
+        if self.state != self.reported_state:
+            await self.notify_parent()
+
+    async def flush_notification(self, window: float) -> None:
+        """
+        Notify parent about the latest state at the end of the coalescing window unless it was already reported
+
+        :param window: duration of the window in seconds
+        :return: None
+        """
+        await asyncio.sleep(window)
+        self.coalescing = None
+        if self.state != self.reported_state:
+            await self.notify_parent()
 
     async def notify_parent(self):
         """
-        Notify parent about current state based on selected architecture in configuration.yaml if node has parent
+        Notify parent about current state based on selected architecture in configuration.yaml if node has parent,
+        parent hosted by the same process is notified directly, notifications of hosted nodes are batched by the host
+        (node.batch in configuration.yaml)
 
         :return: None
         """
-        if self.get_parent().address:
+        self.reported_state = self.state
+        if self.on_ready and self.state == State.Stopped:
+            self.on_ready()
+            self.on_ready = None
+        if self.host and self.parent_id and configuration['node']['batch']:
+            self.host.post_notification(self.parent_id, str(self.state), self.id, time.time())
+        elif self.has_local_parent():
+            self.host.deliver_notification(self.parent_id, str(self.state), self.id, time.time())
+        elif self.parent_id:
             if configuration['architecture'] == 'MOM':
-                routing_key = utils.get_bounding_key(self.get_parent().get_port())
-                sender_id = utils.get_bounding_key(self.address.get_port())
                 await send.post_state_notification(current_state=str(self.state),
-                                                   routing_key=routing_key,
-                                                   sender_id=sender_id)
+                                                   routing_key=self.parent_id,
+                                                   sender_id=self.id)
             else:
                 # REST
                 await client.post_notification(address=self.get_parent().get_full_address(),
-                                               state=str(self.state), sender_address=self.address.get_full_address())
+                                               state=str(self.state), sender_id=self.id)
+
+    def has_local_parent(self) -> bool:
+        """
+        Check whether the parent node is hosted by the same process
+
+        :return: True if notifications to the parent do not leave the process
+        """
+        return bool(self.host) and bool(self.parent_id) and self.host.is_local(self.parent_id)
 
     def get_parent(self) -> NodeAddress:
         """
-        Compute parent node address based on current node port
+        Find parent node address in the address table
 
         :return: NodeAddress of the parent
         """
-        port = self.address.get_port()
-        level = 4 - port.count('0')
-        if level == 0:
+        if self.parent_id is None:
             return NodeAddress(None)
-        parent_port = list(port)
-        parent_port[level] = '0'
-        parent_port = ''.join(parent_port)
-        return NodeAddress(self.address.get_ip() + ':' + parent_port)
+        return NodeAddress(addresses.get_address(self.parent_id))
 
     def on_request(self, ch, method, props, body) -> None:
         """
@@ -301,40 +572,126 @@ class Node:
 
         if envelope_data and envelope_data['action'] == 'get_state':
             response = utils.get_blue_envelope(get_current_state())
-            print('Returning current state: ' + str(response) + ' of node ' + self.address.get_port())
+            print('Returning current state: ' + str(response) + ' of node ' + self.id)
             ch.basic_publish(exchange='',
                              routing_key=props.reply_to,
                              properties=pika.BasicProperties(correlation_id=props.correlation_id),
                              body=response)
             ch.basic_ack(delivery_tag=method.delivery_tag)
 
-    def run_get_server(self) -> None:
+    async def get_current_state(self) -> str:
         """
-        Run rpc server to respond on get_state requests
+        Get current state of the node after simulated delay without blocking the loop
 
-        :return: None
+        :return: state name
         """
+        await asyncio.sleep(configuration['node']['time']['get'])
+        return str(self.state).split('.')[-1]
 
-        def stop():
-            """Stop listening for jobs"""
-            connection.add_callback_threadsafe(_stop)
-
-        def _stop():
-            channel.stop_consuming()
-            channel.close()
-            connection.close()
+    async def get_snapshot(self) -> dict[str, str]:
+        """
+        Get states of all nodes in the subtree, all children are asked at once and each of them aggregates the states of
+        its own subtree, so the snapshot takes one get interval plus one hop per level
 
-        queue_name = 'rpc_queue:' + utils.get_bounding_key(self.address.get_port())
+        :return: state of every reachable node in the subtree e.g. {'2': 'Running', '2.1': 'Running'}
+        """
+        own_state, *subtrees = await asyncio.gather(self.get_current_state(),
+                                                    *[self.get_child_snapshot(child_id) for child_id in self.children])
+        snapshot = {self.id: own_state}
+        for subtree in subtrees:
+            snapshot.update(subtree)
+        return snapshot
+
+    async def get_child_snapshot(self, child_id: str) -> dict[str, str]:
+        """
+        Get states of all nodes in the subtree of the child using transport selected in configuration.yaml
 
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host=configuration['URL']['address']))
+        :param child_id: child id
+        :return: state of every node in the subtree of the child, empty if the child is not reachable
+        """
+        global state_client
+        if self.host and self.host.is_local(child_id):
+            return await self.host.nodes[child_id].get_snapshot()
+        if configuration['architecture'] == 'REST':
+            return await client.get_snapshot(NodeAddress(addresses.get_address(child_id)).get_full_address())
+        if state_client is None:
+            state_client = rpc_client.AsyncStateRpcClient()
+        return await state_client.get_snapshot(child_id)
+
+    async def reply_state(self, channel, body, envelope, properties, limit: asyncio.Semaphore) -> None:
+        """
+        Reply to get_state or get_snapshot request received in rpc_queue:<id> and acknowledge it once the reply is
+        published, invalid requests are rejected
+
+        :param channel: rpc server channel
+        :param body: received white envelope
+        :param envelope: delivery information
+        :param properties: request properties with reply_to queue and correlation_id
+        :param limit: bounds number of requests processed at once
+        :return: None
+        """
+        request = utils.decode_record(body, ['white'])
+        if not request or request.action not in ['get_state', 'get_snapshot']:
+            await channel.basic_client_nack(envelope.delivery_tag, requeue=False)
+            return
+        # reply in the envelope version of the request
+        version = utils.get_envelope_version(body)
+        async with limit:
+            if request.action == 'get_snapshot':
+                snapshot = await self.get_snapshot()
+                response = utils.get_blue_envelope(snapshot[self.id], snapshot, version)
+            else:
+                response = utils.get_blue_envelope(await self.get_current_state(), version=version)
+        if isinstance(response, str):
+            response = response.encode()
+        if configuration['debug']:
+            print('Returning current state: ' + str(response) + ' of node ' + self.id)
+        await channel.basic_publish(response, exchange_name='', routing_key=properties.reply_to,
+                                    properties={'correlation_id': properties.correlation_id})
+        await channel.basic_client_ack(envelope.delivery_tag)
 
-        channel = connection.channel()
 
-        channel.queue_declare(queue=queue_name, auto_delete=True)
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(queue=queue_name, on_message_callback=self.on_request)
+async def serve_get_state(nodes: list[Node]) -> None:
+    """
+    Run asynchronous rpc server to respond on get_state requests of all given nodes on the running loop. Requests are
+    processed concurrently, rabbitmq.rpc_server.prefetch limits number of unacknowledged requests and
+    rabbitmq.rpc_server.concurrency number of requests processed at once.
 
+    :param nodes: nodes served by this rpc server
+    :return: None
+    """
+    protocol = await send.connect()
+    channel = await protocol.channel()
+    await channel.basic_qos(prefetch_count=configuration['rabbitmq']['rpc_server']['prefetch'])
+    limit = asyncio.Semaphore(configuration['rabbitmq']['rpc_server']['concurrency'])
+    requests: set[asyncio.Task] = set()
+
+    async def on_request(target: Node, request_channel, body, envelope, properties) -> None:
+        task = asyncio.create_task(target.reply_state(request_channel, body, envelope, properties, limit))
+        requests.add(task)
+        task.add_done_callback(requests.discard)
+
+    rpc_server = asyncio.current_task()
+    for node in nodes:
+        queue_name = 'rpc_queue:' + node.id
+        await channel.queue_declare(queue_name, auto_delete=True)
+        await channel.basic_consume(functools.partial(on_request, node), queue_name=queue_name)
+        node.kill_rpc_serer = rpc_server.cancel
         if configuration['debug']:
-            print(" [x] Awaiting RPC requests " + self.address.get_port())
-        self.kill_rpc_serer = stop
-        channel.start_consuming()
+            print(" [x] Awaiting RPC requests " + node.id)
+
+    try:
+        await channel.close_event.wait()
+    finally:
+        for task in requests:
+            task.cancel()
+        if channel.is_open:
+            try:
+                await channel.close()
+            except Exception as e:
+                print('RPC channel cannot be closed on node:' + nodes[0].id + str(e))
+
+
+# shared client asking children for snapshots of their subtrees over MOM
+state_client: 'rpc_client.AsyncStateRpcClient | None' = None
+addresses = AddressTable(configuration['REST']['addresses'])
@@ -1,10 +1,9 @@
 import asyncio
-import time
-from asyncio import AbstractEventLoop
-from datetime import datetime
+import functools
+from typing import Awaitable, Callable, Coroutine
 
-import pika
 import model
+import records
 import send
 import utils
 
@@ -13,27 +12,18 @@ NOTIFICATION_EXCHANGE = 'state_notification'
 
 configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
 node: model.Node | None = None
-loop: AbstractEventLoop | None = None
+handlers: set[asyncio.Task] = set()
 
 
-def initialised() -> None:
+async def initialised() -> None:
     """
-    Method executed when API is fully initialized, notify its parent about being redy
+    Method executed when consumer is fully initialized, notify its parent about being redy
 
     :return: None
     """
     if not node.children:
         node.state = model.State.Stopped
-    asyncio.new_event_loop().run_until_complete(send.post_state_notification(current_state=str(node.state),
-                                                                             routing_key=utils.get_bounding_key(
-                                                                                 node.get_parent().get_port()),
-                                                                             sender_id=utils.get_bounding_key(
-                                                                                 node.address.get_port())))
-
-
-def get_state() -> dict[str, str]:
-    time.sleep(configuration['node']['time']['get'])
-    return {"State": str(node.state)}
+    await node.report_state()
 
 
 async def change_state(start_argument: float = None, stop: bool = False) -> None:
@@ -44,125 +34,165 @@ async def change_state(start_argument: float = None, stop: bool = False) -> None
     :param stop: any non None input means stop
     :return: None
     """
-    if node.state == model.State.Error:
-        return
-    if start_argument is not None and node.state == model.State.Stopped:
-        await node.set_state(model.State.Running, start_argument, configuration['node']['time']['starting'])
-    elif stop and node.state == model.State.Running:
-        await node.set_state(model.State.Stopped)
-    elif configuration['debug']:
-        print('Wrong operation! Node remains in : %r' % str(node.state))
-    if configuration['debug']:
-        now = datetime.now()
-        new_state = 'State.Running' if start_argument is not None else 'State.Stopped'
-        print("Node " + node.address.get_port() + " received " + new_state + " at " + now.strftime(" %H:%M:%S"))
+    await node.process_state_change(start_argument, stop)
 
 
-async def notify(state: str = None, sender_port: int = None, time_stamp: float = 0) -> None:
+async def notify(state: str = None, sender_id: str = None, time_stamp: float = 0) -> None:
     """
     Child current state notification that is recursively propagating to the root and updating states on the way
 
     :param state: state of the child that sent notification
-    :param sender_port: child's address
+    :param sender_id: child's id
     :param time_stamp: when was notification issued
     :return: None
     """
-    notification_needed = False
-    if state and node.children[sender_port][1] <= time_stamp:
-        try:
-            node.children[sender_port] = (model.State[state.split('.')[-1]], time_stamp)
-            notification_needed = node.update_state()
-        except KeyError:
-            if configuration['debug']:
-                print('Invalid notification! Node remains in : %r' % str(node.state))
-    else:
-        print('Message is being ignored { state: ' + str(state) + ', sender: ' + str(sender_port) + ', timestamp: ' +
-              str(time_stamp) + '}')
+    await node.process_notification(state, sender_id, time_stamp)
 
-    if node.get_parent().address is None:
-        return
-    if notification_needed:
-        await send.post_state_notification(current_state=str(node.state),
-                                           routing_key=utils.get_bounding_key(node.get_parent().get_port()),
-                                           sender_id=utils.get_bounding_key(node.address.get_port()))
 
+def get_handler(target: model.Node, routing_key: str, body) -> Coroutine | None:
+    """
+    Decode received envelope into the coroutine processing it by the target node
 
-def callback(_ch, method, _properties, body):
-    message = utils.exception_filter(lambda: utils.get_dict_from_envelope(body, ['orange', 'red']))
+    :param target: node that owns the queue where the message arrived
+    :param routing_key: routing key of the delivered message
+    :param body: received envelope
+    :return: coroutine handling the message or None if the envelope is invalid
+    """
+    message = utils.decode_record(body, ['orange', 'red', 'purple'])
     if not message:
-        return
-    if message['type'] == 'Notification':
+        return None
+    if configuration['debug']:
+        print("Node %r received message: %r" % (routing_key, message))
+    if isinstance(message, records.Notification):
         # notification
-        sender_id = utils.get_port(message['sender'])
-        current_state = message['toState']
-        time_stamp = message['time_stamp']
-        asyncio.run_coroutine_threadsafe(notify(current_state, int(sender_id), time_stamp), loop)
-    elif message['type'] == 'Input':
+        return target.process_notification(message.state, message.sender, message.time_stamp)
+    elif isinstance(message, records.Notifications):
+        # notifications of several children
+        return target.process_notifications(message.notifications)
+    elif isinstance(message, records.Input):
         # change state
         start_state: float | None = None
         stop_state: bool | None = None
-        if message['name'] == 'Running':
-            start_state = message['parameters']['chance_to_fail']
-        elif message['name'] == 'Stopped':
+        if message.state == 'Running':
+            start_state = message.chance_to_fail
+        elif message.state == 'Stopped':
             stop_state = True
-        asyncio.run_coroutine_threadsafe(change_state(start_argument=start_state, stop=stop_state), loop)
-    if configuration['debug']:
-        print("Node %r received message: %r" % (method.routing_key, message))
+        # subtree broadcast reaches all descendants at once, so it is not propagated any further
+        propagate = not routing_key.endswith('.subtree')
+        return target.process_state_change(start_argument=start_state, stop=stop_state, propagate=propagate)
+    return None
 
 
-def run(created_node: model.Node, async_loop: AbstractEventLoop) -> None:
+def get_binding_keys(consumer_node: model.Node) -> list[str]:
+    """
+    Compute binding keys of the node queue in the state exchange based on rabbitmq.broadcast in configuration.yaml:
+    - none: only own id
+    - children: own id and broadcast of the parent (<parent_id>.children)
+    - subtree: own id and broadcast of all ancestors (<ancestor_id>.subtree)
+
+    :param consumer_node: node owning the queue
+    :return: list of binding keys
+    """
+    binding_keys = [consumer_node.id]
+    broadcast = configuration['rabbitmq']['broadcast']
+    ancestor_id = consumer_node.parent_id
+    while ancestor_id and broadcast != 'none':
+        binding_keys.append(ancestor_id + '.' + broadcast)
+        ancestor_id = utils.get_parent_id(ancestor_id) if broadcast == 'subtree' else None
+    return binding_keys
+
+
+async def run(created_node: model.Node) -> None:
     """
     Run rabbitmq consumer -> proces all messages received in queue
 
     :param created_node: related node
-    :param async_loop: infinite loop
     :return: None
     """
-    global node, loop
-    loop = async_loop
+    global node
     node = created_node
-    binding_key = utils.get_bounding_key(node.address.get_port())
-    connection = pika.BlockingConnection(
-        pika.ConnectionParameters(host=configuration['URL']['address']))
-    channel = connection.channel()
+    await consume([created_node], initialised)
+
+
+async def consume(nodes: list[model.Node], on_ready: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run rabbitmq consumer for all given nodes on the running loop -> proces all messages received in their queues.
+    Consumer uses own channel of the connection shared with the publisher, messages are acknowledged once they are
+    processed by the node and rabbitmq.prefetch limits number of unacknowledged messages.
 
-    channel.exchange_declare(exchange=STATE_EXCHANGE, exchange_type='topic')
-    channel.exchange_declare(exchange=NOTIFICATION_EXCHANGE, exchange_type='topic')
+    :param nodes: nodes whose queues are consumed
+    :param on_ready: executed once all queues are bound and consuming started
+    :return: None
+    """
+    protocol = await send.connect()
+    channel = await protocol.channel()
+    await channel.basic_qos(prefetch_count=configuration['rabbitmq']['prefetch'])
+    await channel.exchange_declare(exchange_name=STATE_EXCHANGE, type_name='topic')
+    await channel.exchange_declare(exchange_name=NOTIFICATION_EXCHANGE, type_name='topic')
 
-    queue_name = 'topic_queue:' + utils.get_bounding_key(node.address.get_port())
-    result = channel.queue_declare(queue_name, exclusive=True)
-    queue_name = result.method.queue
+    consumer = asyncio.current_task()
+    for consumer_node in nodes:
+        queue_name = 'topic_queue:' + consumer_node.id
+        await channel.queue_declare(queue_name, exclusive=True)
 
-    channel.queue_bind(exchange=STATE_EXCHANGE, queue=queue_name, routing_key=binding_key)
-    channel.queue_bind(exchange=NOTIFICATION_EXCHANGE, queue=queue_name, routing_key=binding_key)
+        for state_key in get_binding_keys(consumer_node):
+            await channel.queue_bind(queue_name, STATE_EXCHANGE, state_key)
+        await channel.queue_bind(queue_name, NOTIFICATION_EXCHANGE, consumer_node.id)
 
-    initialised()
+        await channel.basic_consume(functools.partial(on_message, consumer_node), queue_name=queue_name)
+        consumer_node.kill_consumer = consumer.cancel
+
+    await on_ready()
     if configuration['debug']:
-        print(binding_key + ' - initialized')
-
-    def stop():
-        """Stop listening for jobs"""
-        connection.add_callback_threadsafe(_stop)
-
-    def _stop():
-        try:
-            channel.stop_consuming()
-        except Exception as e:
-            print('Channel cannot stop consuming on node:' + node.address.get_port() + str(e))
-        try:
-            channel.close()
-        except Exception as e:
-            print('Channel cannot be closed on node:' + node.address.get_port() + str(e))
-        try:
-            connection.close()
-        except Exception as e:
-            print('Connection cannot be closed on node:' + node.address.get_port() + str(e))
-
-    node.kill_consumer = stop
-
-    channel.basic_consume(
-        queue=queue_name, on_message_callback=callback, auto_ack=True)
-
-    node.channel_tag = queue_name
-    node.channel = channel
-    channel.start_consuming()
+        for consumer_node in nodes:
+            print(consumer_node.id + ' - initialized')
+
+    try:
+        await channel.close_event.wait()
+    finally:
+        if channel.is_open:
+            try:
+                await channel.close()
+            except Exception as e:
+                print('Channel cannot be closed on node:' + nodes[0].id + str(e))
+
+
+async def on_message(target: model.Node, channel, body, envelope, _properties) -> None:
+    """
+    Hand over received message to the target node as a task which acknowledges it once it is processed, invalid
+    messages are rejected
+
+    :param target: node that owns the queue where the message arrived
+    :param channel: consumer channel
+    :param body: received envelope
+    :param envelope: delivery information
+    :param _properties: message properties
+    :return: None
+    """
+    handler = get_handler(target, envelope.routing_key, body)
+    if handler:
+        task = asyncio.create_task(handle(handler, channel, envelope.delivery_tag))
+        handlers.add(task)
+        task.add_done_callback(handlers.discard)
+    else:
+        await channel.basic_client_nack(envelope.delivery_tag, requeue=False)
+
+
+async def handle(handler: Coroutine, channel, delivery_tag: int) -> None:
+    """
+    Process the message by the node and acknowledge it afterwards. Message whose processing failed is rejected without
+    requeue, cancelled processing is not acknowledged, so the broker delivers the message again once the channel is
+    closed.
+
+    :param handler: coroutine processing the message
+    :param channel: consumer channel
+    :param delivery_tag: delivery tag of the message
+    :return: None
+    """
+    try:
+        await handler
+    except Exception as e:
+        print('Message cannot be processed: ' + str(e))
+        await channel.basic_client_nack(delivery_tag, requeue=False)
+        return
+    await channel.basic_client_ack(delivery_tag)
@@ -0,0 +1,67 @@
+class Notification:
+    """
+    Content of the red envelope - current state of the child node
+    """
+    __slots__ = ('state', 'sender', 'time_stamp')
+
+    def __init__(self, state: str, sender: str, time_stamp: float):
+        self.state = state
+        self.sender = sender
+        self.time_stamp = time_stamp
+
+    def __repr__(self):
+        return 'Notification(state=%r, sender=%r, time_stamp=%r)' % (self.state, self.sender, self.time_stamp)
+
+
+class Notifications:
+    """
+    Content of the purple envelope - current states of several children of the same parent
+    """
+    __slots__ = ('notifications',)
+
+    def __init__(self, notifications: list[Notification]):
+        self.notifications = notifications
+
+    def __repr__(self):
+        return 'Notifications(%r)' % self.notifications
+
+
+class Input:
+    """
+    Content of the orange envelope - requested state of the node
+    """
+    __slots__ = ('state', 'chance_to_fail')
+
+    def __init__(self, state: str, chance_to_fail: float):
+        self.state = state
+        self.chance_to_fail = chance_to_fail
+
+    def __repr__(self):
+        return 'Input(state=%r, chance_to_fail=%r)' % (self.state, self.chance_to_fail)
+
+
+class Request:
+    """
+    Content of the white envelope - action requested from rpc server
+    """
+    __slots__ = ('action',)
+
+    def __init__(self, action: str):
+        self.action = action
+
+    def __repr__(self):
+        return 'Request(action=%r)' % self.action
+
+
+class Reply:
+    """
+    Content of the blue envelope - state of the node and states of its subtree (reply to get_snapshot)
+    """
+    __slots__ = ('state', 'states')
+
+    def __init__(self, state: str, states: dict[str, str] | None = None):
+        self.state = state
+        self.states = states
+
+    def __repr__(self):
+        return 'Reply(state=%r, states=%r)' % (self.state, self.states)
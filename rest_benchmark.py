@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import aiohttp
+from starlette.requests import Request
+
+import model
+import server
+import utils
+from model import State
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+BLOCKING_PATH = '/blocking' + configuration['URL']['get_state']
+
+
+def blocking_get_state(request: Request) -> dict[str, str]:
+    """
+    Original get_state endpoint, the simulated delay occupies one thread of the server threadpool
+
+    :param request: received request
+    :return: node state
+    """
+    time.sleep(server.configuration['node']['time']['get'])
+    return {"State": str(server.get_node(request).state)}
+
+
+async def shutdown(broker_disconnect: bool = True) -> None:
+    pass
+
+
+def serve() -> None:
+    """
+    Serve one Stopped node with both the original and the asynchronous get_state endpoint
+
+    :return: None
+    """
+    server.app.get(BLOCKING_PATH)(blocking_get_state)
+    node = model.Node('2')
+    node.state = State.Stopped
+    server.run(node, shutdown=shutdown)
+
+
+def get_url(path: str) -> str:
+    """
+    Full URL of the endpoint of the benchmarked node
+
+    :param path: endpoint path
+    :return: URL
+    """
+    return configuration['URL']['protocol'] + configuration['URL']['address'] + ':' + \
+        str(model.Node('2').address.get_port()) + path
+
+
+async def poll(session: aiohttp.ClientSession, url: str, deadline: float, latencies: list[float]) -> None:
+    """
+    Request the state repeatedly until the deadline
+
+    :param session: client session
+    :param url: get_state endpoint
+    :param deadline: time when no more requests are sent
+    :param latencies: durations of all finished requests
+    :return: None
+    """
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with session.get(url) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - start)
+
+
+async def measure(path: str, pollers: int, duration: float) -> (float, float):
+    """
+    Measure throughput and latency of the endpoint under load of concurrent pollers
+
+    :param path: get_state endpoint path
+    :param pollers: number of clients polling the state at the same time
+    :param duration: seconds of polling
+    :return: requests per second and 99th percentile of latency in seconds
+    """
+    url = get_url(path)
+    latencies = []
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0), timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*[poll(session, url, start + duration, latencies) for _ in range(pollers)])
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[int(len(latencies) * 0.99)]
+
+
+async def wait_for_server(path: str) -> None:
+    """
+    Wait until the server accepts requests
+
+    :param path: get_state endpoint path
+    :return: None
+    """
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(get_url(path)) as response:
+                    await response.read()
+                    return
+            except aiohttp.ClientConnectorError:
+                await asyncio.sleep(0.1)
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python rest_benchmark.py --pollers 10 100 500 --get 0.1 --duration 5`
+
+    :return: object having 3 attributes:
+        -pollers: list of numbers of concurrent pollers
+        -get: simulated duration of get_state in seconds
+        -duration: seconds of polling for each measurement
+    """
+    parser = argparse.ArgumentParser(description='Measure get_state requests per second and latency of REST node.')
+    parser.add_argument('--pollers', dest='pollers', action='store', type=int, nargs='+', default=[10, 100, 500],
+                        help='numbers of clients polling the state at the same time')
+    parser.add_argument('--get', dest='get', action='store', type=float, default=0.1,
+                        help='simulated duration of get_state in seconds')
+    parser.add_argument('--duration', dest='duration', action='store', type=float, default=5,
+                        help='seconds of polling for each measurement')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    server.configuration['node']['time']['get'] = arguments.get
+    server.configuration['debug'] = False
+    model.configuration['debug'] = False
+    process = multiprocessing.Process(target=serve)
+    process.start()
+    try:
+        asyncio.run(wait_for_server(configuration['URL']['get_state']))
+        print('| Pollers | Thread [req/s] | Thread p99 [s] | Asyncio [req/s] | Asyncio p99 [s] |')
+        print('|--------:|---------------:|---------------:|----------------:|----------------:|')
+        for pollers in arguments.pollers:
+            thread = asyncio.run(measure(BLOCKING_PATH, pollers, arguments.duration))
+            concurrent = asyncio.run(measure(configuration['URL']['get_state'], pollers, arguments.duration))
+            print('| %7d | %14.1f | %14.2f | %15.1f | %15.2f |' % (pollers, *thread, *concurrent))
+    finally:
+        process.terminate()
+        process.join()
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import model
+import utils
+from model import State
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+class BlockingChannelStub:
+    """
+    Replaces pika channel of the original rpc server, replies are dropped
+    """
+
+    def basic_publish(self, exchange, routing_key, properties, body):
+        pass
+
+    def basic_ack(self, delivery_tag):
+        pass
+
+
+class AsyncChannelStub:
+    """
+    Replaces aioamqp channel of the asynchronous rpc server, replies are dropped
+    """
+
+    async def basic_publish(self, payload, exchange_name, routing_key, properties=None):
+        pass
+
+    async def basic_client_ack(self, delivery_tag):
+        pass
+
+    async def basic_client_nack(self, delivery_tag, requeue=True):
+        pass
+
+
+class DeliveryStub:
+
+    def __init__(self, delivery_tag: int = 0):
+        self.delivery_tag = delivery_tag
+        self.routing_key = 'rpc_queue:2'
+        self.reply_to = 'reply_to'
+        self.correlation_id = str(delivery_tag)
+
+
+def measure_thread(requests: int) -> float:
+    """
+    Measure throughput of the original rpc server which processes one request at a time (prefetch_count=1)
+
+    :param requests: number of outstanding get_state requests
+    :return: requests per second
+    """
+    node = model.Node('2')
+    node.state = State.Running
+    body = utils.get_white_envelope('get_state')
+    channel = BlockingChannelStub()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(requests):
+            node.on_request(channel, DeliveryStub(i), DeliveryStub(i), body)
+    return requests / (time.perf_counter() - start)
+
+
+async def measure_async(requests: int, concurrency: int) -> float:
+    """
+    Measure throughput of the asynchronous rpc server processing requests concurrently
+
+    :param requests: number of outstanding get_state requests
+    :param concurrency: maximum number of requests processed at once
+    :return: requests per second
+    """
+    node = model.Node('2')
+    node.state = State.Running
+    body = utils.get_white_envelope('get_state')
+    channel = AsyncChannelStub()
+    limit = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*[node.reply_state(channel, body, DeliveryStub(i), DeliveryStub(i), limit)
+                           for i in range(requests)])
+    return requests / (time.perf_counter() - start)
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python rpc_benchmark.py --requests 10 100 1000 --get 0.01 --concurrency 100`
+
+    :return: object having 3 attributes:
+        -requests: list of numbers of outstanding get_state requests
+        -get: simulated duration of get_state in seconds
+        -concurrency: maximum number of requests processed at once by the asynchronous server
+    """
+    parser = argparse.ArgumentParser(description='Measure get_state requests per second of one node.')
+    parser.add_argument('--requests', dest='requests', action='store', type=int, nargs='+',
+                        default=[10, 100, 1000], help='numbers of outstanding get_state requests')
+    parser.add_argument('--get', dest='get', action='store', type=float, default=0.01,
+                        help='simulated duration of get_state in seconds')
+    parser.add_argument('--concurrency', dest='concurrency', action='store', type=int,
+                        default=configuration['rabbitmq']['rpc_server']['concurrency'],
+                        help='maximum number of requests processed at once by the asynchronous server')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    model.configuration['node']['time']['get'] = arguments.get
+    model.configuration['debug'] = False
+    print('| Requests | Thread [req/s] | Asyncio [req/s] | Speedup |')
+    print('|---------:|---------------:|----------------:|--------:|')
+    for outstanding in arguments.requests:
+        thread = measure_thread(outstanding)
+        concurrent = asyncio.run(measure_async(outstanding, arguments.concurrency))
+        print('| %8d | %14.1f | %15.1f | %6.0fx |' % (outstanding, thread, concurrent, concurrent / thread))
@@ -1,13 +1,15 @@
+import asyncio
 import json
 import sys
 
 import pika
 import uuid
 
+import send
 import utils
 from utils import get_configuration
 
-# NODE_ROUTING_KEY = sys.argv[1] if len(sys.argv) > 1 else '2.1.0.0.0'
+# NODE_ROUTING_KEY = sys.argv[1] if len(sys.argv) > 1 else '2.1'
 
 configuration: dict[str, str | dict[str, str | dict]] = get_configuration()
 
@@ -66,6 +68,112 @@ class StateRpcClient(object):
         return self.response
 
 
+class AsyncStateRpcClient:
+    """
+    Asynchronous rpc client keeping one channel and one reply queue for all requests. Replies are matched to requests
+    by correlation id, so any number of get_state calls can wait for the reply at the same time.
+    """
+
+    def __init__(self):
+        self.channel = None
+        self.callback_queue: str | None = None
+        self.pending: dict[str, asyncio.Future] = dict()
+        self.lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        """
+        Open channel of the connection shared by the process and start consuming the reply queue if not open yet
+
+        :return: None
+        """
+        async with self.lock:
+            if self.channel and self.channel.is_open:
+                return
+            protocol = await send.connect()
+            self.channel = await protocol.channel()
+            result = await self.channel.queue_declare(exclusive=True)
+            self.callback_queue = result['queue']
+            await self.channel.basic_consume(self.on_response, queue_name=self.callback_queue, no_ack=True)
+
+    async def on_response(self, _channel, body, _envelope, properties) -> None:
+        """
+        Process received reply from rpc server and hand it over to the waiting call
+
+        :param _channel:
+        :param body: blue envelope
+        :param _envelope:
+        :param properties: reply properties with correlation_id
+        :return: None
+        """
+        future = self.pending.pop(properties.correlation_id, None)
+        if future and not future.done():
+            future.set_result(utils.decode_envelope(body, ['blue']))
+
+    async def call(self, routing_key: str, timeout: float | None = None, action: str = 'get_state') -> dict | None:
+        """
+        Sends get_state request to rpc server and wait for the reply
+
+        :param routing_key: rpc server ID
+        :param timeout: seconds to wait for the reply, rabbitmq.rpc_timeout by default
+        :param action: requested action get_state or get_snapshot
+        :return: reply of the node e.g. {'state': 'Running'} or None if it did not arrive in time
+        """
+        if timeout is None:
+            timeout = configuration['rabbitmq']['rpc_timeout']
+        await self.open()
+        correlation_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self.pending[correlation_id] = future
+        request = utils.get_white_envelope(action)
+        if isinstance(request, str):
+            request = request.encode()
+        try:
+            await self.channel.basic_publish(request, exchange_name='', routing_key='rpc_queue:' + routing_key,
+                                             properties={'reply_to': self.callback_queue,
+                                                         'correlation_id': correlation_id})
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.pending.pop(correlation_id, None)
+
+    async def gather_states(self, routing_keys: list[str], timeout: float | None = None) -> dict[str, str | None]:
+        """
+        Request states of all given nodes at once
+
+        :param routing_keys: rpc server IDs
+        :param timeout: seconds to wait for all replies, rabbitmq.rpc_timeout by default
+        :return: state of every node or None if its reply did not arrive in time
+        """
+        replies = await asyncio.gather(*[self.call(routing_key, timeout) for routing_key in routing_keys])
+        return {routing_key: reply['state'] if reply else None for routing_key, reply in zip(routing_keys, replies)}
+
+    async def get_snapshot(self, routing_key: str, timeout: float | None = None) -> dict[str, str]:
+        """
+        Request states of all nodes in the subtree of given node, the subtree is aggregated by the nodes themselves
+
+        :param routing_key: rpc server ID of the subtree root
+        :param timeout: seconds to wait for the reply, rabbitmq.rpc_timeout by default
+        :return: state of every node in the subtree e.g. {'2': 'Running', '2.1': 'Running'}, empty if no reply arrived
+        """
+        reply = await self.call(routing_key, timeout, 'get_snapshot')
+        if not reply:
+            return dict()
+        return reply.get('states', {routing_key: reply['state']})
+
+    async def close(self) -> None:
+        """
+        Close the channel, all waiting calls are cancelled
+
+        :return: None
+        """
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        if self.channel and self.channel.is_open:
+            await self.channel.close()
+
+
 # get_state = StateRpcClient()
 #
 # print(" [->] Requesting state from node " + NODE_ROUTING_KEY)
@@ -1,7 +1,10 @@
 import asyncio
+import collections
+import functools
 
 import aioamqp
 
+import records
 import utils
 
 STATE_EXCHANGE = 'state_change'
@@ -12,16 +15,206 @@ configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration(
 channel = None
 transport = None
 protocol = None
+publisher = None
+watcher: asyncio.Task | None = None
+channel_lock: asyncio.Lock | None = None
+connection_lock: asyncio.Lock | None = None
+# counters of published messages exposed for monitoring
+statistics: collections.Counter[str] = collections.Counter()
+
+
+class Publisher:
+    """
+    Batching publisher with asynchronous publisher confirms.
+
+    Messages pushed during one iteration of the event loop are written to the channel together by one flush task.
+    When confirms are enabled (rabbitmq.publisher.confirms) up to `window` messages can wait for the broker
+    confirmation at the same time, acknowledgements (including multiple ones) resolve the waiting messages while
+    negative acknowledgements and missing confirmations are reported. Message whose waiting was cancelled (e.g. by a
+    timeout) no longer occupies the window.
+    """
+
+    def __init__(self, amqp_channel, confirms: bool, window: int):
+        self.channel = amqp_channel
+        self.confirms: bool = confirms
+        self.window: int = window
+        self.pending: collections.deque[tuple[str, str, bytes, asyncio.Future]] = collections.deque()
+        self.unconfirmed: dict[int, asyncio.Future] = dict()
+        self.delivery_tag: int = 0
+        self.flushing: bool = False
+        self.flush_task: asyncio.Task | None = None
+        self.window_open: asyncio.Event = asyncio.Event()
+        self.window_open.set()
+        if confirms:
+            # aioamqp resolves only single acknowledgements, confirmations are tracked here instead
+            amqp_channel.basic_server_ack = self.on_ack
+            amqp_channel.basic_server_nack = self.on_nack
+
+    def push(self, exchange_name: str, routing_key: str, payload: bytes) -> asyncio.Future:
+        """
+        Queue message for the next flush
+
+        :param exchange_name: exchange name
+        :param routing_key: recipient queue id
+        :param payload: encoded message
+        :return: future resolved once the message is confirmed by the broker (or written if confirms are disabled)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((exchange_name, routing_key, payload, future))
+        if not self.flushing:
+            # flush starts in the next iteration of the loop, so all messages pushed until then are written together
+            self.flushing = True
+            self.flush_task = asyncio.create_task(self.flush())
+        return future
+
+    async def flush(self) -> None:
+        """
+        Write all queued messages to the channel, wait whenever the window of unconfirmed messages is full
+
+        :return: None
+        """
+        try:
+            while self.pending:
+                if self.confirms:
+                    await self.window_open.wait()
+                    if not self.pending:
+                        # channel was closed meanwhile
+                        break
+                exchange_name, routing_key, payload, future = self.pending.popleft()
+                if future.done():
+                    # sender stopped waiting meanwhile
+                    continue
+                try:
+                    await self.channel.basic_publish(payload=payload, exchange_name=exchange_name,
+                                                     routing_key=routing_key)
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                statistics['published'] += 1
+                if self.confirms:
+                    self.delivery_tag += 1
+                    self.unconfirmed[self.delivery_tag] = future
+                    future.add_done_callback(functools.partial(self.discard, self.delivery_tag))
+                    if len(self.unconfirmed) >= self.window:
+                        self.window_open.clear()
+                else:
+                    future.set_result(True)
+        finally:
+            self.flushing = False
+
+    def resolve(self, delivery_tag: int, multiple: bool, confirmed: bool) -> None:
+        """
+        Resolve messages confirmed by the broker
+
+        :param delivery_tag: confirmed delivery tag
+        :param multiple: whether all messages up to the delivery tag are confirmed
+        :param confirmed: True for ack, False for nack
+        :return: None
+        """
+        tags = [tag for tag in self.unconfirmed if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in tags:
+            future = self.unconfirmed.pop(tag, None)
+            if future is None or future.done():
+                continue
+            if confirmed:
+                statistics['confirmed'] += 1
+                future.set_result(True)
+            else:
+                statistics['nacked'] += 1
+                future.set_exception(aioamqp.PublishFailed(tag))
+        if len(self.unconfirmed) < self.window:
+            self.window_open.set()
+
+    def discard(self, delivery_tag: int, future: asyncio.Future) -> None:
+        """
+        Stop waiting for the confirmation of the message which is no longer awaited (cancelled by the timeout) and
+        release its place in the window
+
+        :param delivery_tag: delivery tag of the message
+        :param future: resolved, failed or cancelled future of the message
+        :return: None
+        """
+        if self.unconfirmed.get(delivery_tag) is future:
+            del self.unconfirmed[delivery_tag]
+            if len(self.unconfirmed) < self.window:
+                self.window_open.set()
+
+    def close(self, exception: Exception) -> None:
+        """
+        Fail all queued and unconfirmed messages once the channel is closed, the broker will not confirm them anymore
+
+        :param exception: exception set to every waiting message
+        :return: None
+        """
+        futures = [future for _, _, _, future in self.pending] + list(self.unconfirmed.values())
+        self.pending.clear()
+        self.unconfirmed = dict()
+        # delivery tags are numbered from 1 on every channel
+        self.delivery_tag = 0
+        self.window_open.set()
+        for future in futures:
+            if not future.done():
+                future.set_exception(exception)
+
+    async def on_ack(self, frame) -> None:
+        """
+        Resolve messages acknowledged by the broker
+
+        :param frame: basic.ack frame
+        :return: None
+        """
+        self.resolve(frame.delivery_tag, frame.multiple, True)
+
+    async def on_nack(self, frame) -> None:
+        """
+        Fail messages negatively acknowledged by the broker
+
+        :param frame: basic.nack frame
+        :return: None
+        """
+        self.resolve(frame.delivery_tag, frame.multiple, False)
+
+    async def watch(self) -> None:
+        """
+        Fail all waiting messages once the channel of the publisher is closed
+
+        :return: None
+        """
+        await self.channel.close_event.wait()
+        self.close(aioamqp.ChannelClosed())
+
+
+async def connect():
+    """
+    Open connection to the broker shared by the publisher and all consumers of this process
+
+    :return: aioamqp protocol of the connection
+    """
+    global transport, protocol, connection_lock
+    if connection_lock is None:
+        connection_lock = asyncio.Lock()
+    async with connection_lock:
+        if not protocol:
+            try:
+                transport, protocol = await aioamqp.connect(host=configuration['URL']['address'], port=5672,
+                                                            login='guest', password='guest')
+            except aioamqp.AmqpClosedConnection:
+                print('Connection is closed!')
+    return protocol
 
 
 async def open_chanel() -> None:
-    global channel, transport, protocol
-    try:
-        transport, protocol = await aioamqp.connect(host=configuration['URL']['address'], port=5672, login='guest',
-                                                    password='guest')
-    except aioamqp.AmqpClosedConnection:
-        print('Connection is closed!')
+    global channel, publisher, watcher
+    await connect()
+    if publisher:
+        # messages of the previous channel will never be confirmed
+        publisher.close(aioamqp.ChannelClosed())
     channel = await protocol.channel()
+    confirms = configuration['rabbitmq']['publisher']['confirms']
+    if confirms:
+        await channel.confirm_select()
+    publisher = Publisher(channel, confirms, configuration['rabbitmq']['publisher']['window'])
+    watcher = asyncio.create_task(publisher.watch())
     if configuration['debug']:
         print('Channel created!')
 
@@ -44,23 +237,33 @@ async def close_channel() -> None:
 
 async def push_message(exchange_name, routing_key, message) -> None:
     """
-    Push message to the broker asynchronously
+    Push message to the broker asynchronously, messages pushed at the same time are published together and the
+    function returns once the broker confirmed the message
 
     :param exchange_name: exchange name
     :param routing_key: recipient queue id
-    :param message: string message
+    :param message: string or already serialized message
     :return: None
     """
-    if not channel:
-        await open_chanel()
+    global channel_lock
+    if not channel or not channel.is_open:
+        if channel_lock is None:
+            channel_lock = asyncio.Lock()
+        async with channel_lock:
+            if not channel or not channel.is_open:
+                await open_chanel()
 
+    payload = message.encode('utf-8') if isinstance(message, str) else message
     try:
-        await channel.basic_publish(
-            payload=message.encode('utf-8'),
-            exchange_name=exchange_name,
-            routing_key=routing_key
-        )
+        await asyncio.wait_for(publisher.push(exchange_name, routing_key, payload),
+                               configuration['rabbitmq']['publisher']['timeout'])
+    except asyncio.TimeoutError:
+        statistics['unconfirmed'] += 1
+        print('Message was not confirmed by the broker: %r -> %r' % (message, routing_key))
+    except aioamqp.PublishFailed:
+        print('Message was rejected by the broker: %r -> %r' % (message, routing_key))
     except Exception as e:
+        statistics['failed'] += 1
         print(str(e))
         print('message: ' + str(message))
 
@@ -94,6 +297,17 @@ async def post_state_notification(current_state: str, routing_key: str, sender_i
     await send_message(utils.get_red_envelope(raw_state, sender_id), routing_key, NOTIFICATION_EXCHANGE)
 
 
+async def post_state_notifications(notifications: list[records.Notification], routing_key: str) -> None:
+    """
+    Update parent about current states of several children in one message
+
+    :param notifications: current state, sender id and time stamp of every child
+    :param routing_key: parent_id
+    :return: None
+    """
+    await send_message(utils.get_purple_envelope(notifications), routing_key, NOTIFICATION_EXCHANGE)
+
+
 async def send_message(message: str | bytes, routing_key: str, exchange_name: str) -> None:
     """
     Transfer message to the destination node's queue using exchange and routing key
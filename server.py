@@ -1,24 +1,39 @@
 import asyncio
+import functools
+import json
+import socket
 import sys
-import time
+from urllib.parse import parse_qsl
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from datetime import datetime
 
+import client
 import model
-from typing import Callable, Optional
-from client import post_notification
-from message import ChangeState, Notification, ValidationError
+import records
+import utils
+from typing import Callable, Coroutine, Optional
+from client import close_session, statistics
+from message import ChangeState, Notification, NotificationBatch, ValidationError, validate_change_state, \
+    validate_notification
 from model import Node
-from utils import get_configuration
+from utils import get_configuration, watch_configuration
 from starlette.requests import Request
 from starlette.responses import Response
 
 node: Node | None = None
+nodes: dict[int, Node] = dict()
+node_host = None
 app = FastAPI()
 configuration: dict[str, str | dict[str, str | dict]] = get_configuration()
 shutdown_handler: Callable
+reload_task: asyncio.Task | None = None
+stream_tasks: set[asyncio.Task] = set()
+# processing of frames received over the streams and ordered queues of received commands by node id
+frame_tasks: set[asyncio.Task] = set()
+command_queues: dict[str, asyncio.Queue] = dict()
+get_state_limit = asyncio.Semaphore(configuration['REST']['concurrency'])
 
 
 async def catch_exceptions_middleware(request: Request, call_next):
@@ -41,10 +56,19 @@ async def initialised() -> None:
 
     :return: None
     """
+    global reload_task
+    if configuration['reload']:
+        reload_task = asyncio.create_task(watch_configuration())
+    if configuration['REST']['stream']:
+        hosted_nodes = node_host.nodes.values() if node_host else [node]
+        await open_streams([hosted_node for hosted_node in hosted_nodes if hosted_node.parent_id and not (
+            node_host and node_host.is_local(hosted_node.parent_id))])
+    if node_host:
+        await node_host.initialise()
+        return
     if not node.children:
         node.state = model.State.Stopped
-    await post_notification(node.get_parent().get_full_address(), str(node.state),
-                            node.address.get_full_address())
+    await node.report_state()
 
 
 @app.on_event("shutdown")
@@ -54,38 +78,238 @@ async def shutdown_event() -> None:
 
     :return: None
     """
+    if reload_task:
+        reload_task.cancel()
+    for task in stream_tasks | frame_tasks:
+        task.cancel()
+    command_queues.clear()
     await shutdown_handler(False)
+    await close_session()
+
+
+async def open_streams(stream_nodes: list[Node]) -> None:
+    """
+    Open streams of the nodes to their parents served by other processes, the first notification of every node is sent
+    over its stream
+
+    :param stream_nodes: nodes whose parent is not hosted by this process
+    :return: None
+    """
+    tasks = await asyncio.gather(*[client.open_stream(stream_node.get_parent().get_full_address(), stream_node.id,
+                                                      functools.partial(receive_frame, stream_node))
+                                   for stream_node in stream_nodes])
+    stream_tasks.update(task for task in tasks if task)
+
+
+@app.websocket(configuration['URL']['stream'])
+async def stream(websocket: WebSocket) -> None:
+    """
+    Persistent stream opened by the child (REST.stream in configuration.yaml), commands to the child are sent as frames
+    over it and notifications of the child are received over it
+
+    :param websocket: accepted connection, the first frame contains id of the child
+    :return: None
+    """
+    await websocket.accept()
+    target = get_scope_node(websocket.scope)
+    address = None
+    try:
+        address = model.addresses.get_address((await websocket.receive_json())['sender'])
+        client.streams[address] = websocket.send_text
+        while True:
+            await receive_frame(target, await websocket.receive_json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if client.streams.get(address) == websocket.send_text:
+            del client.streams[address]
+
+
+async def receive_frame(target: Node, frame: dict) -> None:
+    """
+    Hand over request received as frame of the stream to the node without waiting until it is processed, so the stream
+    is read while the node propagates the request further. Commands are applied one after another by the command queue
+    of the node, other frames are processed by own tasks which update the node in the order the frames were received
+    (tasks start in the order they were created and the node is updated before the first await).
+
+    :param target: node which the stream belongs to
+    :param frame: endpoint path and attributes of the request
+    :return: None
+    """
+    if frame.get('path') == configuration['URL']['change_state']:
+        queue = command_queues.get(target.id)
+        if queue is None:
+            queue = command_queues[target.id] = asyncio.Queue()
+            start_frame_task(apply_commands(target, queue))
+        queue.put_nowait(frame)
+    else:
+        start_frame_task(process_frame(target, frame))
+
+
+def start_frame_task(coroutine: Coroutine) -> None:
+    """
+    Run processing of received frames as task cancelled on shutdown
+
+    :param coroutine: processing of the frames
+    :return: None
+    """
+    task = asyncio.create_task(coroutine)
+    frame_tasks.add(task)
+    task.add_done_callback(frame_tasks.discard)
+
+
+async def apply_commands(target: Node, queue: asyncio.Queue) -> None:
+    """
+    Apply commands received over the stream in the order they were received. Command rejected with 503 (the node is
+    still initialising) is applied again with jittered exponential backoff until REST.timeout deadline, in the same way
+    as the parent repeats the equivalent request.
+
+    :param target: node which the stream belongs to
+    :param queue: received command frames
+    :return: None
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        frame = await queue.get()
+        attempts = 0
+        deadline = loop.time() + configuration['REST']['timeout']
+        while not await process_frame(target, frame):
+            delay = client.get_backoff(attempts, False)
+            if loop.time() + delay > deadline:
+                if configuration['debug']:
+                    print(str(frame) + ' - frame cannot be applied by ' + target.id)
+                break
+            await asyncio.sleep(delay)
+            attempts += 1
+
+
+async def process_frame(target: Node, frame: dict) -> bool:
+    """
+    Process request received as frame of the stream in the same way as the equivalent HTTP request, invalid and
+    rejected frames are dropped
+
+    :param target: node which the stream belongs to
+    :param frame: endpoint path and attributes of the request
+    :return: False if the frame should be repeated (the node is not initialised yet), True otherwise
+    """
+    try:
+        handler = stream_routes.get(frame.get('path'))
+        if not handler:
+            raise ValidationError('Unknown path of the frame', frame.get('path'))
+        await handler(target, frame.get('values', {}))
+    except HTTPException as e:
+        if e.status_code == 503:
+            return False
+        if configuration['debug']:
+            print(str(frame) + ' - frame rejected with ' + str(e.status_code) + ' by ' + target.id)
+    except (ValidationError, ValueError, KeyError) as e:
+        print(str(e), file=sys.stderr)
+    return True
+
+
+def get_node(request: Request) -> Node:
+    """
+    Find node served on the port where the request arrived
+
+    :param request: received request
+    :return: addressed node
+    """
+    return get_scope_node(request.scope)
+
+
+def get_scope_node(scope: dict) -> Node:
+    """
+    Find node served on the port where the connection of the ASGI scope arrived
+
+    :param scope: ASGI connection scope
+    :return: addressed node
+    """
+    return nodes.get(scope['server'][1], node)
 
 
 @app.get(configuration['URL']['get_state'])
-def get_state() -> dict[str, str]:
-    time.sleep(configuration['node']['time']['get'])
-    return {"State": str(node.state)}
+async def get_state(request: Request) -> dict[str, str]:
+    """
+    Current state of the node after simulated delay. The delay is asyncio timer, so waiting requests do not occupy
+    threads of the server, at most REST.concurrency requests are processed at once.
+
+    :param request: received request
+    :return: node state
+    """
+    return await read_state(get_node(request))
+
+
+async def read_state(target: Node) -> dict[str, str]:
+    """
+    Current state of the node after simulated delay
+
+    :param target: addressed node
+    :return: node state
+    """
+    async with get_state_limit:
+        await asyncio.sleep(configuration['node']['time']['get'])
+        return {"State": str(target.state)}
+
+
+@app.get(configuration['URL']['snapshot'])
+async def get_snapshot(request: Request) -> dict[str, str]:
+    """
+    States of all nodes in the subtree of the node, collected by the subtree in parallel
+
+    :param request: received request
+    :return: state of every reachable node in the subtree by node id
+    """
+    return await get_node(request).get_snapshot()
+
+
+@app.get(configuration['URL']['statistics'])
+async def get_statistics() -> dict[str, int]:
+    """
+    Counters of requests sent by this process to other nodes
+
+    :return: number of requests, delivered, rejected (4xx), refused connections, other errors, retries and expired
+    """
+    return dict(statistics)
 
 
 @app.post(configuration['URL']['change_state'])
-async def change_state(state_change_command: Optional[ChangeState] = None, start: Optional[str] = None,
-                       stop: Optional[str] = None) -> model.State:
+async def change_state(request: Request, state_change_command: Optional[ChangeState] = None,
+                       start: Optional[str] = None, stop: Optional[str] = None) -> model.State:
     """
     Endpoint to change node state.
 
+    :param request: received request
     :param state_change_command: object containing validated start or stop
     :param start: probability between 0 and 1 of getting into Error state
     :param stop: any non None input means stop
     :return: node state after transition
     """
-    if configuration['debug']:
-        now = datetime.now()
-        print("Node " + node.address.get_port() + " received POST " + now.strftime(" %H:%M:%S"))
-    if node.state == model.State.Error:
-        return node.state
-
     if configuration['REST']['pydantic']:
         prompt_to_start = state_change_command.start
         prompt_to_stop = state_change_command.stop
     else:
         prompt_to_start = start
         prompt_to_stop = stop
+    return apply_state_change(get_node(request), prompt_to_start, prompt_to_stop)
+
+
+def apply_state_change(node: Node, prompt_to_start: str | None, prompt_to_stop: str | None) -> model.State:
+    """
+    Start transition of the node requested by change state command
+
+    :param node: addressed node
+    :param prompt_to_start: probability between 0 and 1 of getting into Error state
+    :param prompt_to_stop: any non None input means stop
+    :return: node state after transition
+    """
+    if configuration['debug']:
+        now = datetime.now()
+        print("Node " + node.id + " received POST " + now.strftime(" %H:%M:%S"))
+    if node.state == model.State.Error:
+        return node.state
+    if node.state == model.State.Initialisation:
+        # the node will accept the command once its subtree is initialised, so the sender retries it
+        raise HTTPException(status_code=503, detail="Node is not initialised yet!")
 
     if prompt_to_start and node.state == model.State.Stopped:
         asyncio.create_task(
@@ -98,14 +322,15 @@ async def change_state(state_change_command: Optional[ChangeState] = None, start
 
 
 @app.post(configuration['URL']['notification'])
-async def notify(notification: Optional[Notification] = None, state: Optional[str] = None,
+async def notify(request: Request, notification: Optional[Notification] = None, state: Optional[str] = None,
                  sender: Optional[str] = None, time_stamp: Optional[float] = 0) -> None:
     """
     Child current state notification that is recursively propagating to the root and updating states on the way
 
+    :param request: received request
     :param notification: object containing validated state and sender
     :param state: state of the child that sent notification
-    :param sender: child's address
+    :param sender: child's id
     :param time_stamp: time when notification was created
     :return: None
     """
@@ -115,15 +340,224 @@ async def notify(notification: Optional[Notification] = None, state: Optional[st
     else:
         received_state = state
         received_from = sender
+    await apply_notification(get_node(request), received_state, received_from, time_stamp)
 
+
+async def apply_notification(node: Node, received_state: str | None, received_from: str | None,
+                             time_stamp: float) -> None:
+    """
+    Update the child entry of the node and report the aggregated state if it changed
+
+    :param node: addressed node
+    :param received_state: state of the child that sent notification
+    :param received_from: child's id
+    :param time_stamp: time when notification was created
+    :return: None
+    """
     state_changed = False
     if received_state:
-        node.children[int(received_from.split(':')[-1])] = (model.State[received_state.split('.')[-1]], time_stamp)
+        node.children[received_from] = (model.State[received_state.split('.')[-1]], time_stamp)
         state_changed = node.update_state()
-    if node.get_parent().address is None:
+    if state_changed or node.coalescing:
+        await node.report_state()
+
+
+@app.post(configuration['URL']['notification_batch'])
+async def notify_batch(request: Request, batch: Optional[NotificationBatch] = None, state: list[str] = Query([]),
+                       sender: list[str] = Query([]), time_stamp: list[float] = Query([])) -> None:
+    """
+    Current states of several children in one request, own state is updated and reported once per batch
+
+    :param request: received request
+    :param batch: object containing validated notifications
+    :param state: states of the children that sent notification
+    :param sender: children's ids in the same order as states
+    :param time_stamp: times when notifications were created in the same order as states
+    :return: None
+    """
+    if configuration['REST']['pydantic']:
+        if batch is None:
+            raise HTTPException(status_code=400, detail="Batch of notifications is missing!")
+        notifications = [records.Notification(notification.state, notification.sender, notification.time_stamp)
+                         for notification in batch.notifications]
+    else:
+        if not len(state) == len(sender) == len(time_stamp):
+            raise HTTPException(status_code=400, detail="Every notification needs state, sender and time stamp!")
+        notifications = [records.Notification(*notification) for notification in zip(state, sender, time_stamp)]
+    await get_node(request).process_notifications(notifications)
+
+
+async def read_values(scope: dict, receive: Callable) -> dict:
+    """
+    Read attributes of the request, json body when REST.pydantic is enabled otherwise query parameters
+
+    :param scope: ASGI connection scope
+    :param receive: ASGI receive channel
+    :return: received attributes
+    """
+    if not configuration['REST']['pydantic']:
+        return dict(parse_qsl(scope['query_string'].decode()))
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    try:
+        values = json.loads(body)
+    except ValueError:
+        raise ValidationError('Invalid json body', body)
+    if not isinstance(values, dict):
+        raise ValidationError('Invalid json body', body)
+    return values
+
+
+async def fast_get_state(scope: dict, _receive: Callable) -> dict[str, str]:
+    """
+    Raw ASGI equivalent of get_state endpoint
+
+    :param scope: ASGI connection scope
+    :param _receive: ASGI receive channel
+    :return: node state
+    """
+    return await read_state(get_scope_node(scope))
+
+
+async def fast_change_state(scope: dict, receive: Callable) -> int:
+    """
+    Raw ASGI equivalent of change_state endpoint
+
+    :param scope: ASGI connection scope
+    :param receive: ASGI receive channel
+    :return: node state after transition
+    """
+    return (await change_node_state(get_scope_node(scope), await read_values(scope, receive))).value
+
+
+async def fast_notify(scope: dict, receive: Callable) -> None:
+    """
+    Raw ASGI equivalent of notify endpoint
+
+    :param scope: ASGI connection scope
+    :param receive: ASGI receive channel
+    :return: None
+    """
+    await notify_node(get_scope_node(scope), await read_values(scope, receive))
+
+
+async def change_node_state(target: Node, values: dict) -> model.State:
+    """
+    Validate attributes of change state command and start transition of the node
+
+    :param target: addressed node
+    :param values: received attributes
+    :return: node state after transition
+    """
+    if configuration['REST']['pydantic']:
+        start, stop = validate_change_state(values)
+    else:
+        start, stop = values.get('start'), values.get('stop')
+    return apply_state_change(target, start, stop)
+
+
+async def notify_node(target: Node, values: dict) -> None:
+    """
+    Validate attributes of notification and update the child entry of the node
+
+    :param target: addressed node
+    :param values: received attributes
+    :return: None
+    """
+    if configuration['REST']['pydantic']:
+        state, sender = validate_notification(values)
+    else:
+        state, sender = values.get('state'), values.get('sender')
+    try:
+        time_stamp = float(values.get('time_stamp', 0))
+    except (TypeError, ValueError):
+        raise ValidationError('Invalid time stamp in Notification', values.get('time_stamp'))
+    await apply_notification(target, state, sender, time_stamp)
+
+
+async def notify_node_batch(target: Node, values: dict) -> None:
+    """
+    Validate batch of notifications in json form and update the children entries of the node
+
+    :param target: addressed node
+    :param values: received attributes
+    :return: None
+    """
+    if configuration['REST']['pydantic']:
+        items = NotificationBatch.parse_obj(values).notifications
+        notifications = [records.Notification(item.state, item.sender, item.time_stamp) for item in items]
+    else:
+        notifications = [records.Notification(item['state'], item['sender'], item.get('time_stamp', 0))
+                         for item in values['notifications']]
+    await target.process_notifications(notifications)
+
+
+fast_routes: dict[tuple[str, str], Callable] = {
+    ('GET', configuration['URL']['get_state']): fast_get_state,
+    ('POST', configuration['URL']['change_state']): fast_change_state,
+    ('POST', configuration['URL']['notification']): fast_notify,
+}
+
+stream_routes: dict[str, Callable] = {
+    configuration['URL']['change_state']: change_node_state,
+    configuration['URL']['notification']: notify_node,
+    configuration['URL']['notification_batch']: notify_node_batch,
+}
+
+
+async def fast_app(scope: dict, receive: Callable, send: Callable) -> None:
+    """
+    Minimal ASGI application serving get_state, change_state and notification without FastAPI routing, dependency
+    injection, pydantic models and middleware. Attributes are validated by hand-written equivalents of the pydantic
+    models, all other requests (and lifespan events) are passed to the FastAPI application.
+
+    :param scope: ASGI connection scope
+    :param receive: ASGI receive channel
+    :param send: ASGI send channel
+    :return: None
+    """
+    handler = fast_routes.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if not handler:
+        await app(scope, receive, send)
         return
-    if state_changed:
-        await post_notification(node.get_parent().get_full_address(), str(node.state), node.address.get_full_address())
+    content_type = b'application/json'
+    try:
+        status = 200
+        body = json.dumps(await handler(scope, receive), separators=(',', ':')).encode()
+    except HTTPException as e:
+        status = e.status_code
+        body = json.dumps({'detail': e.detail}, separators=(',', ':')).encode()
+    except ValidationError as e:
+        if e.errors:
+            print(e.errors, file=sys.stderr)
+        print(e.args[0], file=sys.stderr)
+        status = 400
+        body = b'Validation Error'
+        content_type = b'text/plain'
+    except (KeyError, ValueError) as e:
+        # attributes are not validated with REST.pydantic disabled, e.g. unknown state or invalid probability
+        print('Invalid request: ' + str(e), file=sys.stderr)
+        status = 400
+        body = b'Validation Error'
+        content_type = b'text/plain'
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def get_application() -> Callable:
+    """
+    Application served by uvicorn based on REST.server in configuration.yaml
+
+    :return: FastAPI application or raw ASGI application
+    """
+    if configuration['REST']['server'] == 'asgi':
+        return fast_app
+    return app
 
 
 def run(created_node: Node, shutdown: Callable) -> None:
@@ -140,4 +574,30 @@ def run(created_node: Node, shutdown: Callable) -> None:
     log_level = 'critical'
     if configuration['debug']:
         log_level = 'debug'
-    uvicorn.run(app, host=configuration['URL']['address'], port=int(node.address.get_port()), log_level=log_level)
+    uvicorn.run(get_application(), host=configuration['URL']['address'], port=int(node.address.get_port()),
+                log_level=log_level, loop=utils.event_loop, http=utils.get_http_parser())
+
+
+def run_host(created_host, shutdown: Callable) -> None:
+    """
+    Enable API for all nodes of the host, one server is listening on the ports of all hosted nodes
+
+    :param shutdown: proper shutdown function
+    :param created_host: NodeHost instance that is serviced by the API
+    :return: None
+    """
+    global node_host, nodes, shutdown_handler
+    node_host = created_host
+    nodes = {int(hosted_node.address.get_port()): hosted_node for hosted_node in node_host.nodes.values()}
+    shutdown_handler = shutdown
+    log_level = 'critical'
+    if configuration['debug']:
+        log_level = 'debug'
+    sockets = []
+    for port in nodes:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((configuration['URL']['address'], port))
+        sockets.append(sock)
+    uvicorn.Server(uvicorn.Config(get_application(), log_level=log_level, loop=utils.event_loop,
+                                  http=utils.get_http_parser())).run(sockets=sockets)
@@ -1,17 +1,20 @@
 import argparse
 import asyncio
-import concurrent.futures
+import functools
 import os
 import signal
 import sys
 from asyncio import Future
 from subprocess import Popen
 
-import receive
-import send
-import server
 import model
-from utils import check_address, get_configuration
+from utils import check_address, check_node_id, get_configuration, get_node_id, get_parent_id, lazy_import, \
+    use_event_loop, watch_configuration
+
+host = lazy_import('host')
+launcher = lazy_import('launcher')
+receive = lazy_import('receive')
+server = lazy_import('server')
 
 configuration: dict[str, str | dict[str, str | dict]] = get_configuration()
 
@@ -19,24 +22,36 @@ configuration: dict[str, str | dict[str, str | dict]] = get_configuration()
 def parse_input_arguments() -> argparse.Namespace:
     """
     Parse command line arguments from following format:
-    `python service.py --port 21000 --levels 1 --children 3 --parent "127.0.0.1:20000"`
+    `python service.py --id 2.1 --levels 1 --children 3 --parent "127.0.0.1:20000"`
     In case of invalid input it throws error and print valid range, in case of missing option it returns default values
 
-    :return: object having 4 attributes:
+    :return: object having 9 attributes:
         -port: integer [10 000-60 000]
             - default: 20 000
-        -levels: integer [0-4]
+        -id: string dot separated path from the root e.g. 2.1
+            - default: None (derived from port)
+        -levels: integer [0-15]
             - default: 0
-        -children: integer [1-9]
+        -children: integer [1-9999]
             - default: 3
         -parent: string "<IP>:<port>"
             - default: None
+        -host: boolean whether all descendants are hosted by this process
+            - default: False
+        -workers: integer number of worker processes hosting the tree
+            - default: 0 (one process per node), number of CPU cores if no value is given
+        -spawned: boolean whether children of the node are started by the root (node.spawn: root)
+            - default: False
+        -ready: string path to the readiness barrier socket every node reports to once it is ready
+            - default: None
     """
     parser = argparse.ArgumentParser(description='Process node input arguments.')
     parser.add_argument('--port', dest='port', action='store', type=int,
                         choices=range(configuration['node']['port']['min'], configuration['node']['port']['max']),
                         default=configuration['node']['port']['default'],
                         help='port for root node')
+    parser.add_argument('--id', dest='id', action='store', type=check_node_id, default=None,
+                        help='node id, derived from the port if not given')
     parser.add_argument('--levels', dest='levels', action='store', type=int,
                         choices=range(configuration['node']['depth']['min'], configuration['node']['depth']['max']),
                         default=configuration['node']['depth']['default'],
@@ -48,6 +63,14 @@ def parse_input_arguments() -> argparse.Namespace:
                         help='number of children per node except the leaves')
     parser.add_argument('--parent', dest='parent', action='store', type=check_address, default=None,
                         help='link to the parent node, keep empty')
+    parser.add_argument('--host', dest='host', action='store_true',
+                        help='run the node together with its whole subtree inside this process')
+    parser.add_argument('--workers', dest='workers', action='store', type=int, nargs='?', const=os.cpu_count(),
+                        default=0, help='split the whole tree between worker processes, number of CPU cores by default')
+    parser.add_argument('--spawned', dest='spawned', action='store_true',
+                        help='children of the node are started by the root, keep empty')
+    parser.add_argument('--ready', dest='ready', action='store', default=None,
+                        help='readiness barrier socket every node reports to once it is ready')
     args = parser.parse_args()
     return args
 
@@ -59,10 +82,15 @@ def create_node() -> model.Node:
     :return: Node instance
     """
     cmd_arguments: argparse.Namespace = parse_input_arguments()
-    new_node_address: str = configuration['URL']['address'] + ':' + str(cmd_arguments.port)
     model.Node.arity = cmd_arguments.children
     model.Node.depth = cmd_arguments.levels
-    return model.Node(model.NodeAddress(new_node_address))
+    node_id = cmd_arguments.id or get_node_id(str(cmd_arguments.port))
+    if configuration['architecture'] == 'REST':
+        model.addresses.check_ports(node_id)
+    created_node = model.Node(node_id)
+    if cmd_arguments.ready:
+        created_node.on_ready = functools.partial(launcher.report_ready, cmd_arguments.ready, created_node.id)
+    return created_node
 
 
 def create_children(parent: model.Node) -> None:
@@ -71,43 +99,90 @@ def create_children(parent: model.Node) -> None:
 
     :return: None
     """
-    for child_port in parent.children:
-        process: Popen = Popen(
-            ['python', 'service.py', '--port', str(child_port), '--levels', str(model.Node.depth),
-             '--children', str(model.Node.arity), '--parent', parent.address.get_full_address()])
-        node.started_processes.append(process)
+    for child_id in parent.children:
+        start_node(child_id, parent.address.get_full_address())
+
+
+def create_tree(root: model.Node) -> None:
+    """
+    Create all nodes of the tree from the root process in breadth-first order, nodes do not start their children so the
+    whole tree is started in parallel instead of level by level
+
+    :param root: root node
+    :return: None
+    """
+    tree = launcher.get_tree(root)
+    for node_id in launcher.get_subtree(tree, root.id)[1:]:
+        parent_id = get_parent_id(node_id)
+        start_node(node_id, model.NodeAddress(model.addresses.get_address(parent_id)).get_full_address(), spawned=True)
+
+
+def start_node(node_id: str, parent_address: str, spawned: bool = False) -> None:
+    """
+    Start process of one node, the process is either forked from this process (zygote) or started as new interpreter
+    based on node.launcher in configuration.yaml
+
+    :param node_id: id of the started node
+    :param parent_address: IP:port of its parent
+    :param spawned: whether the children of the started node are started by this process too
+    :return: None
+    """
+    arguments = ['--id', node_id, '--levels', str(model.Node.depth), '--children', str(model.Node.arity),
+                 '--parent', parent_address]
+    if spawned:
+        arguments.append('--spawned')
+    if parse_input_arguments().ready:
+        arguments.extend(['--ready', parse_input_arguments().ready])
+    if configuration['node']['launcher'] == 'zygote':
+        if not node.started_processes:
+            launcher.preload()
+        process = launcher.NodeProcess(target=run_child, args=(arguments,))
+        process.start()
+    else:
+        process = Popen(['python', 'service.py'] + arguments)
+    node.started_processes.append(process)
 
 
+def run_child(arguments: list[str]) -> None:
+    """
+    Entry point of the child node forked from its parent, all modules are already imported and configured
+
+    :param arguments: command line arguments of the child node
+    :return: None
+    """
+    sys.argv = sys.argv[:1] + arguments
+    main()
+
+
+node: model.Node | None = None
 server_task: None | Future[None] = None
 receiver_task: None | Future[None] = None
+reload_task: None | Future[None] = None
 
 
 async def setup() -> None:
     """
-    Starts MOM consumer and rpc server running in infinite asynchronous loop and handle task cancellation
+    Starts MOM consumer and rpc server running in the asynchronous loop and handle task cancellation
 
     :return: None
     """
-    global receiver_task, server_task
-    loop = asyncio.get_running_loop()
-    run_consumer = lambda: receive.run(node, loop)
-    rpc_server = lambda: node.run_get_server()
-
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        receiver_task = loop.run_in_executor(pool, run_consumer)
-        server_task = loop.run_in_executor(pool, rpc_server)
-        try:
-            await receiver_task
-        except asyncio.CancelledError:
-            if configuration['debug']:
-                print('Consumer ' + node.address.get_port() + ' stopped')
-        try:
-            await server_task
-        except asyncio.CancelledError:
-            if configuration['debug']:
-                print('RPC server ' + node.address.get_port() + ' stopped')
+    global receiver_task, server_task, reload_task
+    receiver_task = asyncio.create_task(receive.run(node))
+    server_task = asyncio.create_task(model.serve_get_state([node]))
+    if configuration['reload']:
+        reload_task = asyncio.create_task(watch_configuration())
+    try:
+        await receiver_task
+    except asyncio.CancelledError:
+        if configuration['debug']:
+            print('Consumer ' + node.id + ' stopped')
+    try:
+        await server_task
+    except asyncio.CancelledError:
         if configuration['debug']:
-            print('Node ' + node.address.get_port() + ' is terminated')
+            print('RPC server ' + node.id + ' stopped')
+    if configuration['debug']:
+        print('Node ' + node.id + ' is terminated')
 
 
 async def shutdown_event(broker_disconnect: bool = True) -> None:
@@ -140,19 +215,46 @@ async def shutdown_event(broker_disconnect: bool = True) -> None:
             loop = asyncio.get_running_loop()
             server_task.cancel()
             receiver_task.cancel()
+            if reload_task:
+                reload_task.cancel()
             loop.call_soon_threadsafe(loop.stop)
 
 
-if configuration['debug']:
-    print('My PID is:', os.getpid(), ' and my port is ' + str(parse_input_arguments().port))
-node: model.Node = create_node()
-create_children(node)
-if configuration['architecture'] == 'MOM':
-    async_loop = asyncio.get_event_loop()
-    async_loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(shutdown_event()))
-    async_loop.create_task(setup())
-    async_loop.run_forever()
-    # why is it necessary
-    sys.exit(0)
-elif configuration['architecture'] == 'REST':
-    server.run(node, shutdown=shutdown_event)
+def main() -> None:
+    """
+    Create the node given by command line arguments, start its children and serve it until it is terminated
+
+    :return: None
+    """
+    global node
+    event_loop = use_event_loop()
+    if configuration['debug']:
+        print('My PID is:', os.getpid(), ' and my port is ' + str(parse_input_arguments().port) + ', loop: ' +
+              event_loop)
+    node = create_node()
+    if parse_input_arguments().workers:
+        launcher.run(node, parse_input_arguments().workers)
+        sys.exit(0)
+    if parse_input_arguments().host:
+        node_host = host.NodeHost()
+        node_host.add_subtree(node)
+        host.run(node_host)
+        sys.exit(0)
+    if not parse_input_arguments().spawned:
+        if configuration['node']['spawn'] == 'root':
+            create_tree(node)
+        else:
+            create_children(node)
+    if configuration['architecture'] == 'MOM':
+        async_loop = asyncio.get_event_loop()
+        async_loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(shutdown_event()))
+        async_loop.create_task(setup())
+        async_loop.run_forever()
+        # why is it necessary
+        sys.exit(0)
+    elif configuration['architecture'] == 'REST':
+        server.run(node, shutdown=shutdown_event)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import random
+import selectors
+import time
+from typing import Callable
+
+import host
+import model
+import utils
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+class VirtualClock(selectors.DefaultSelector):
+    """
+    Selector driving the virtual time of the SimulationLoop.
+
+    Timers created by asyncio.sleep are kept by the loop in a priority heap ordered by their timestamp. Whenever the loop
+    would block waiting for the earliest timer, the clock jumps directly to its timestamp instead, so the transition
+    delays cost no wall-clock time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.now: float = 0
+        self.condition: Callable[[], bool] | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def select(self, timeout: float | None = None) -> list:
+        """
+        Poll ready file descriptors without blocking and advance virtual time by the requested timeout
+
+        :param timeout: time until the earliest scheduled event, None if there is no scheduled event
+        :return: list of ready events
+        """
+        if self.condition and self.condition():
+            self.loop.stop()
+            return []
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            raise RuntimeError('Simulation has no pending events at virtual time ' + str(self.now))
+        self.now += timeout
+        return events
+
+
+class SimulationLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop where time is virtual and it is advanced from one scheduled event to the next one
+    """
+
+    def __init__(self):
+        self.clock = VirtualClock()
+        super().__init__(selector=self.clock)
+        self.clock.loop = self
+
+    def time(self) -> float:
+        return self.clock.now
+
+    def run_until(self, condition: Callable[[], bool]) -> float:
+        """
+        Process events until condition is fulfilled
+
+        :param condition: checked before every iteration of the loop
+        :return: virtual time when the condition was fulfilled
+        """
+        self.clock.condition = condition
+        try:
+            self.run_forever()
+        finally:
+            self.clock.condition = None
+        return self.time()
+
+
+def simulate(depth: int, children: int, chance_to_fail: float = 0) -> dict[str, float | int]:
+    """
+    Simulate full start/stop roundtrip of the whole tree hosted by one process using virtual time
+
+    :param depth: number of levels in the tree
+    :param children: number of children per node
+    :param chance_to_fail: probability of each node to end in Error state
+    :return: virtual durations of initialisation, start and stop together with number of nodes, number of delivered
+        notifications and used CPU time
+    """
+    cpu_start = time.process_time()
+    model.Node.depth = depth
+    model.Node.arity = children
+    root = model.Node(utils.get_node_id(str(configuration['node']['port']['default'])))
+    node_host = host.NodeHost()
+    node_host.add_subtree(root)
+
+    loop = SimulationLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.call_soon(node_host.schedule, node_host.initialise())
+        initialised = loop.run_until(lambda: root.state == model.State.Stopped)
+
+        loop.call_soon(node_host.schedule, root.process_state_change(start_argument=chance_to_fail))
+        running = loop.run_until(lambda: root.state in [model.State.Running, model.State.Error])
+
+        stopped = running
+        if root.state == model.State.Running:
+            loop.call_soon(node_host.schedule, root.process_state_change(stop=True))
+            stopped = loop.run_until(lambda: root.state == model.State.Stopped)
+
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+    return {'nodes': len(node_host.nodes), 'initialisation': initialised, 'start': running - initialised,
+            'stop': stopped - running, 'state': str(root.state), 'notifications': node_host.notifications,
+            'cpu': time.process_time() - cpu_start}
+
+
+def disable_output() -> None:
+    """
+    Turn off debug prints and measurement files of all nodes taking part in the simulation
+
+    :return: None
+    """
+    model.configuration['debug'] = False
+    model.configuration['measurement']['write'] = False
+    host.configuration['debug'] = False
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python simulation.py --levels 4 --children 5 --fail 0.01 --seed 1 --window 0.01`
+
+    :return: object having 5 attributes:
+        -levels: integer number of levels in the tree
+        -children: integer number of children per node except the leaves
+        -fail: float probability of each node to end in Error state
+        -seed: integer seed of the random generator
+        -window: float coalescing window of notifications in seconds
+    """
+    parser = argparse.ArgumentParser(description='Simulate the tree using virtual time.')
+    parser.add_argument('--levels', dest='levels', action='store', type=int, default=2,
+                        help='number of hierarchies/levels in three structure')
+    parser.add_argument('--children', dest='children', action='store', type=int, default=3,
+                        help='number of children per node except the leaves')
+    parser.add_argument('--fail', dest='fail', action='store', type=float, default=0,
+                        help='probability of each node to end in Error state')
+    parser.add_argument('--seed', dest='seed', action='store', type=int, default=None,
+                        help='seed of the random generator to reproduce the simulation')
+    parser.add_argument('--window', dest='window', action='store', type=float,
+                        default=configuration['node']['time']['coalescing'],
+                        help='coalescing window of notifications in seconds')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    random.seed(arguments.seed)
+    disable_output()
+    model.configuration['node']['time']['coalescing'] = arguments.window
+    result = simulate(arguments.levels, arguments.children, arguments.fail)
+    print('Simulated ' + str(result['nodes']) + ' nodes ending in ' + result['state'] + ' using ' +
+          '%.3f' % result['cpu'] + 's of CPU time')
+    print('Virtual time of initialisation: ' + '%.3f' % result['initialisation'] + 's')
+    print('Virtual time of start: ' + '%.3f' % result['start'] + 's')
+    print('Virtual time of stop: ' + '%.3f' % result['stop'] + 's')
+    print('Delivered notifications: ' + str(result['notifications']))
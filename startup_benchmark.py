@@ -0,0 +1,66 @@
+import argparse
+import signal
+import subprocess
+import sys
+import time
+
+import launcher
+import utils
+
+configuration: dict[str, str | dict[str, str | dict]] = utils.get_configuration()
+
+
+def measure(node_launcher: str, spawn: str, levels: int, children: int) -> float:
+    """
+    Measure time from starting the root process until all nodes of the tree reported being ready (time-to-Stopped)
+
+    :param node_launcher: zygote or popen
+    :param spawn: root or parent
+    :param levels: number of levels in the tree
+    :param children: number of children per node
+    :return: duration in seconds
+    """
+    utils.set_configuration(node_launcher, ['node', 'launcher'])
+    utils.set_configuration(spawn, ['node', 'spawn'])
+    barrier = launcher.ReadinessBarrier()
+    start = time.perf_counter()
+    root = subprocess.Popen([sys.executable, 'service.py', '--levels', str(levels), '--children', str(children),
+                             '--ready', barrier.path], stdout=subprocess.DEVNULL)
+    try:
+        barrier.wait(sum(children ** level for level in range(levels + 1)))
+        return time.perf_counter() - start
+    finally:
+        root.send_signal(signal.SIGTERM)
+        root.wait()
+        barrier.close()
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python startup_benchmark.py --levels 1 2 3 --children 3`
+
+    :return: object having 2 attributes:
+        -levels: list of numbers of levels in the tree
+        -children: number of children per node
+    """
+    parser = argparse.ArgumentParser(description='Measure time until the whole tree is ready (time-to-Stopped).')
+    parser.add_argument('--levels', dest='levels', action='store', type=int, nargs='+', default=[1, 2, 3],
+                        help='numbers of levels in the tree')
+    parser.add_argument('--children', dest='children', action='store', type=int, default=3,
+                        help='number of children per node')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    utils.set_configuration(False, ['debug'])
+    utils.set_configuration(False, ['measurement', 'write'])
+    print('| Nodes | Popen, parent [s] | Zygote, parent [s] | Popen, root [s] | Zygote, root [s] | Speedup |')
+    print('|------:|------------------:|-------------------:|----------------:|-----------------:|--------:|')
+    for levels in arguments.levels:
+        nodes = sum(arguments.children ** level for level in range(levels + 1))
+        durations = [measure(node_launcher, spawn, levels, arguments.children)
+                     for spawn in ['parent', 'root'] for node_launcher in ['popen', 'zygote']]
+        print('| %5d | %17.2f | %18.2f | %15.2f | %16.2f | %6.1fx |' % (nodes, *durations,
+                                                                          durations[0] / min(durations)))
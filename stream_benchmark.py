@@ -0,0 +1,43 @@
+import argparse
+import tempfile
+
+from loop_benchmark import configure, start_rest
+
+
+def parse_input_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments from following format:
+    `python stream_benchmark.py --levels 1 2 3 --children 3 --runs 3`
+
+    :return: object having 3 attributes:
+        -levels: list of numbers of levels in the tree
+        -children: number of children per node
+        -runs: number of measurements of each combination, the fastest is reported
+    """
+    parser = argparse.ArgumentParser(description='Measure start of the REST tree with requests and streams.')
+    parser.add_argument('--levels', dest='levels', action='store', type=int, nargs='+', default=[1, 2, 3],
+                        help='numbers of levels in the tree')
+    parser.add_argument('--children', dest='children', action='store', type=int, default=3,
+                        help='number of children per node')
+    parser.add_argument('--runs', dest='runs', action='store', type=int, default=3,
+                        help='number of measurements of each combination, the fastest is reported')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_input_arguments()
+    for path, value in [(['debug'], False), (['architecture'], 'REST'), (['node', 'time', 'starting'], 0),
+                        (['node', 'time', 'get'], 0), (['measurement', 'write'], True)]:
+        configure(value, path)
+    print('| Nodes | Requests [ms] | Streams [ms] | Speedup |')
+    print('|------:|--------------:|-------------:|--------:|')
+    with tempfile.TemporaryDirectory() as measurements:
+        for levels in arguments.levels:
+            durations = []
+            for stream in [False, True]:
+                configure(stream, ['REST', 'stream'])
+                durations.append(min(start_rest(levels, arguments.children, measurements)
+                                     for _ in range(arguments.runs)))
+            nodes = sum(arguments.children ** level for level in range(levels + 1))
+            print('| %5d | %13.2f | %12.2f | %6.1fx |' % (nodes, durations[0] * 1e3, durations[1] * 1e3,
+                                                         durations[0] / durations[1]))
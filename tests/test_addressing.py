@@ -0,0 +1,78 @@
+import pytest
+
+import model
+import utils
+from model import AddressTable, Node
+
+
+class TestAddressing:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+
+    def test_node_id(self):
+        """
+        Test conversion of the original 5 digits ports and routing keys into node ids and navigation in the tree
+
+        :return: None
+        """
+        assert utils.get_node_id('20000') == '2'
+        assert utils.get_node_id('21300') == '2.1.3'
+        assert utils.get_node_id('2.1.0.0.0') == '2.1'
+        assert utils.get_node_id('2.10.3') == '2.10.3'
+        assert utils.compute_hierarchy_level('2.10.3') == 2
+        assert utils.get_parent_id('2.10.3') == '2.10'
+        assert utils.get_parent_id('2') is None
+        assert utils.get_child_id('2.10', 12) == '2.10.12'
+
+    def test_legacy_ports(self):
+        """
+        Test that small trees keep the original 5 digits ports
+
+        :return: None
+        """
+        model.Node.depth = 4
+        model.Node.arity = 9
+        assert AddressTable.compute_port('2') == 20000
+        assert AddressTable.compute_port('2.1.3') == 21300
+        assert AddressTable.compute_port('2.9.9.9.9') == 29999
+
+    def test_sequential_ports(self):
+        """
+        Test that ports of big trees are unique and assigned in breadth-first order
+
+        :return: None
+        """
+        model.Node.depth = 2
+        model.Node.arity = 12
+        root = Node('2')
+        node_ids = [root.id] + list(root.children) + [child for node_id in root.children
+                                                     for child in Node(node_id).children]
+        ports = [AddressTable.compute_port(node_id) for node_id in node_ids]
+        assert len(node_ids) == 1 + 12 + 12 * 12
+        assert ports == list(range(20000, 20000 + len(node_ids)))
+
+    def test_explicit_address(self):
+        """
+        Test that explicitly registered address takes precedence over computed one
+
+        :return: None
+        """
+        table = AddressTable({'2.1': '10.0.0.1:30000'})
+        assert table.get_address('2.1') == '10.0.0.1:30000'
+        assert table.get_address('2').endswith(':20000')
+
+    def test_port_range(self):
+        """
+        Test that tree whose highest computed port exceeds node.port.max is refused unless the address is explicit
+
+        :return: None
+        """
+        model.Node.depth = 7
+        model.Node.arity = 5
+        assert AddressTable.compute_port('2.5.5.5.5.5.5.5') > utils.configuration['node']['port']['max']
+        with pytest.raises(ValueError, match='REST.addresses'):
+            AddressTable().check_ports('2.1')
+        AddressTable({'2.5.5.5.5.5.5.5': '10.0.0.1:30000'}).check_ports('2')
+        model.Node.depth = 4
+        AddressTable().check_ports('2')
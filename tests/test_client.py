@@ -0,0 +1,218 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+import client
+
+configuration: dict[str, str | dict[str, str | dict]] = client.configuration
+
+PORT = 59999
+
+
+async def start_server(handler, stream_handler=None) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_post(configuration['URL']['notification'], handler)
+    if stream_handler:
+        app.router.add_get(configuration['URL']['stream'], stream_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, configuration['URL']['address'], PORT).start()
+    return runner
+
+
+class TestClient:
+    @pytest.mark.asyncio
+    async def test_connection_reuse(self):
+        """
+        Test that consecutive requests to the same node are sent over one kept alive connection
+
+        :return: None
+        """
+        connections = []
+
+        async def handler(request: web.Request) -> web.Response:
+            connections.append(request.transport.get_extra_info('peername'))
+            return web.Response()
+
+        runner = await start_server(handler)
+        try:
+            address = configuration['URL']['address'] + ':' + str(PORT)
+            for _ in range(3):
+                await client.post_notification(address, 'State.Running', '2.1')
+            assert len(connections) == 3
+            assert len(set(connections)) == 1
+        finally:
+            await client.close_session()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_session_closed(self):
+        """
+        Test that a new shared session is created once the previous one was closed
+
+        :return: None
+        """
+        session = client.get_session()
+        assert client.get_session() is session
+        await client.close_session()
+        assert session.closed
+        assert client.get_session() is not session
+        await client.close_session()
+
+    def test_session_loop(self):
+        """
+        Test that session of the previous loop is closed once the session is used by another loop
+
+        :return: None
+        """
+
+        async def get_session() -> aiohttp.ClientSession:
+            shared_session = client.get_session()
+            await asyncio.sleep(0.1)
+            return shared_session
+
+        first = asyncio.run(get_session())
+        assert not first.closed
+        second = asyncio.run(get_session())
+        assert first.closed
+        assert not second.closed
+        asyncio.run(client.close_session())
+        assert second.closed
+
+    @pytest.mark.asyncio
+    async def test_refused_connection_retry(self):
+        """
+        Test that request to the node which is not running yet is delivered shortly after the node starts
+
+        :return: None
+        """
+        received = []
+
+        async def handler(_request: web.Request) -> web.Response:
+            received.append(asyncio.get_running_loop().time())
+            return web.Response()
+
+        async def delayed_start() -> web.AppRunner:
+            await asyncio.sleep(0.5)
+            return await start_server(handler)
+
+        loop = asyncio.get_running_loop()
+        statistics = client.statistics.copy()
+        server_start = asyncio.create_task(delayed_start())
+        started = loop.time()
+        address = configuration['URL']['address'] + ':' + str(PORT)
+        await client.post_notification(address, 'State.Running', '2.1')
+        runner = await server_start
+        try:
+            assert len(received) == 1
+            assert received[0] - started < 1.5
+            assert client.statistics['refused'] > statistics['refused']
+            assert client.statistics['delivered'] == statistics['delivered'] + 1
+        finally:
+            await client.close_session()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_rejected_not_retried(self):
+        """
+        Test that request rejected by the node (4xx) is not repeated
+
+        :return: None
+        """
+        received = []
+
+        async def handler(request: web.Request) -> web.Response:
+            received.append(request)
+            return web.Response(status=400)
+
+        runner = await start_server(handler)
+        statistics = client.statistics.copy()
+        try:
+            address = configuration['URL']['address'] + ':' + str(PORT)
+            await client.post_notification(address, 'State.Running', '2.1')
+            assert len(received) == 1
+            assert client.statistics['rejected'] == statistics['rejected'] + 1
+            assert client.statistics['retries'] == statistics['retries']
+        finally:
+            await client.close_session()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_unanswered_request(self, monkeypatch):
+        """
+        Test that request to the node which never replies is abandoned at REST.timeout deadline
+
+        :return: None
+        """
+        replied = asyncio.Event()
+
+        async def handler(_request: web.Request) -> web.Response:
+            await replied.wait()
+            return web.Response()
+
+        monkeypatch.setitem(configuration['REST'], 'timeout', 1)
+        runner = await start_server(handler)
+        loop = asyncio.get_running_loop()
+        statistics = client.statistics.copy()
+        try:
+            address = configuration['URL']['address'] + ':' + str(PORT)
+            started = loop.time()
+            await client.post_notification(address, 'State.Running', '2.1')
+            assert loop.time() - started < 2
+            assert client.statistics['timeouts'] > statistics['timeouts']
+            assert client.statistics['expired'] == statistics['expired'] + 1
+        finally:
+            replied.set()
+            await client.close_session()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_stream(self):
+        """
+        Test that commands of the parent are received and notifications are sent as frames of the open stream and
+        requests are used once the stream is closed
+
+        :return: None
+        """
+        frames = []
+        received = []
+        posted = []
+        closed = asyncio.Event()
+
+        async def stream_handler(request: web.Request) -> web.WebSocketResponse:
+            connection = web.WebSocketResponse()
+            await connection.prepare(request)
+            frames.append(json.loads((await connection.receive()).data))
+            await connection.send_json({'path': configuration['URL']['change_state'], 'values': {'stop': '_'}})
+            frames.append(json.loads((await connection.receive()).data))
+            await connection.close()
+            closed.set()
+            return connection
+
+        async def handler(request: web.Request) -> web.Response:
+            posted.append(await request.json())
+            return web.Response()
+
+        async def receive_frame(frame: dict) -> None:
+            received.append(frame)
+
+        runner = await start_server(handler, stream_handler)
+        try:
+            address = configuration['URL']['address'] + ':' + str(PORT)
+            reader = await client.open_stream(address, '2.1', receive_frame)
+            await client.post_notification(address, 'State.Running', '2.1')
+            await closed.wait()
+            await reader
+            await client.post_notification(address, 'State.Error', '2.1')
+            assert frames[0] == {'sender': '2.1'}
+            assert frames[1]['path'] == configuration['URL']['notification']
+            assert frames[1]['values']['state'] == 'State.Running'
+            assert received == [{'path': configuration['URL']['change_state'], 'values': {'stop': '_'}}]
+            assert address not in client.streams
+            assert [notification['state'] for notification in posted] == ['State.Error']
+        finally:
+            await client.close_session()
+            await runner.cleanup()
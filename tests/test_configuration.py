@@ -0,0 +1,104 @@
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import weakref
+
+import pytest
+import yaml
+
+import utils
+
+
+class TestConfiguration:
+    def test_child_process(self, monkeypatch):
+        """
+        Test that value set by the parent process is inherited by child process and configuration.yaml is not modified
+
+        :return: None
+        """
+        monkeypatch.setenv(utils.CONFIGURATION_VARIABLE, os.environ[utils.CONFIGURATION_VARIABLE])
+        monkeypatch.setattr(utils, 'configuration_overrides', list(utils.configuration_overrides))
+        with open(utils.get_configuration_full_path()) as f:
+            original_file = f.read()
+        original = utils.set_configuration(123, ['node', 'time', 'get'])
+        try:
+            child = subprocess.run([sys.executable, '-c', 'import utils; print(utils.configuration["node"]["time"]["get"])'],
+                                   cwd=os.path.dirname(utils.get_configuration_full_path()), capture_output=True,
+                                   text=True)
+            assert child.stdout.strip() == '123'
+            assert utils.get_configuration()['node']['time']['get'] == 123
+        finally:
+            utils.set_configuration(original, ['node', 'time', 'get'])
+        with open(utils.get_configuration_full_path()) as f:
+            assert f.read() == original_file
+
+    def test_reload(self, monkeypatch, tmp_path):
+        """
+        Test that modified configuration file updates configuration of all modules while set values are kept
+
+        :return: None
+        """
+        path = tmp_path / 'configuration.yaml'
+        with open(utils.get_configuration_full_path()) as f:
+            path.write_text(f.read())
+        monkeypatch.setenv(utils.CONFIGURATION_VARIABLE, os.environ[utils.CONFIGURATION_VARIABLE])
+        monkeypatch.setattr(utils, 'get_configuration_full_path', lambda: str(path))
+        monkeypatch.setattr(utils, 'loaded_configuration', utils.read_configuration_file())
+        monkeypatch.setattr(utils, 'configuration_overrides', [])
+        monkeypatch.setattr(utils, 'configuration_copies', weakref.WeakValueDictionary())
+        module_configuration = utils.get_configuration()
+        utils.set_configuration(7, ['node', 'time', 'running'])
+        modified = utils.read_configuration_file()
+        modified['architecture'] = 'REST'
+        modified['node']['time']['running'] = 1
+        path.write_text(yaml.dump(modified))
+        utils.reload_configuration()
+        assert module_configuration['architecture'] == 'REST'
+        assert module_configuration['node']['time']['running'] == 7
+        assert utils.get_configuration()['architecture'] == 'REST'
+
+    def test_released_copies(self, monkeypatch):
+        """
+        Test that copies of the configuration are tracked for reload only while they are used
+
+        :return: None
+        """
+        monkeypatch.setattr(utils, 'configuration_copies', weakref.WeakValueDictionary())
+        kept = utils.get_configuration()
+        for _ in range(100):
+            utils.get_configuration()['debug'] = True
+        gc.collect()
+        assert list(utils.configuration_copies.values()) == [kept]
+
+
+class TestEventLoop:
+    def teardown_method(self):
+        asyncio.set_event_loop_policy(None)
+        utils.event_loop = 'asyncio'
+
+    def test_fallback(self, monkeypatch):
+        """
+        Test that standard asyncio loop and h11 parser are used when uvloop is selected but not installed
+
+        :return: None
+        """
+        monkeypatch.setitem(utils.configuration, 'loop', 'uvloop')
+        monkeypatch.setitem(sys.modules, 'uvloop', None)
+        assert utils.use_event_loop() == 'asyncio'
+        assert type(asyncio.get_event_loop_policy()) is asyncio.DefaultEventLoopPolicy
+        assert utils.get_http_parser() == 'h11'
+
+    def test_uvloop(self, monkeypatch):
+        """
+        Test that uvloop policy is installed when uvloop is selected and installed
+
+        :return: None
+        """
+        uvloop = pytest.importorskip('uvloop')
+        monkeypatch.setitem(utils.configuration, 'loop', 'uvloop')
+        assert utils.use_event_loop() == 'uvloop'
+        loop = asyncio.new_event_loop()
+        assert isinstance(loop, uvloop.Loop)
+        loop.close()
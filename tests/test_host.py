@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import host
+import model
+from model import Node, State
+
+configuration: dict[str, str | dict[str, str | dict]] = model.configuration
+
+
+@pytest.fixture
+def transport(monkeypatch) -> list[tuple]:
+    """
+    Replace all messages leaving the process by records of their recipients
+
+    :return: list of sent messages as (function name, recipient)
+    """
+    sent = []
+
+    async def post_state_change(new_state: str, routing_key: str, chance_to_fail: float = 0) -> None:
+        sent.append(('post_state_change', routing_key))
+
+    async def post_state_notification(current_state: str, routing_key: str, sender_id: str) -> None:
+        sent.append(('post_state_notification', routing_key))
+
+    async def post_start(chance_to_fail: str, address: str) -> None:
+        sent.append(('post_start', address))
+
+    async def post_notification(address: str, state: str, sender_id: str) -> None:
+        sent.append(('post_notification', address))
+
+    monkeypatch.setattr(model.send, 'post_state_change', post_state_change)
+    monkeypatch.setattr(model.send, 'post_state_notification', post_state_notification)
+    monkeypatch.setattr(model.client, 'post_start', post_start)
+    monkeypatch.setattr(model.client, 'post_notification', post_notification)
+    # hosted nodes keep running on the shared loop, the test does not wait for their failure
+    monkeypatch.setattr(Node, 'run', lambda self: asyncio.sleep(0))
+    monkeypatch.setitem(configuration['node'], 'batch', False)
+    monkeypatch.setitem(configuration['node']['time'], 'starting', 0)
+    monkeypatch.setitem(configuration['measurement'], 'write', False)
+    return sent
+
+
+async def wait_for_state(node: Node, state: State) -> None:
+    while node.state != state:
+        await asyncio.sleep(0.01)
+
+
+class TestNodeHost:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+
+    @pytest.mark.asyncio
+    async def test_local_delivery(self, transport):
+        """
+        Test that change state and notifications between nodes hosted by the same process do not leave the process
+
+        :return: None
+        """
+        model.Node.depth = 1
+        model.Node.arity = 2
+        node_host = host.NodeHost()
+        node_host.add_subtree(Node('2'))
+        root = node_host.nodes['2']
+        assert sorted(node_host.nodes) == ['2', '2.1', '2.2']
+        await node_host.initialise()
+        await asyncio.wait_for(wait_for_state(root, State.Stopped), 1)
+        assert node_host.notifications == 2
+
+        await root.process_state_change(start_argument=0)
+        await asyncio.wait_for(wait_for_state(root, State.Running), 1)
+        assert [node_host.nodes[child_id].state for child_id in root.children] == [State.Running, State.Running]
+        assert node_host.notifications == 4
+        assert transport == []
+        await asyncio.gather(*node_host.tasks)
+
+    @pytest.mark.asyncio
+    async def test_remote_nodes(self, monkeypatch, transport):
+        """
+        Test that child and parent hosted elsewhere are reached by the transport selected in configuration.yaml while
+        the hosted child is reached in-process
+
+        :return: None
+        """
+        model.Node.depth = 2
+        model.Node.arity = 2
+        for architecture in ['MOM', 'REST']:
+            monkeypatch.setitem(configuration, 'architecture', architecture)
+            transport.clear()
+            node_host = host.NodeHost()
+            parent = Node('2.1')
+            parent.children = {'2.1.1': (State.Stopped, 0), '2.1.2': (State.Stopped, 0)}
+            parent.state = State.Stopped
+            node_host.add(parent)
+            local_child = Node('2.1.1')
+            local_child.state = State.Stopped
+            node_host.add(local_child)
+
+            await parent.process_state_change(start_argument=0)
+            await asyncio.wait_for(wait_for_state(local_child, State.Running), 1)
+            remote_child = '2.1.2' if architecture == 'MOM' else model.addresses.get_address('2.1.2')
+            remote_parent = '2' if architecture == 'MOM' else parent.get_parent().get_full_address()
+            if architecture == 'MOM':
+                assert transport == [('post_state_change', remote_child)]
+            else:
+                assert transport == [('post_start', remote_child)]
+            assert parent.children['2.1.1'][0] == State.Running
+            assert parent.state == State.Starting
+
+            await parent.process_notification('State.Running', '2.1.2', 1)
+            await asyncio.wait_for(wait_for_state(parent, State.Running), 1)
+            await asyncio.gather(*node_host.tasks)
+            await asyncio.sleep(0)
+            notification = 'post_state_notification' if architecture == 'MOM' else 'post_notification'
+            assert transport[1:] == [(notification, remote_parent)]
@@ -0,0 +1,119 @@
+import signal
+import sys
+import time
+import types
+
+import pytest
+
+import launcher
+import model
+import utils
+from model import Node
+
+
+class TestLauncher:
+    def test_partition_cut_level(self):
+        """
+        Test that the tree is cut at the shallowest level with enough subtrees and all nodes are hosted exactly once
+
+        :return: None
+        """
+        tree = generate_tree(levels=3, children=3)
+        partitions = launcher.partition(tree, '2', 4)
+        assert len(partitions) == 4
+        assert sorted(node_id for node_ids in partitions for node_id in node_ids) == sorted(tree)
+        # root and its 3 children stay together, 9 subtrees of 4 nodes are spread over the workers
+        assert partitions[0][:4] == ['2', '2.1', '2.2', '2.3']
+        assert sorted(map(len, partitions)) == [8, 8, 12, 12]
+
+    def test_partition_keeps_subtrees(self):
+        """
+        Test that only nodes on the cut level can be in different partition than their parent
+
+        :return: None
+        """
+        tree = generate_tree(levels=3, children=3)
+        partitions = launcher.partition(tree, '2', 2)
+        location = {node_id: i for i, node_ids in enumerate(partitions) for node_id in node_ids}
+        crossing = [child for parent in tree for child in tree[parent] if location[child] != location[parent]]
+        assert len(partitions) == 2
+        assert sorted(crossing) == ['2.1', '2.3']
+
+    def test_partition_more_workers_than_nodes(self):
+        """
+        Test that number of partitions is limited by the size of the tree
+
+        :return: None
+        """
+        tree = generate_tree(levels=1, children=2)
+        partitions = launcher.partition(tree, '2', 16)
+        assert partitions == [['2', '2.2'], ['2.1']]
+
+
+class TestZygote:
+    def test_node_process(self):
+        """
+        Test that forked node process is terminated by the same calls as the process started by Popen
+
+        :return: None
+        """
+        process = launcher.NodeProcess(target=time.sleep, args=(10,))
+        process.start()
+        assert process.poll() is None
+        process.send_signal(signal.SIGTERM)
+        process.join(5)
+        assert process.poll() == -signal.SIGTERM
+
+    def test_lazy_import(self, monkeypatch):
+        """
+        Test that lazily imported module is executed only when its attribute is accessed
+
+        :return: None
+        """
+        monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+        colorsys = utils.lazy_import('colorsys')
+        assert type(colorsys) is not types.ModuleType
+        assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+        assert type(colorsys) is types.ModuleType
+
+
+class TestReadiness:
+    def test_barrier(self, tmp_path):
+        """
+        Test that barrier waits until every node reported being ready, repeated reports are counted once
+
+        :return: None
+        """
+        barrier = launcher.ReadinessBarrier(str(tmp_path / 'ready.sock'))
+        for node_id in ['2.1', '2.2', '2.1', '2']:
+            launcher.report_ready(barrier.path, node_id)
+        assert not barrier.wait(4, timeout=0.1)
+        assert barrier.wait(3, timeout=0.1)
+        assert barrier.ready == {'2', '2.1', '2.2'}
+        barrier.close()
+
+    @pytest.mark.asyncio
+    async def test_ready_once(self):
+        """
+        Test that node reports being ready only once it is Stopped for the first time
+
+        :return: None
+        """
+        reports = []
+        node = Node('2')
+        node.on_ready = lambda: reports.append(node.id)
+        await node.notify_parent()
+        assert reports == []
+        node.state = model.State.Stopped
+        await node.notify_parent()
+        await node.notify_parent()
+        assert reports == ['2']
+
+
+def generate_tree(levels: int, children: int) -> dict[str, list[str]]:
+    model.Node.depth = levels
+    model.Node.arity = children
+    tree = launcher.get_tree(Node('2'))
+    model.Node.depth = 0
+    model.Node.arity = 0
+    return tree
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+import host
+import model
+import utils
+from model import Children, Node, State
+
+configuration: dict[str, str | dict[str, str | dict]] = model.configuration
+
+
+class TestChildren:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+
+    def test_counters(self):
+        """
+        Test that number of children in each state follows overwritten entries
+
+        :return: None
+        """
+        children = Children({'2.1': None, '2.2': (State.Stopped, 0), '2.3': (State.Stopped, 0)})
+        assert children.count(State.Initialisation) == 1
+        assert children.count(State.Stopped) == 2
+        children['2.1'] = (State.Running, 1)
+        children['2.2'] = (State.Running, 1)
+        children.pop('2.3')
+        assert children.count(State.Initialisation) == 0
+        assert children.count(State.Stopped) == 0
+        assert children.count(State.Running) == 2
+        assert sum(children.counter.values()) == len(children)
+
+    def test_update_state(self):
+        """
+        Test that parent state is aggregated from the counters after each notification
+
+        :return: None
+        """
+        model.Node.depth = 1
+        model.Node.arity = 1000
+        node = Node('2')
+        assert isinstance(node.children, Children)
+        for child_id in node.children:
+            assert node.state == State.Initialisation
+            node.children[child_id] = (State.Stopped, 1)
+            node.update_state()
+        assert node.state == State.Stopped
+        node.children = {'2.1': (State.Stopped, 0), '2.2': (State.Error, 0)}
+        assert isinstance(node.children, Children)
+        assert node.update_state()
+        assert node.state == State.Error
+
+
+class TestCoalescing:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+        configuration['node']['time']['coalescing'] = 0
+
+    @pytest.mark.asyncio
+    async def test_window(self):
+        """
+        Test that changes within the coalescing window are merged into one notification sent once all children reported
+
+        :return: None
+        """
+        configuration['node']['time']['coalescing'] = 10
+        model.Node.depth = 2
+        model.Node.arity = 3
+        node_host = host.NodeHost()
+        node_host.add(Node('2'))
+        node = Node('2.1')
+        node_host.add(node)
+        # stop command was propagated to all children
+        for child_id in node.children:
+            node.children[child_id] = (State.Starting, 0)
+        node.state = State.Running
+        node.reported_state = State.Running
+        await node.process_notification('State.Stopped', '2.1.1', 1)
+        await node.process_notification('State.Stopped', '2.1.2', 1)
+        assert node.state == State.Stopped
+        assert node_host.notifications == 0
+        await node.process_notification('State.Stopped', '2.1.3', 1)
+        assert node_host.notifications == 1
+        assert node.coalescing is None
+        await asyncio.sleep(0)
+        await asyncio.gather(*node_host.tasks)
+
+
+class TestBatch:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+
+    @pytest.mark.asyncio
+    async def test_remote_parent(self, monkeypatch):
+        """
+        Test that hosted children of the parent hosted elsewhere notify it in one message
+
+        :return: None
+        """
+        monkeypatch.setitem(configuration, 'architecture', 'MOM')
+        monkeypatch.setitem(configuration['node'], 'batch', True)
+        sent = []
+
+        async def post_state_notifications(notifications, routing_key):
+            sent.append((routing_key, [(notification.state, notification.sender) for notification in notifications]))
+
+        monkeypatch.setattr(host.send, 'post_state_notifications', post_state_notifications)
+        model.Node.depth = 1
+        model.Node.arity = 3
+        node_host = host.NodeHost()
+        for child_id in ['2.1', '2.2', '2.3']:
+            node_host.add(Node(child_id))
+        await node_host.initialise()
+        await asyncio.sleep(0)
+        await asyncio.gather(*node_host.tasks)
+        assert sent == [('2', [('State.Stopped', '2.1'), ('State.Stopped', '2.2'), ('State.Stopped', '2.3')])]
+
+    @pytest.mark.asyncio
+    async def test_local_parent(self, monkeypatch):
+        """
+        Test that hosted parent updates its state once for notifications of all hosted children
+
+        :return: None
+        """
+        monkeypatch.setitem(configuration['node'], 'batch', True)
+        model.Node.depth = 2
+        model.Node.arity = 3
+        node_host = host.NodeHost()
+        node_host.add_subtree(Node('2.1'))
+        parent = node_host.nodes['2.1']
+        updates = []
+        update_state = parent.update_state
+        monkeypatch.setattr(parent, 'update_state', lambda: updates.append(1) or update_state())
+        monkeypatch.setattr(parent, 'notify_parent', lambda: asyncio.sleep(0))
+        await node_host.initialise()
+        await asyncio.sleep(0)
+        await asyncio.gather(*node_host.tasks)
+        assert parent.state == State.Stopped
+        assert node_host.notifications == 3
+        assert updates == [1]
+
+
+class TestSnapshot:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+        configuration['node']['time']['get'] = utils.get_configuration()['node']['time']['get']
+
+    @pytest.mark.asyncio
+    async def test_subtree_in_parallel(self):
+        """
+        Test that snapshot contains state of every node in the subtree and all nodes are asked at once
+
+        :return: None
+        """
+        configuration['node']['time']['get'] = 0.5
+        model.Node.depth = 2
+        model.Node.arity = 3
+        node_host = host.NodeHost()
+        root = Node('2')
+        node_host.add_subtree(root)
+        for node in node_host.nodes.values():
+            node.state = State.Running
+        node_host.nodes['2.3.1'].state = State.Error
+        start = asyncio.get_running_loop().time()
+        snapshot = await root.get_snapshot()
+        assert asyncio.get_running_loop().time() - start < 1
+        assert len(snapshot) == 13
+        assert snapshot['2.3.1'] == 'Error'
+        assert all(state == 'Running' for node_id, state in snapshot.items() if node_id != '2.3.1')
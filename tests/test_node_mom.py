@@ -1,9 +1,13 @@
 import asyncio
 import time
 
+import host
+import model
 import receive
+import records
+import send
 import utils
-from model import Node, NodeAddress, State
+from model import Node, State
 
 import pytest
 
@@ -54,13 +58,10 @@ class TestNode:
 
         :return: None
         """
-        sender = 23456
+        sender = '2.3.4.5.6'
         raw_state = str(State.Error).split(':')[-1]
-        receive.node = generate_node(State.Running, children={sender: (State.Running, 0)},
-                                     address='127.0.0.1:22000')
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope(raw_state, str(sender)))
+        receive.node = generate_node(State.Running, node_id='2.2', children={sender: (State.Running, 0)})
+        await deliver(utils.get_red_envelope(raw_state, sender))
         assert receive.node.state == State.Running
         await asyncio.sleep(1)
         assert receive.node.state == State.Error
@@ -75,12 +76,10 @@ class TestNode:
 
         :return: None
         """
-        sender = 23456
+        sender = '2.3.4.5.6'
         raw_state = str(State.Running).split(':')[-1]
         receive.node = generate_node(State.Error, children={sender: None})
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope(raw_state, str(sender)))
+        await deliver(utils.get_red_envelope(raw_state, sender))
         assert receive.node.state == State.Error
         await asyncio.sleep(1)
         assert receive.node.state == State.Error
@@ -95,13 +94,11 @@ class TestNode:
         :return: None
         """
         init_states = [State.Stopped, State.Running]
-        sender = 23456
+        sender = '2.3.4.5.6'
         for i in range(2):
             raw_state = str(init_states[i - 1]).split(':')[-1]
-            receive.node = generate_node(init_states[1 - i], children={int(sender): None})
-            receive.loop = asyncio.get_event_loop()
-            receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                             body=utils.get_red_envelope(raw_state, str(sender)))
+            receive.node = generate_node(init_states[1 - i], children={sender: None})
+            await deliver(utils.get_red_envelope(raw_state, sender))
             assert receive.node.state == init_states[1 - i]
             await asyncio.sleep(1)
             assert receive.node.state == init_states[i - 1]
@@ -115,31 +112,24 @@ class TestNode:
 
         :return: None
         """
-        child_1 = '21000'
-        child_2 = '22000'
+        child_1 = '2.1'
+        child_2 = '2.2'
 
-        receive.node = generate_node(State.Stopped, children={int(child_1): (None, 0),
-                                                              int(child_2): (None, 0)})
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Starting', child_1))
+        receive.node = generate_node(State.Stopped, children={child_1: (None, 0), child_2: (None, 0)})
+        await deliver(utils.get_red_envelope('Starting', child_1))
         assert receive.node.state == State.Stopped  # node created with this state
         await asyncio.sleep(1)
         assert receive.node.state == State.Initialisation  # default state when missing notification from any child
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Stopped', child_2))
+        await deliver(utils.get_red_envelope('Stopped', child_2))
         await asyncio.sleep(1)
         assert receive.node.state == State.Stopped  # one child Stopped one Starting -> Stopped
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Running', child_2))
+        await deliver(utils.get_red_envelope('Running', child_2))
         await asyncio.sleep(1)
         assert receive.node.state == State.Starting  # one child Running one Starting -> Starting
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Running', child_1))
+        await deliver(utils.get_red_envelope('Running', child_1))
         await asyncio.sleep(1)
         assert receive.node.state == State.Running  # all children Running
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Error', child_1))
+        await deliver(utils.get_red_envelope('Error', child_1))
         await asyncio.sleep(1)
         assert receive.node.state == State.Error  # at least one child in Error state
 
@@ -155,9 +145,7 @@ class TestNode:
         raw_state = str(State.Running).split('.')[-1]
 
         receive.node = generate_node(State.Stopped)
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_orange_envelope(raw_state))
+        await deliver(utils.get_orange_envelope(raw_state))
         assert receive.node.state == State.Stopped
         await asyncio.sleep(1)
         assert receive.node.state == State.Starting
@@ -176,9 +164,7 @@ class TestNode:
         raw_state = str(State.Stopped).split('.')[-1]
 
         receive.node = generate_node(State.Error)
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_orange_envelope(raw_state))
+        await deliver(utils.get_orange_envelope(raw_state))
         assert receive.node.state == State.Error
         await asyncio.sleep(1)
         assert receive.node.state == State.Error
@@ -195,9 +181,7 @@ class TestNode:
         raw_state = str(State.Stopped).split('.')[-1]
 
         receive.node = generate_node(State.Running)
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_orange_envelope(raw_state))
+        await deliver(utils.get_orange_envelope(raw_state))
         assert receive.node.state == State.Running
         await asyncio.sleep(1)
         assert receive.node.state == State.Stopped
@@ -211,43 +195,407 @@ class TestNode:
 
         :return: None
         """
-        child_1 = '21000'
-        child_2 = '22000'
+        child_1 = '2.1'
+        child_2 = '2.2'
 
         raw_state = str(State.Running).split('.')[-1]
 
         receive.node = generate_node(State.Stopped)
-        receive.node.children = {int(child_1): (None, 0), int(child_2): (None, 0)}
-        receive.loop = asyncio.get_event_loop()
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_orange_envelope(raw_state))
+        receive.node.children = {child_1: (None, 0), child_2: (None, 0)}
+        await deliver(utils.get_orange_envelope(raw_state))
         assert receive.node.state == State.Stopped
         await asyncio.sleep(1)
         assert receive.node.state == State.Starting
         await asyncio.sleep(configuration['node']['time']['starting'])
         assert receive.node.state == State.Starting  # node won't change the state before its child
 
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Running', child_2))
+        await deliver(utils.get_red_envelope('Running', child_2))
         await asyncio.sleep(1)
         assert receive.node.state == State.Starting  # one child Running one is expedited to be in Starting -> Starting
-        receive.callback(_ch=None, method=MethodStub(), _properties=None,
-                         body=utils.get_red_envelope('Running', child_1))
+        await deliver(utils.get_red_envelope('Running', child_1))
         await asyncio.sleep(configuration['node']['time']['starting'])
         assert receive.node.state == State.Running
 
         loop_stop()
 
 
-def generate_node(state: State, address: str = '127.0.0.0:20000', children: dict[int, (State, int)] = None) -> Node:
-    node_add = NodeAddress(address)
-    node = Node(node_add)
+class TestConsumer:
+    @pytest.mark.asyncio
+    async def test_acknowledge(self):
+        """
+        Test that message is processed on the running loop and acknowledged once it is processed by the node
+
+        :return: None
+        """
+        channel = AmqpChannelStub()
+        node = generate_node(State.Running, children={'2.1': (State.Running, 0)})
+        body = utils.get_red_envelope(str(State.Error).split('.')[-1], '2.1')
+        await receive.on_message(node, channel, body, EnvelopeStub(7), None)
+        assert channel.acknowledged == []
+        await asyncio.gather(*receive.handlers)
+        assert channel.acknowledged == [7]
+        assert node.state == State.Error
+
+    @pytest.mark.asyncio
+    async def test_failed_processing(self, monkeypatch):
+        """
+        Test that message is not acknowledged when its processing is cancelled and rejected when it fails
+
+        :return: None
+        """
+        channel = AmqpChannelStub()
+        node = generate_node(State.Running, children={'2.1': (State.Running, 0)})
+        body = utils.get_red_envelope(str(State.Error).split('.')[-1], '2.1')
+        started = asyncio.Event()
+
+        async def process_notification(state: str, sender_id: str, time_stamp: float) -> None:
+            started.set()
+            await asyncio.sleep(1)
+
+        monkeypatch.setattr(node, 'process_notification', process_notification)
+        await receive.on_message(node, channel, body, EnvelopeStub(5), None)
+        # cancel the processing in the middle, not before the handler starts
+        await started.wait()
+        for task in receive.handlers:
+            task.cancel()
+        await asyncio.gather(*receive.handlers, return_exceptions=True)
+        assert channel.acknowledged == [] and channel.rejected == []
+
+        async def process_failure(state: str, sender_id: str, time_stamp: float) -> None:
+            raise RuntimeError('processing failed')
+
+        monkeypatch.setattr(node, 'process_notification', process_failure)
+        await receive.on_message(node, channel, body, EnvelopeStub(6), None)
+        await asyncio.gather(*receive.handlers)
+        assert channel.acknowledged == [] and channel.rejected == [6]
+
+    @pytest.mark.asyncio
+    async def test_batch(self, monkeypatch):
+        """
+        Test that notifications of all children in purple envelope update the state of the node once
+
+        :return: None
+        """
+        for envelope_format, version in [('json', 1), ('proto', 1), ('proto', 2)]:
+            monkeypatch.setitem(utils.configuration['rabbitmq'], 'envelope_format', envelope_format)
+            monkeypatch.setitem(utils.configuration['rabbitmq'], 'envelope_version', version)
+            channel = AmqpChannelStub()
+            node = generate_node(State.Starting, children={'2.1': (State.Starting, 0), '2.2': (State.Starting, 0)})
+            updates = []
+            update_state = node.update_state
+            monkeypatch.setattr(node, 'update_state', lambda: updates.append(1) or update_state())
+            notifications = [records.Notification('Stopped', child_id, time.time()) for child_id in ['2.1', '2.2']]
+            body = utils.get_purple_envelope(notifications)
+            assert utils.decode_record(body, ['red']) is None
+            await receive.on_message(node, channel, body, EnvelopeStub(9), None)
+            await asyncio.gather(*receive.handlers)
+            assert channel.acknowledged == [9]
+            assert node.state == State.Stopped
+            assert updates == [1]
+
+    @pytest.mark.asyncio
+    async def test_reject_invalid(self):
+        """
+        Test that invalid message is rejected and not processed
+
+        :return: None
+        """
+        channel = AmqpChannelStub()
+        node = generate_node(State.Running, children={'2.1': (State.Running, 0)})
+        await receive.on_message(node, channel, b'invalid', EnvelopeStub(8), None)
+        assert channel.acknowledged == []
+        assert channel.rejected == [8]
+        assert node.state == State.Running
+
+
+class TestRpcServer:
+    def teardown_method(self):
+        model.configuration['node']['time']['get'] = configuration['node']['time']['get']
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self):
+        """
+        Test that outstanding get_state requests are answered concurrently within one get interval
+
+        :return: None
+        """
+        model.configuration['node']['time']['get'] = 1
+        channel = AmqpChannelStub()
+        node = generate_node(State.Running)
+        limit = asyncio.Semaphore(100)
+        request = utils.get_white_envelope('get_state')
+        start = time.time()
+        await asyncio.gather(*[node.reply_state(channel, request, EnvelopeStub(i), PropertiesStub(), limit)
+                               for i in range(10)])
+        assert time.time() - start < 2
+        assert sorted(channel.acknowledged) == list(range(10))
+        assert all(utils.get_dict_from_envelope(reply, ['blue'])['state'] == 'Running' for reply in channel.replies)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """
+        Test that no more than allowed number of get_state requests is processed at once
+
+        :return: None
+        """
+        model.configuration['node']['time']['get'] = 0.5
+        channel = AmqpChannelStub()
+        node = generate_node(State.Running)
+        limit = asyncio.Semaphore(2)
+        request = utils.get_white_envelope('get_state')
+        start = time.time()
+        await asyncio.gather(*[node.reply_state(channel, request, EnvelopeStub(i), PropertiesStub(), limit)
+                               for i in range(4)])
+        assert time.time() - start >= 1
+        assert len(channel.replies) == 4
+
+
+    @pytest.mark.asyncio
+    async def test_snapshot_reply(self):
+        """
+        Test that reply to get_snapshot contains states of the whole subtree
+
+        :return: None
+        """
+        model.configuration['node']['time']['get'] = 0
+        channel = AmqpChannelStub()
+        node = generate_node(State.Running, children={'2.1': (State.Running, 0)})
+        node.host = host.NodeHost()
+        node.host.add(node)
+        child = generate_node(State.Stopped, node_id='2.1')
+        node.host.add(child)
+        request = utils.get_white_envelope('get_snapshot')
+        await node.reply_state(channel, request, EnvelopeStub(1), PropertiesStub(), asyncio.Semaphore(1))
+        reply = utils.get_dict_from_envelope(channel.replies[0], ['blue'])
+        assert reply['state'] == 'Running'
+        assert reply['states'] == {'2': 'Running', '2.1': 'Stopped'}
+        assert channel.acknowledged == [1]
+
+
+class TestEnvelopeV2:
+    def teardown_method(self):
+        utils.configuration['rabbitmq']['envelope_format'] = configuration['rabbitmq']['envelope_format']
+        utils.configuration['rabbitmq']['envelope_version'] = configuration['rabbitmq']['envelope_version']
+        model.configuration['node']['time']['get'] = configuration['node']['time']['get']
+
+    def test_same_content(self):
+        """
+        Test that envelope v2 is smaller and decoded into the same content as envelope v1
+
+        :return: None
+        """
+        utils.configuration['rabbitmq']['envelope_format'] = 'proto'
+        encoders = {'white': lambda: utils.get_white_envelope('get_snapshot'),
+                    'blue': lambda: utils.get_blue_envelope('Running', {'2': 'Running', '2.10': 'Error'}),
+                    'red': lambda: utils.get_red_envelope('Error', '2.3.4'),
+                    'orange': lambda: utils.get_orange_envelope('Running', 0.5)}
+        for color, encoder in encoders.items():
+            utils.configuration['rabbitmq']['envelope_version'] = 1
+            v1 = encoder()
+            utils.configuration['rabbitmq']['envelope_version'] = 2
+            v2 = encoder()
+            assert utils.get_envelope_version(v1) == 1 and utils.get_envelope_version(v2) == 2
+            assert len(v2) < len(v1)
+            content_v1 = utils.get_dict_from_envelope(v1, [color])
+            content_v2 = utils.get_dict_from_envelope(v2, [color])
+            content_v1.pop('time_stamp', None)
+            content_v2.pop('time_stamp', None)
+            assert content_v1 == content_v2
+
+    def test_time_stamp_precision(self):
+        """
+        Test that time stamp of notification in envelope v2 keeps sub-second precision
+
+        :return: None
+        """
+        utils.configuration['rabbitmq']['envelope_format'] = 'proto'
+        utils.configuration['rabbitmq']['envelope_version'] = 2
+        before = time.time()
+        time_stamp = utils.get_dict_from_envelope(utils.get_red_envelope('Running', '2.1'), ['red'])['time_stamp']
+        assert before <= time_stamp <= time.time()
+
+    @pytest.mark.asyncio
+    async def test_reply_version(self):
+        """
+        Test that rpc server replies in the envelope version of the request
+
+        :return: None
+        """
+        utils.configuration['rabbitmq']['envelope_format'] = 'proto'
+        model.configuration['node']['time']['get'] = 0
+        node = generate_node(State.Running)
+        for version in [1, 2]:
+            channel = AmqpChannelStub()
+            utils.configuration['rabbitmq']['envelope_version'] = version
+            request = utils.get_white_envelope('get_state')
+            utils.configuration['rabbitmq']['envelope_version'] = 3 - version
+            await node.reply_state(channel, request, EnvelopeStub(1), PropertiesStub(), asyncio.Semaphore(1))
+            assert utils.get_envelope_version(channel.replies[0]) == version
+            assert utils.get_dict_from_envelope(channel.replies[0], ['blue'])['state'] == 'Running'
+
+
+class TestRecords:
+    def teardown_method(self):
+        utils.configuration['rabbitmq']['envelope_format'] = configuration['rabbitmq']['envelope_format']
+        utils.configuration['rabbitmq']['envelope_version'] = configuration['rabbitmq']['envelope_version']
+
+    def test_same_content(self):
+        """
+        Test that envelopes of all formats are decoded into records with the same content as dictionaries
+
+        :return: None
+        """
+        for envelope_format, version in [('json', 1), ('proto', 1), ('proto', 2)]:
+            utils.configuration['rabbitmq']['envelope_format'] = envelope_format
+            utils.configuration['rabbitmq']['envelope_version'] = version
+            red = utils.get_red_envelope('Error', '2.3.4')
+            notification = utils.get_record_from_envelope(red, ['red'])
+            assert isinstance(notification, records.Notification)
+            assert (notification.state, notification.sender) == ('Error', '2.3.4')
+            # float time stamp of v1 is rounded by the dictionary conversion
+            assert notification.time_stamp == pytest.approx(utils.get_dict_from_envelope(red, ['red'])['time_stamp'])
+            change_state = utils.get_record_from_envelope(utils.get_orange_envelope('Running', 0.5), ['orange'])
+            assert (change_state.state, change_state.chance_to_fail) == ('Running', 0.5)
+            request = utils.get_record_from_envelope(utils.get_white_envelope('get_snapshot'), ['white'])
+            assert request.action == 'get_snapshot'
+            reply = utils.get_record_from_envelope(utils.get_blue_envelope('Running', {'2': 'Running'}), ['blue'])
+            assert (reply.state, reply.states) == ('Running', {'2': 'Running'})
+
+    def test_invalid(self):
+        """
+        Test that invalid envelope or unexpected envelope type is not decoded
+
+        :return: None
+        """
+        utils.configuration['rabbitmq']['envelope_format'] = 'proto'
+        for version in [1, 2]:
+            utils.configuration['rabbitmq']['envelope_version'] = version
+            assert utils.decode_record(utils.get_red_envelope('Running', '2.0.1'), ['red']) is None
+            assert utils.decode_record(utils.get_white_envelope('get_state'), ['red', 'orange']) is None
+            assert utils.decode_record(b'invalid', ['red']) is None
+
+
+class TestEnvelopeCache:
+    def teardown_method(self):
+        utils.configuration['rabbitmq']['envelope_format'] = configuration['rabbitmq']['envelope_format']
+        utils.configuration['rabbitmq']['envelope_version'] = configuration['rabbitmq']['envelope_version']
+
+    def test_same_envelope(self, monkeypatch):
+        """
+        Test that cached envelopes with patched time stamp are identical to freshly serialised envelopes
+
+        :return: None
+        """
+        for envelope_format, version in [('json', 1), ('proto', 1), ('proto', 2)]:
+            utils.configuration['rabbitmq']['envelope_format'] = envelope_format
+            utils.configuration['rabbitmq']['envelope_version'] = version
+            for time_stamp in [1700000000.123456, 0.5]:
+                monkeypatch.setattr(time, 'time', lambda: time_stamp)
+                assert utils.get_red_envelope('Running', '2.1.3') == utils.encode_red_envelope(
+                    'Running', '2.1.3', time_stamp, envelope_format, version)
+                assert utils.get_record_from_envelope(utils.get_red_envelope('Error', '2.1'), ['red']).sender == '2.1'
+            assert utils.get_orange_envelope('Running', 0.5) is utils.get_orange_envelope('Running', 0.5)
+            assert utils.get_white_envelope('get_state') is utils.get_white_envelope('get_state')
+            assert utils.get_blue_envelope('Stopped') == utils.encode_blue_envelope('Stopped', envelope_format, version)
+
+    def test_format_switch(self):
+        """
+        Test that cached envelope of one format is not reused after the format is changed
+
+        :return: None
+        """
+        utils.configuration['rabbitmq']['envelope_format'] = 'json'
+        assert isinstance(utils.get_orange_envelope('Running'), str)
+        utils.configuration['rabbitmq']['envelope_format'] = 'proto'
+        assert isinstance(utils.get_orange_envelope('Running'), bytes)
+
+
+class TestBroadcast:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+        model.configuration['rabbitmq']['broadcast'] = 'none'
+        receive.configuration['rabbitmq']['broadcast'] = 'none'
+
+    def test_binding_keys(self):
+        """
+        Test that queue is bound to the broadcast of its parent or all its ancestors
+
+        :return: None
+        """
+        node = Node('2.1.3')
+        assert receive.get_binding_keys(node) == ['2.1.3']
+        receive.configuration['rabbitmq']['broadcast'] = 'children'
+        assert receive.get_binding_keys(node) == ['2.1.3', '2.1.children']
+        receive.configuration['rabbitmq']['broadcast'] = 'subtree'
+        assert receive.get_binding_keys(node) == ['2.1.3', '2.1.subtree', '2.subtree']
+        assert receive.get_binding_keys(Node('2')) == ['2']
+
+    @pytest.mark.asyncio
+    async def test_single_publish(self, monkeypatch):
+        """
+        Test that change state is published once for all children and not published again by the receivers of the
+        subtree broadcast
+
+        :return: None
+        """
+        published = []
+
+        async def post_state_change(new_state: str, routing_key: str, chance_to_fail: float = 0) -> None:
+            published.append(routing_key)
+
+        monkeypatch.setattr(send, 'post_state_change', post_state_change)
+        model.Node.depth = 1
+        model.Node.arity = 100
+        node = generate_node(State.Running)
+        model.configuration['rabbitmq']['broadcast'] = 'children'
+        await node.send_to_children(State.Stopped)
+        assert published == ['2.children']
+        assert node.children.count(State.Starting) == 100
+        model.configuration['rabbitmq']['broadcast'] = 'subtree'
+        await node.send_to_children(State.Stopped, propagate=False)
+        assert published == ['2.children']
+
+    @pytest.mark.asyncio
+    async def test_children_running_first(self, monkeypatch):
+        """
+        Test that duration is measured when all children of the subtree broadcast report Running while their parent is
+        still starting
+
+        :return: None
+        """
+        measurements = []
+        monkeypatch.setattr(model, 'add_measurement', lambda *values: measurements.append(values))
+        monkeypatch.setitem(model.configuration['measurement'], 'write', True)
+        monkeypatch.setitem(model.configuration['node']['time'], 'starting', 0.1)
+        model.Node.depth = 2
+        model.Node.arity = 2
+        node = generate_node(State.Stopped, '2.1', {'2.1.1': (State.Stopped, 0), '2.1.2': (State.Stopped, 0)})
+        monkeypatch.setattr(node, 'notify_parent', lambda: asyncio.sleep(0))
+        monkeypatch.setattr(node, 'run', lambda: asyncio.sleep(0))
+        starting = asyncio.create_task(node.process_state_change(start_argument=0, propagate=False))
+        await asyncio.sleep(0)
+        assert node.state == State.Starting
+        await node.process_notifications([records.Notification('State.Running', child_id, 1)
+                                          for child_id in node.children])
+        await starting
+        assert len(measurements) == 1
+        assert measurements[0][1] == '2.1'
+        assert measurements[0][2] >= 0
+
+
+def generate_node(state: State, node_id: str = '2', children: dict[str, (State, int)] = None) -> Node:
+    node = Node(node_id)
     node.state = state
     if children:
         node.children = children
     return node
 
 
+async def deliver(body) -> None:
+    await receive.on_message(receive.node, AmqpChannelStub(), body, EnvelopeStub(1), None)
+
+
 def loop_stop():
     for task in sorted(list(asyncio.all_tasks()), key=lambda x: int(x.get_name().split('-')[-1]))[1:]:
         task.cancel()
@@ -287,3 +635,27 @@ class PropertiesStub:
 def do_something(request):
     original_architecture = utils.set_architecture('MOM')
     request.addfinalizer(lambda: utils.set_architecture(original_architecture))
+
+
+class AmqpChannelStub:
+
+    def __init__(self):
+        self.acknowledged = []
+        self.rejected = []
+        self.replies = []
+
+    async def basic_publish(self, payload, exchange_name, routing_key, properties=None):
+        self.replies.append(payload)
+
+    async def basic_client_ack(self, delivery_tag):
+        self.acknowledged.append(delivery_tag)
+
+    async def basic_client_nack(self, delivery_tag, requeue=True):
+        self.rejected.append(delivery_tag)
+
+
+class EnvelopeStub:
+
+    def __init__(self, delivery_tag: int, routing_key: str = '2'):
+        self.delivery_tag = delivery_tag
+        self.routing_key = routing_key
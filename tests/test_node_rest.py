@@ -151,7 +151,7 @@ def get_children_ports(parent_port: str):
     :param parent_port: port number
     :return:
     """
-    child_level = utils.compute_hierarchy_level(parent_port) + 1
+    child_level = utils.compute_hierarchy_level(utils.get_node_id(parent_port)) + 1
     ports = set()
     for child in range(int(CHILDREN)):
         node_port = list(parent_port)
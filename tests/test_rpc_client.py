@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import utils
+from rpc_client import AsyncStateRpcClient
+
+
+class ChannelStub:
+
+    def __init__(self):
+        self.is_open = True
+        self.requests = []
+
+    async def basic_publish(self, payload, exchange_name, routing_key, properties=None):
+        self.requests.append((routing_key, properties))
+
+
+class PropertiesStub:
+
+    def __init__(self, correlation_id: str):
+        self.correlation_id = correlation_id
+
+
+def get_client() -> (AsyncStateRpcClient, ChannelStub):
+    rpc_client = AsyncStateRpcClient()
+    rpc_client.channel = ChannelStub()
+    rpc_client.callback_queue = 'reply_to'
+    return rpc_client, rpc_client.channel
+
+
+async def reply(rpc_client: AsyncStateRpcClient, channel: ChannelStub, requests: int, states: dict[str, str]) -> None:
+    """
+    Reply in reversed order to all published requests of the nodes with known state
+
+    :param rpc_client: client waiting for the replies
+    :param channel: channel with published requests
+    :param requests: number of requests to wait for
+    :param states: state of the node by its rpc queue
+    :return: None
+    """
+    while len(channel.requests) < requests:
+        await asyncio.sleep(0)
+    for routing_key, properties in reversed(channel.requests):
+        assert properties['reply_to'] == 'reply_to'
+        if routing_key in states:
+            body = utils.get_blue_envelope(states[routing_key])
+            await rpc_client.on_response(None, body, None, PropertiesStub(properties['correlation_id']))
+
+
+class TestAsyncRpcClient:
+    @pytest.mark.asyncio
+    async def test_multiplexing(self):
+        """
+        Test that replies arriving in any order to the shared reply queue are matched to the requests
+
+        :return: None
+        """
+        rpc_client, channel = get_client()
+        states = {'rpc_queue:2': 'Running', 'rpc_queue:2.1': 'Stopped', 'rpc_queue:2.2': 'Error'}
+        replies = asyncio.create_task(reply(rpc_client, channel, len(states), states))
+        result = await rpc_client.gather_states(['2', '2.1', '2.2'], timeout=1)
+        await replies
+        assert result == {'2': 'Running', '2.1': 'Stopped', '2.2': 'Error'}
+        assert rpc_client.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """
+        Test that request without reply ends after its timeout and does not block other requests
+
+        :return: None
+        """
+        rpc_client, channel = get_client()
+        replies = asyncio.create_task(reply(rpc_client, channel, 2, {'rpc_queue:2.2': 'Running'}))
+        start = asyncio.get_running_loop().time()
+        result = await rpc_client.gather_states(['2.1', '2.2'], timeout=0.5)
+        await replies
+        assert result == {'2.1': None, '2.2': 'Running'}
+        assert 0.5 <= asyncio.get_running_loop().time() - start < 1
+        assert rpc_client.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_zero_timeout(self):
+        """
+        Test that explicit zero timeout is not replaced by rabbitmq.rpc_timeout
+
+        :return: None
+        """
+        rpc_client, channel = get_client()
+        start = asyncio.get_running_loop().time()
+        assert await rpc_client.call('2.1', timeout=0) is None
+        assert asyncio.get_running_loop().time() - start < 0.5
+        assert len(channel.requests) == 1
+        assert rpc_client.pending == {}
@@ -0,0 +1,105 @@
+import asyncio
+
+import aioamqp
+import pytest
+
+import send
+
+
+class ChannelStub:
+
+    def __init__(self):
+        self.published = []
+        self.close_event = asyncio.Event()
+
+    async def basic_publish(self, payload, exchange_name, routing_key):
+        self.published.append(routing_key)
+
+
+class FrameStub:
+
+    def __init__(self, delivery_tag: int, multiple: bool = False):
+        self.delivery_tag = delivery_tag
+        self.multiple = multiple
+
+
+class TestPublisher:
+    @pytest.mark.asyncio
+    async def test_batch(self):
+        """
+        Test that messages pushed at the same time are written by one flush and confirmed by one multiple ack
+
+        :return: None
+        """
+        channel = ChannelStub()
+        publisher = send.Publisher(channel, confirms=True, window=100)
+        futures = [publisher.push(send.STATE_EXCHANGE, '2.' + str(i), b'message') for i in range(1, 11)]
+        assert channel.published == []
+        await asyncio.sleep(0)
+        await publisher.flush_task
+        assert channel.published == ['2.' + str(i) for i in range(1, 11)]
+        assert not any(future.done() for future in futures)
+        await channel.basic_server_ack(FrameStub(10, multiple=True))
+        assert all(future.result() for future in futures)
+        assert publisher.unconfirmed == {}
+
+    @pytest.mark.asyncio
+    async def test_window(self):
+        """
+        Test that no more than window messages wait for confirmation and negative acknowledgement is reported
+
+        :return: None
+        """
+        channel = ChannelStub()
+        publisher = send.Publisher(channel, confirms=True, window=2)
+        futures = [publisher.push(send.STATE_EXCHANGE, '2.' + str(i), b'message') for i in range(1, 4)]
+        await asyncio.sleep(0.1)
+        assert len(channel.published) == 2
+        await channel.basic_server_nack(FrameStub(1))
+        await asyncio.sleep(0.1)
+        assert len(channel.published) == 3
+        with pytest.raises(aioamqp.PublishFailed):
+            futures[0].result()
+        await channel.basic_server_ack(FrameStub(3, multiple=True))
+        assert futures[1].result() and futures[2].result()
+
+    @pytest.mark.asyncio
+    async def test_missing_ack(self):
+        """
+        Test that message without confirmation releases the full window once its waiting times out, so the next
+        message is still published
+
+        :return: None
+        """
+        channel = ChannelStub()
+        publisher = send.Publisher(channel, confirms=True, window=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(publisher.push(send.STATE_EXCHANGE, '2.1', b'message'), 0.1)
+        assert publisher.unconfirmed == {}
+        future = publisher.push(send.STATE_EXCHANGE, '2.2', b'message')
+        await asyncio.sleep(0.1)
+        assert channel.published == ['2.1', '2.2']
+        await channel.basic_server_ack(FrameStub(2))
+        assert future.result()
+
+    @pytest.mark.asyncio
+    async def test_closed_channel(self):
+        """
+        Test that queued and unconfirmed messages fail once the channel is closed and delivery tags start again
+
+        :return: None
+        """
+        channel = ChannelStub()
+        publisher = send.Publisher(channel, confirms=True, window=1)
+        watcher = asyncio.create_task(publisher.watch())
+        futures = [publisher.push(send.STATE_EXCHANGE, '2.' + str(i), b'message') for i in range(1, 3)]
+        await asyncio.sleep(0.1)
+        assert channel.published == ['2.1']
+        channel.close_event.set()
+        await watcher
+        for future in futures:
+            with pytest.raises(aioamqp.ChannelClosed):
+                future.result()
+        await publisher.flush_task
+        assert channel.published == ['2.1']
+        assert publisher.unconfirmed == {} and publisher.delivery_tag == 0
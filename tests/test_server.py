@@ -0,0 +1,269 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+import pytest
+
+import client
+import model
+import records
+import server
+import message
+from message import NotificationBatch
+from model import State
+
+GET = 0.2
+
+
+class TestServer:
+    @pytest.mark.asyncio
+    async def test_concurrent_get_state(self, monkeypatch):
+        """
+        Test that simulated delay of concurrent get_state requests does not add up
+
+        :return: None
+        """
+        monkeypatch.setitem(server.configuration['node']['time'], 'get', GET)
+        monkeypatch.setattr(server, 'node', get_node())
+        start = time.perf_counter()
+        replies = await asyncio.gather(*[server.get_state(RequestStub()) for _ in range(200)])
+        assert time.perf_counter() - start < 4 * GET
+        assert replies == [{"State": str(State.Stopped)}] * 200
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, monkeypatch):
+        """
+        Test that at most REST.concurrency get_state requests are processed at once
+
+        :return: None
+        """
+        monkeypatch.setitem(server.configuration['node']['time'], 'get', GET)
+        monkeypatch.setattr(server, 'node', get_node())
+        monkeypatch.setattr(server, 'get_state_limit', asyncio.Semaphore(2))
+        start = time.perf_counter()
+        await asyncio.gather(*[server.get_state(RequestStub()) for _ in range(4)])
+        assert time.perf_counter() - start >= 2 * GET
+
+    @pytest.mark.asyncio
+    async def test_notify_batch(self, monkeypatch):
+        """
+        Test that batch of notifications sent by the client updates all children and the state of the node once
+
+        :return: None
+        """
+        requests = []
+
+        async def request_node(endpoint, params) -> None:
+            requests.append(params)
+
+        monkeypatch.setattr(client, 'request_node', request_node)
+        notifications = [records.Notification('State.Stopped', child_id, time.time()) for child_id in ['2.1', '2.2']]
+        for pydantic in [True, False]:
+            monkeypatch.setitem(client.configuration['REST'], 'pydantic', pydantic)
+            monkeypatch.setitem(server.configuration['REST'], 'pydantic', pydantic)
+            node = get_node()
+            node.state = State.Starting
+            node.children = {'2.1': (State.Starting, 0), '2.2': (State.Starting, 0)}
+            monkeypatch.setattr(server, 'node', node)
+            await client.post_notifications('127.0.0.1:20000', notifications)
+            if pydantic:
+                await server.notify_batch(RequestStub(), batch=NotificationBatch.parse_obj(requests.pop()))
+            else:
+                params = requests.pop()
+                await server.notify_batch(RequestStub(), state=[value for name, value in params if name == 'state'],
+                                          sender=[value for name, value in params if name == 'sender'],
+                                          time_stamp=[float(value) for name, value in params if name == 'time_stamp'])
+            assert node.state == State.Stopped
+            assert [entry[0] for entry in node.children.values()] == [State.Stopped, State.Stopped]
+
+    @pytest.mark.asyncio
+    async def test_incomplete_batch(self, monkeypatch):
+        """
+        Test that batch without body or with missing attributes of some notification is rejected and no child entry
+        is updated
+
+        :return: None
+        """
+        node = get_node()
+        node.children = {'2.1': (State.Starting, 0), '2.2': (State.Starting, 0)}
+        monkeypatch.setattr(server, 'node', node)
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', True)
+        with pytest.raises(server.HTTPException) as error:
+            await server.notify_batch(RequestStub())
+        assert error.value.status_code == 400
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', False)
+        with pytest.raises(server.HTTPException) as error:
+            await server.notify_batch(RequestStub(), state=['State.Stopped', 'State.Stopped'], sender=['2.1', '2.2'],
+                                      time_stamp=[time.time()])
+        assert error.value.status_code == 400
+        assert [entry[0] for entry in node.children.values()] == [State.Starting, State.Starting]
+
+    def test_fast_validation(self):
+        """
+        Test that hand-written validation accepts and rejects the same input as pydantic models
+
+        :return: None
+        """
+        commands = [{'start': '0.5'}, {'start': 1}, {'stop': '_'}, {'start': '2'}, {'start': '-0.1'}, {'stop': 'x'},
+                    {'start': '0', 'stop': '_'}, {}]
+        for command in commands:
+            assert is_valid(lambda: message.ChangeState(**command)) == is_valid(
+                lambda: message.validate_change_state(command))
+        notifications = [{'state': 'State.Running', 'sender': '2.1'}, {'state': 'Stopped', 'sender': '2.10.3'},
+                         {'state': 'State.Unknown', 'sender': '2.1'}, {'state': 'Error', 'sender': '2.0'},
+                         {'state': 'Error', 'sender': '2.a'}, {'state': 'Error', 'sender': ''},
+                         {'state': 'State.Running', 'sender': 21}, {'state': 'Running', 'sender': 2.1},
+                         {'state': 'Running', 'sender': None}, {'state': 3, 'sender': '2.1'}]
+        for notification in notifications:
+            assert is_valid(lambda: message.Notification(**notification)) == is_valid(
+                lambda: message.validate_notification(notification))
+
+    @pytest.mark.asyncio
+    async def test_fast_app(self, monkeypatch):
+        """
+        Test that raw ASGI application processes notification and rejects invalid one
+
+        :return: None
+        """
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', True)
+        node = get_node()
+        node.children = {'2.1': (State.Stopped, 0)}
+        monkeypatch.setattr(server, 'node', node)
+        response = await call_fast_app('POST', server.configuration['URL']['notification'],
+                                       {'state': 'State.Error', 'sender': '2.1'})
+        assert response == [200, b'null']
+        assert node.state == State.Error
+        response = await call_fast_app('POST', server.configuration['URL']['notification'],
+                                       {'state': 'State.Error', 'sender': '2.0'})
+        assert response == [400, b'Validation Error']
+
+    @pytest.mark.asyncio
+    async def test_fast_app_without_pydantic(self, monkeypatch):
+        """
+        Test that raw ASGI application without pydantic validation rejects unknown state with 400
+
+        :return: None
+        """
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', False)
+        node = get_node()
+        node.children = {'2.1': (State.Stopped, 0)}
+        monkeypatch.setattr(server, 'node', node)
+        response = await call_fast_app('POST', server.configuration['URL']['notification'],
+                                       {'state': 'State.Unknown', 'sender': '2.1'})
+        assert response == [400, b'Validation Error']
+        response = await call_fast_app('POST', server.configuration['URL']['notification'],
+                                       {'state': 'State.Error', 'sender': '2.1'})
+        assert response == [200, b'null']
+        assert node.state == State.Error
+
+    @pytest.mark.asyncio
+    async def test_stream_frames(self, monkeypatch):
+        """
+        Test that frames of the stream are processed as equivalent requests and invalid frame is dropped
+
+        :return: None
+        """
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', True)
+        monkeypatch.setattr(server, 'command_queues', dict())
+        node = get_node()
+        node.state = State.Starting
+        node.children = {'2.1': (State.Starting, 0), '2.2': (State.Starting, 0)}
+        await server.receive_frame(node, {'path': server.configuration['URL']['notification'],
+                                          'values': {'state': 'State.Stopped', 'sender': '2.1'}})
+        await server.receive_frame(node, {'path': server.configuration['URL']['notification_batch'],
+                                          'values': {'notifications': [{'state': 'State.Stopped', 'sender': '2.2'}]}})
+        await asyncio.gather(*server.frame_tasks)
+        assert node.state == State.Stopped
+        await server.receive_frame(node, {'path': server.configuration['URL']['notification'],
+                                          'values': {'state': 'State.Error', 'sender': '2.0'}})
+        await server.receive_frame(node, {'path': server.configuration['URL']['change_state'],
+                                          'values': {'stop': '_'}})
+        await asyncio.sleep(0.1)
+        assert node.state == State.Stopped
+        for task in server.frame_tasks:
+            task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_stream_propagation(self, monkeypatch):
+        """
+        Test that notification frame waiting for delivery to the parent does not block the next frames of the stream
+
+        :return: None
+        """
+        delivered = asyncio.Event()
+        requests = []
+
+        async def request_node(endpoint, params) -> None:
+            requests.append(params)
+            await delivered.wait()
+
+        monkeypatch.setattr(client, 'request_node', request_node)
+        monkeypatch.setitem(model.configuration, 'architecture', 'REST')
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', True)
+        node = model.Node('2.1')
+        node.state = State.Starting
+        node.children = {'2.1.1': (State.Starting, 0), '2.1.2': (State.Starting, 0)}
+        for child_id in node.children:
+            await server.receive_frame(node, {'path': server.configuration['URL']['notification'],
+                                              'values': {'state': 'State.Stopped', 'sender': child_id}})
+        await asyncio.sleep(0.1)
+        assert len(requests) == 1
+        assert [entry[0] for entry in node.children.values()] == [State.Stopped, State.Stopped]
+        delivered.set()
+        await asyncio.gather(*server.frame_tasks)
+
+    @pytest.mark.asyncio
+    async def test_stream_initialisation(self, monkeypatch):
+        """
+        Test that command frame received by initialising node is applied once the node is initialised
+
+        :return: None
+        """
+        monkeypatch.setitem(server.configuration['REST'], 'pydantic', True)
+        monkeypatch.setattr(server, 'command_queues', dict())
+        node = get_node()
+        node.state = State.Initialisation
+        await server.receive_frame(node, {'path': server.configuration['URL']['change_state'],
+                                          'values': {'start': '0'}})
+        await asyncio.sleep(0.1)
+        assert node.state == State.Initialisation
+        node.state = State.Stopped
+        await asyncio.sleep(1)
+        assert node.state in [State.Starting, State.Running]
+        for task in server.frame_tasks:
+            task.cancel()
+
+
+def is_valid(validation) -> bool:
+    try:
+        validation()
+        return True
+    except (message.ValidationError, ValueError):
+        return False
+
+
+async def call_fast_app(method: str, path: str, values: dict) -> list:
+    body = json.dumps(values).encode()
+    response = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(event):
+        response.append(event.get('status', event.get('body')))
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': urlencode(values).encode(),
+             'server': ('127.0.0.1', 0)}
+    await server.fast_app(scope, receive, send)
+    return response
+
+
+def get_node() -> model.Node:
+    node = model.Node('2')
+    node.state = State.Stopped
+    return node
+
+
+class RequestStub:
+    scope = {'server': ('127.0.0.1', 0)}
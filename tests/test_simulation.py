@@ -0,0 +1,50 @@
+import asyncio
+
+import model
+import simulation
+
+configuration: dict[str, str | dict[str, str | dict]] = simulation.configuration
+
+
+class TestSimulation:
+    def teardown_method(self):
+        model.Node.depth = 0
+        model.Node.arity = 0
+
+    def test_virtual_clock(self):
+        """
+        Test that sleeping advances only virtual time
+
+        :return: None
+        """
+        loop = simulation.SimulationLoop()
+        try:
+            loop.run_until_complete(asyncio.sleep(3600))
+            assert loop.time() == 3600
+        finally:
+            loop.close()
+
+    def test_start_stop_roundtrip(self):
+        """
+        Test that virtual duration of start is equal to the sum of transition times on the path from root to the leaf
+
+        :return: None
+        """
+        simulation.disable_output()
+        result = simulation.simulate(depth=3, children=4)
+        starting = configuration['node']['time']['starting']
+        assert result['nodes'] == 1 + 4 + 16 + 64
+        assert result['state'] == str(model.State.Stopped)
+        assert result['start'] == 4 * starting
+        assert result['stop'] == 0
+
+    def test_error_roundtrip(self):
+        """
+        Test that failing nodes propagate Error state to the root without stopping the tree
+
+        :return: None
+        """
+        simulation.disable_output()
+        result = simulation.simulate(depth=2, children=2, chance_to_fail=1)
+        assert result['state'] == str(model.State.Error)
+        assert result['stop'] == 0
@@ -1,17 +1,48 @@
 import argparse
+import asyncio
+import functools
+import importlib.util
+import struct
 import sys
 import time
+import weakref
 
-import yaml
 import json
 import os
 
 from google.protobuf.json_format import MessageToDict
+from google.protobuf.message import DecodeError
 
+import envelope as env
 import envelope_pb2
+import envelope_v2_pb2
+import records
 from errors import ValidationError
 
 
+def lazy_import(name: str):
+    """
+    Import module when its attribute is accessed for the first time, so node process imports only modules of the
+    selected architecture (e.g. MOM node never imports FastAPI and REST node never imports aioamqp)
+
+    :param name: module name
+    :return: module (loaded later if it was not imported yet)
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# only the process without inherited configuration parses configuration.yaml
+yaml = lazy_import('yaml')
+
+
 def check_address(address: str) -> str:
     """
     Validate whether address is in correct format, otherwise throw an error.
@@ -30,17 +61,114 @@ def check_address(address: str) -> str:
     return address
 
 
-def compute_hierarchy_level(port: str) -> int:
+def check_node_id(node_id: str) -> str:
     """
-    Computes hierarchical node level based on given parent port number. In case of NONE value it return 0 (root node)
+    Validate whether node id is dot separated path of positive integers, otherwise throw an error.
 
-    :param port: port number represented by string
+    :param node_id: string in format 2.1.3
+    :return: unmodified node id
+    """
+    if not all(number.isdigit() and int(number) > 0 for number in node_id.split('.')):
+        raise argparse.ArgumentTypeError("%s is not valid node id" % node_id)
+    return node_id
+
+
+def compute_hierarchy_level(node_id: str) -> int:
+    """
+    Computes hierarchical node level based on given node id.
+
+    :param node_id: dot separated path from the root e.g. 2.1.3
     :return: integer number representing level from top to bottom where root is 0
     """
-    if '0' in port:
-        return port.index('0') - 1
-    else:
-        return 4
+    return node_id.count('.')
+
+
+def get_parent_id(node_id: str) -> str | None:
+    """
+    Computes id of the parent node by removing the last element of the path
+
+    :param node_id: dot separated path from the root e.g. 2.1.3
+    :return: parent node id or None in case of the root node
+    """
+    parent_id = node_id.rpartition('.')[0]
+    return parent_id if parent_id else None
+
+
+def get_child_id(node_id: str, child_number: int) -> str:
+    """
+    Computes id of the child node by appending its order to the path
+
+    :param node_id: dot separated path from the root e.g. 2.1
+    :param child_number: order of the child starting from 1
+    :return: child node id
+    """
+    return node_id + '.' + str(child_number)
+
+
+def get_node_id(key: str) -> str:
+    """
+    Convert port or routing key from the original fixed 5 digits addressing (21000 or 2.1.0.0.0) into node id (2.1),
+    node id is returned unchanged
+
+    :param key: port, routing key or node id
+    :return: node id
+    """
+    if '.' not in key:
+        key = '.'.join(key)
+    while key.endswith('.0'):
+        key = key[:-2]
+    return key
+
+
+# enum values of the envelope v2 by the name and vice versa
+V2_STATES: dict[str, int] = dict(envelope_v2_pb2.State.items())
+V2_STATE_NAMES: dict[int, str] = {value: name for name, value in V2_STATES.items()}
+# names of all node states (same as model.State)
+STATE_NAMES: frozenset[str] = frozenset(V2_STATES)
+
+
+def get_id_path(node_id: str) -> list[int]:
+    """
+    Convert node id into list of integers used by the binary envelope v2
+
+    :param node_id: dot separated path from the root e.g. 2.1
+    :return: path from the root e.g. [2, 1]
+    """
+    return [int(number) for number in node_id.split('.')] if node_id else []
+
+
+def get_path_id(path) -> str:
+    """
+    Convert list of integers used by the binary envelope v2 into node id
+
+    :param path: path from the root e.g. [2, 1]
+    :return: dot separated path from the root e.g. 2.1
+    """
+    return '.'.join(map(str, path))
+
+
+def get_envelope_version(message) -> int:
+    """
+    Recognise version of received binary envelope, the first field of v2 is the version number (varint) while the first
+    field of v1 is the color string
+
+    :param message: received envelope
+    :return: 2 for the envelope v2, otherwise 1
+    """
+    if configuration['rabbitmq']['envelope_format'] == 'proto' and message[:1] == b'\x08':
+        return 2
+    return 1
+
+
+def is_envelope_v2(version: int | None = None) -> bool:
+    """
+    Check whether the binary envelope v2 should be produced
+
+    :param version: requested version, rabbitmq.envelope_version by default
+    :return: True if envelope v2 is used
+    """
+    return configuration['rabbitmq']['envelope_format'] == 'proto' and \
+        (version or configuration['rabbitmq']['envelope_version']) == 2
 
 
 def get_configuration_full_path() -> str:
@@ -52,9 +180,27 @@ def get_configuration_full_path() -> str:
     return os.path.join(dir_path, "configuration.yaml")
 
 
-def get_configuration() -> dict[str, str | dict[str, str | dict]]:
+# environment variable with configuration (and its overrides) inherited by all child processes
+CONFIGURATION_VARIABLE = 'SIMULATION_CONFIGURATION'
+# configuration of this process loaded only once, modules get their own copy
+loaded_configuration: dict[str, str | dict[str, str | dict]] | None = None
+# values set by set_configuration as (path, value), they survive reload of configuration.yaml
+configuration_overrides: list[tuple[list, str | bool | int]] = []
+
+
+class Configuration(dict):
+    """
+    Copy of the configuration owned by one module, plain dictionary cannot be weakly referenced
     """
-    Load all values from configuration.yaml into dictionary
+
+
+# copies of the configuration by their id, updated in place by reload and dropped once their owner releases them
+configuration_copies: weakref.WeakValueDictionary[int, Configuration] = weakref.WeakValueDictionary()
+
+
+def read_configuration_file() -> dict[str, str | dict[str, str | dict]]:
+    """
+    Parse all values from configuration.yaml into dictionary
 
     :return: dictionary of configuration vales
     """
@@ -66,132 +212,394 @@ def get_configuration() -> dict[str, str | dict[str, str | dict]]:
             print(exc)
 
 
-def get_bounding_key(port: str) -> str:
+def load_configuration() -> dict[str, str | dict[str, str | dict]]:
+    """
+    Load configuration once per process, from the environment inherited from the parent process if present, otherwise
+    from configuration.yaml which is then exported to the environment for all child processes
+
+    :return: dictionary of configuration vales
+    """
+    global loaded_configuration
+    if loaded_configuration is None:
+        serialised = os.environ.get(CONFIGURATION_VARIABLE)
+        if serialised:
+            inherited = json.loads(serialised)
+            loaded_configuration = inherited['values']
+            configuration_overrides.extend((path, value) for path, value in inherited['overrides'])
+        else:
+            loaded_configuration = read_configuration_file()
+            export_configuration()
+    return loaded_configuration
+
+
+def export_configuration() -> None:
+    """
+    Store current configuration into the environment, child processes (service.py, os.system) inherit it instead of
+    parsing configuration.yaml
+
+    :return: None
+    """
+    os.environ[CONFIGURATION_VARIABLE] = json.dumps({'values': loaded_configuration,
+                                                     'overrides': configuration_overrides})
+
+
+def get_configuration() -> dict[str, str | dict[str, str | dict]]:
+    """
+    Get copy of the configuration loaded by this process
+
+    Note: configuration.yaml is parsed at most once per process, see load_configuration
+
+    :return: dictionary of configuration vales
+    """
+    copy = Configuration(json.loads(json.dumps(load_configuration())))
+    configuration_copies[id(copy)] = copy
+    return copy
+
+
+def synchronise_configuration(target: dict, source: dict) -> None:
+    """
+    Update configuration dictionary in place to be equal to the source
+
+    :param target: updated configuration
+    :param source: new configuration
+    :return: None
+    """
+    for key in [key for key in target if key not in source]:
+        del target[key]
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            synchronise_configuration(target[key], value)
+        else:
+            target[key] = json.loads(json.dumps(value))
+
+
+def reload_configuration() -> None:
     """
-    Convert port into associated binding key
+    Parse configuration.yaml again, keep values set by set_configuration and update configuration of all modules
 
-    :param port: number in string format
-    :return: string value of binding key if port is not None
+    :return: None
     """
-    if port:
-        return '.'.join(list(port))
+    global loaded_configuration
+    reloaded = read_configuration_file()
+    if reloaded is None:
+        return
+    for path, value in configuration_overrides:
+        set_value(reloaded, path, value)
+    loaded_configuration = reloaded
+    export_configuration()
+    for copy in list(configuration_copies.values()):
+        synchronise_configuration(copy, reloaded)
+    if configuration['debug']:
+        print('Configuration reloaded')
 
 
-def get_port(bounding_key: str) -> str:
+async def watch_configuration() -> None:
     """
-    Convert binding key into associated port
+    Hot reload - check modification of configuration.yaml every `reload` seconds and reload it when it is changed
 
-    :param bounding_key: string value of binding key
-    :return: number in string format
+    :return: None
     """
-    if bounding_key:
-        return ''.join(bounding_key.split('.'))
-    return ''
+    modified = os.stat(get_configuration_full_path()).st_mtime
+    while True:
+        await asyncio.sleep(configuration['reload'])
+        current = os.stat(get_configuration_full_path()).st_mtime
+        if current != modified:
+            modified = current
+            reload_configuration()
 
 
 configuration = get_configuration()
+# event loop used by this process, set by use_event_loop()
+event_loop: str = 'asyncio'
+
+
+def use_event_loop() -> str:
+    """
+    Select event loop of the process based on `loop` in configuration.yaml, uvloop falls back to the standard asyncio
+    loop when it is not installed. Must be called before the loop of the process is created.
+
+    :return: name of the loop that is used (asyncio or uvloop)
+    """
+    global event_loop
+    event_loop = 'asyncio'
+    asyncio.set_event_loop_policy(None)
+    if configuration['loop'] == 'uvloop':
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            event_loop = 'uvloop'
+        except ImportError:
+            print('uvloop is not installed, standard asyncio loop is used', file=sys.stderr)
+    return event_loop
+
+
+def get_http_parser() -> str:
+    """
+    HTTP parser of uvicorn server, httptools is used together with uvloop if it is installed
+
+    :return: httptools or h11
+    """
+    if event_loop == 'uvloop' and importlib.util.find_spec('httptools'):
+        return 'httptools'
+    return 'h11'
 
 
 def get_red_envelope(transitioned_state: str, sender: str = '') -> str:
     """
     Produce json format necessary for notification about the state change in the children node.
 
+    Note: envelope is serialised once per state and sender, only the time stamp (the last field) is appended
+
     :param transitioned_state: new current state of the child node
     :param sender: origin node id as bind key
     :return: string representation of red envelope
     """
-    envelope_format = configuration['rabbitmq']['envelope_format']
+    prefix, time_format = get_red_template(transitioned_state, sender, configuration['rabbitmq']['envelope_format'],
+                                           configuration['rabbitmq']['envelope_version'])
+    if time_format:
+        return prefix + struct.pack(time_format, time.time())
+    return prefix + repr(time.time()) + '}'
+
+
+@functools.lru_cache(maxsize=1024)
+def get_red_template(transitioned_state: str, sender: str, envelope_format: str, version: int) -> tuple:
+    """
+    Serialise red envelope with zero time stamp and cut the time stamp off, it is the last field of the envelope
+
+    :param transitioned_state: new current state of the child node
+    :param sender: origin node id as bind key
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: envelope without time stamp and struct format of the time stamp (None for json)
+    """
+    envelope = encode_red_envelope(transitioned_state, sender, 0.0, envelope_format, version)
+    if envelope_format == 'json':
+        return envelope[:-len('0.0}')], None
+    time_format = '<d' if version == 2 else '<f'
+    return envelope[:-struct.calcsize(time_format)], time_format
+
+
+def encode_red_envelope(transitioned_state: str, sender: str, time_stamp: float, envelope_format: str,
+                        version: int) -> str:
+    """
+    Serialise red envelope
+
+    :param transitioned_state: new current state of the child node
+    :param sender: origin node id as bind key
+    :param time_stamp: when was notification issued
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: string representation of red envelope
+    """
     if envelope_format == 'json':
         envelope = {'color': 'red', 'type': 'Notification', 'sender': sender, 'toState': transitioned_state,
-                    'time_stamp': time.time()}
+                    'time_stamp': time_stamp}
         return json.dumps(envelope)
-    elif envelope_format == 'proto':
-        envelope = envelope_pb2.Rainbow()
-        envelope.color = 'red'
-        envelope.red.type = 'Notification'
-        envelope.red.sender = sender
-        envelope.red.toState = transitioned_state
-        envelope.red.time_stamp = time.time()
+    elif version == 2:
+        envelope = envelope_v2_pb2.Rainbow(version=2)
+        envelope.red.toState = V2_STATES[transitioned_state.split('.')[-1]]
+        envelope.red.sender.extend(get_id_path(get_node_id(sender)))
+        envelope.red.time_stamp = time_stamp
+        return envelope.SerializeToString()
+    envelope = envelope_pb2.Rainbow()
+    envelope.color = 'red'
+    envelope.red.type = 'Notification'
+    envelope.red.sender = sender
+    envelope.red.toState = transitioned_state
+    envelope.red.time_stamp = time_stamp
+    return envelope.SerializeToString()
+
+
+def get_purple_envelope(notifications: list[records.Notification]) -> str:
+    """
+    Produce envelope carrying notifications of several children to the same parent at once
+
+    :param notifications: current state, sender id and time stamp of every child
+    :return: string representation of purple envelope
+    """
+    return encode_purple_envelope(notifications, configuration['rabbitmq']['envelope_format'],
+                                  configuration['rabbitmq']['envelope_version'])
+
+
+def encode_purple_envelope(notifications: list[records.Notification], envelope_format: str, version: int) -> str:
+    """
+    Serialise purple envelope - list of red envelopes without color
 
+    :param notifications: current state, sender id and time stamp of every child
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: string representation of purple envelope
+    """
+    if envelope_format == 'json':
+        envelope = {'color': 'purple',
+                    'red': [{'type': 'Notification', 'sender': notification.sender,
+                             'toState': notification.state.split('.')[-1], 'time_stamp': notification.time_stamp}
+                            for notification in notifications]}
+        return json.dumps(envelope)
+    elif version == 2:
+        envelope = envelope_v2_pb2.Rainbow(version=2)
+        envelope.purple.SetInParent()
+        for notification in notifications:
+            envelope.purple.red.add(toState=V2_STATES[notification.state.split('.')[-1]],
+                                    sender=get_id_path(get_node_id(notification.sender)),
+                                    time_stamp=notification.time_stamp)
         return envelope.SerializeToString()
+    envelope = envelope_pb2.Rainbow()
+    envelope.color = 'purple'
+    envelope.purple.SetInParent()
+    for notification in notifications:
+        envelope.purple.red.add(type='Notification', sender=notification.sender,
+                                toState=notification.state.split('.')[-1], time_stamp=notification.time_stamp)
+    return envelope.SerializeToString()
 
 
 def get_orange_envelope(state: str, chance_to_fail: float = 0) -> str:
     """
     Produce json format necessary for changing state selected node.
 
+    Note: envelope is serialised once per state and chance to fail and shared by all children
+
     :param state: requested new state
     :param chance_to_fail: chance to end up in Error state
     :return: string representation of orange envelope
     """
-    envelope_format = configuration['rabbitmq']['envelope_format']
+    return encode_orange_envelope(state, chance_to_fail, configuration['rabbitmq']['envelope_format'],
+                                  configuration['rabbitmq']['envelope_version'])
+
+
+@functools.lru_cache(maxsize=1024)
+def encode_orange_envelope(state: str, chance_to_fail: float, envelope_format: str, version: int) -> str:
+    """
+    Serialise orange envelope, the result is cached
+
+    :param state: requested new state
+    :param chance_to_fail: chance to end up in Error state
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: string representation of orange envelope
+    """
     if envelope_format == 'json':
         envelope = {'color': 'orange', 'type': 'Input', 'name': state, 'parameters': {'chance_to_fail': chance_to_fail}}
         return json.dumps(envelope)
-    elif envelope_format == 'proto':
-        envelope = envelope_pb2.Rainbow()
-        envelope.color = 'orange'
-        envelope.orange.type = 'Input'
-        envelope.orange.name = state
-        envelope.orange.parameters.chance_to_fail = chance_to_fail
+    elif version == 2:
+        envelope = envelope_v2_pb2.Rainbow(version=2)
+        envelope.orange.name = V2_STATES[state.split('.')[-1]]
+        envelope.orange.chance_to_fail = chance_to_fail
         return envelope.SerializeToString()
+    envelope = envelope_pb2.Rainbow()
+    envelope.color = 'orange'
+    envelope.orange.type = 'Input'
+    envelope.orange.name = state
+    envelope.orange.parameters.chance_to_fail = chance_to_fail
+    return envelope.SerializeToString()
 
 
-def get_blue_envelope(current_state: str) -> str:
+def get_blue_envelope(current_state: str, states: dict[str, str] | None = None, version: int | None = None) -> str:
     """
     Produce json format for replying from rpc server.
 
+    Note: envelope without states is serialised once per state
+
     :param current_state: node current state
+    :param states: state of every node of the subtree (reply to get_snapshot)
+    :param version: binary envelope version of the request, rabbitmq.envelope_version by default
     :return: string representation of blue envelope
     """
     envelope_format = configuration['rabbitmq']['envelope_format']
+    version = version or configuration['rabbitmq']['envelope_version']
+    if states:
+        return encode_blue_envelope(current_state, envelope_format, version, states)
+    return encode_state_envelope(current_state, envelope_format, version)
+
+
+@functools.lru_cache(maxsize=None)
+def encode_state_envelope(current_state: str, envelope_format: str, version: int) -> str:
+    """
+    Serialise blue envelope without states of the subtree, the result is cached
+
+    :param current_state: node current state
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: string representation of blue envelope
+    """
+    return encode_blue_envelope(current_state, envelope_format, version)
+
+
+def encode_blue_envelope(current_state: str, envelope_format: str, version: int,
+                         states: dict[str, str] | None = None) -> str:
+    """
+    Serialise blue envelope
+
+    :param current_state: node current state
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :param states: state of every node of the subtree (reply to get_snapshot)
+    :return: string representation of blue envelope
+    """
     if envelope_format == 'json':
         envelope = {'color': 'blue', 'state': current_state}
+        if states:
+            envelope['states'] = states
         return json.dumps(envelope)
-    elif envelope_format == 'proto':
-        envelope = envelope_pb2.Rainbow()
-        envelope.color = 'blue'
-        envelope.blue.state = current_state
+    elif version == 2:
+        envelope = envelope_v2_pb2.Rainbow(version=2)
+        envelope.blue.state = V2_STATES[current_state.split('.')[-1]]
+        for node_id, state in (states or {}).items():
+            envelope.blue.states.add(id=get_id_path(node_id), state=V2_STATES[state])
         return envelope.SerializeToString()
+    envelope = envelope_pb2.Rainbow()
+    envelope.color = 'blue'
+    envelope.blue.state = current_state
+    if states:
+        envelope.blue.states.update(states)
+    return envelope.SerializeToString()
 
 
 def get_white_envelope(requested_action: str = 'get_state') -> str:
     """
     Produce json format for requesting state from rpc server.
 
-    Note: currently the only supported operation is get_state
+    Note: supported operations are get_state and get_snapshot (states of the whole subtree), envelope is serialised
+    once per action
 
     :param requested_action: type of request
     :return: string representation of white envelope
     """
-    envelope_format = configuration['rabbitmq']['envelope_format']
+    return encode_white_envelope(requested_action, configuration['rabbitmq']['envelope_format'],
+                                 configuration['rabbitmq']['envelope_version'])
+
+
+@functools.lru_cache(maxsize=None)
+def encode_white_envelope(requested_action: str, envelope_format: str, version: int) -> str:
+    """
+    Serialise white envelope, the result is cached
+
+    :param requested_action: type of request
+    :param envelope_format: json or proto
+    :param version: binary envelope version
+    :return: string representation of white envelope
+    """
     if envelope_format == 'json':
         envelope = {'color': 'white', 'action': requested_action}
         return json.dumps(envelope)
-    elif envelope_format == 'proto':
-        envelope = envelope_pb2.Rainbow()
-        envelope.color = 'white'
-        envelope.white.action = requested_action
+    elif version == 2:
+        envelope = envelope_v2_pb2.Rainbow(version=2)
+        envelope.white.action = envelope_v2_pb2.Action.Value(requested_action)
         return envelope.SerializeToString()
+    envelope = envelope_pb2.Rainbow()
+    envelope.color = 'white'
+    envelope.white.action = requested_action
+    return envelope.SerializeToString()
 
 
 def set_architecture(architecture: str) -> str:
     """
-    Edit selected architecture in configuration file
+    Edit selected architecture in configuration of this process and its child processes
 
     :param architecture: newly selected architecture
     :return: original architecture
     """
-    with open(get_configuration_full_path()) as f:
-        list_doc = yaml.safe_load(f)
-
-    original_architecture = list_doc['architecture']
-    if original_architecture != architecture:
-        list_doc['architecture'] = architecture
-        with open(get_configuration_full_path(), "w") as f:
-            yaml.dump(list_doc, f)
-
-    return original_architecture
+    return set_configuration(architecture, ['architecture'])
 
 
 def set_message_format(new_format: str) -> str:
@@ -205,30 +613,37 @@ def set_message_format(new_format: str) -> str:
     return set_configuration(new_format, ['rabbitmq', 'envelope_format'])
 
 
-def set_configuration(new_value: str | bool | int, path: list) -> str | int:
+def set_value(values: dict, path: list, new_value: str | bool | int) -> str | int:
     """
-    Edit selected value in configuration file
+    Edit selected value in configuration dictionary
 
+    :param values: configuration dictionary
     :param path: path to get the selected value
     :param new_value: newly selected value
     :return: original value
     """
-    with open(get_configuration_full_path()) as f:
-        list_doc = yaml.safe_load(f)
+    reference = values
+    for key in path[:-1]:
+        reference = reference[key]
+    original_value = reference[path[-1]]
+    reference[path[-1]] = new_value
+    return original_value
 
-    reference = list_doc
-    original_value = ''
 
-    for i in range(len(path)):
-        if i < len(path) - 1:
-            reference = reference[path[i]]
-        else:
-            original_value = reference[path[i]]
-    if original_value != new_value:
-        reference[path[-1]] = new_value
-        with open(get_configuration_full_path(), "w") as f:
-            yaml.dump(list_doc, f)
+def set_configuration(new_value: str | bool | int, path: list) -> str | int:
+    """
+    Edit selected value in configuration of this process (returned by following get_configuration calls) and of all
+    child processes started afterwards, configuration.yaml is not modified
 
+    :param path: path to get the selected value
+    :param new_value: newly selected value
+    :return: original value
+    """
+    load_configuration()
+    original_value = set_value(loaded_configuration, path, new_value)
+    configuration_overrides[:] = [override for override in configuration_overrides if override[0] != path]
+    configuration_overrides.append((path, new_value))
+    export_configuration()
     return original_value
 
 
@@ -240,16 +655,7 @@ def set_time(time: str, value: int) -> int:
     :param time: specifier
     :return: original value
     """
-    with open(get_configuration_full_path()) as f:
-        list_doc = yaml.safe_load(f)
-
-    original_value = list_doc['node']['time'][time]
-    if original_value != value:
-        list_doc['node']['time'][time] = value
-        with open(get_configuration_full_path(), "w") as f:
-            yaml.dump(list_doc, f)
-
-    return original_value
+    return set_configuration(value, ['node', 'time', time])
 
 
 def get_dict_from_envelope(message: str, accepted_types: list = ['white', 'blue', 'red', 'orange']) -> dict:
@@ -260,10 +666,10 @@ def get_dict_from_envelope(message: str, accepted_types: list = ['white', 'blue'
     :param message: data to convert
     :return: dictionary with key = envelope attribute and its value
     """
-    import envelope as env
-
     if configuration['rabbitmq']['envelope_format'] == 'json':
         return json.loads(message)
+    if get_envelope_version(message) == 2:
+        return get_dict_from_envelope_v2(message, accepted_types)
     envelope = envelope_pb2.Rainbow()
     envelope.ParseFromString(message)
 
@@ -278,6 +684,8 @@ def get_dict_from_envelope(message: str, accepted_types: list = ['white', 'blue'
         data = envelope.red
     elif envelope.color == 'blue':
         data = envelope.blue
+    elif envelope.color == 'purple':
+        data = envelope.purple
     else:
         raise ValidationError('Unsupported envelope type arrived')
     if configuration['rabbitmq']['validation']:
@@ -286,6 +694,146 @@ def get_dict_from_envelope(message: str, accepted_types: list = ['white', 'blue'
     return MessageToDict(data, preserving_proto_field_name=True)
 
 
+def get_dict_from_envelope_v2(message: bytes, accepted_types: list[str]) -> dict:
+    """
+    Convert binary envelope v2 to the same dictionary as the envelope v1 produces
+
+    :param message: data to convert
+    :param accepted_types: which envelope type can be accepted
+    :return: dictionary with key = envelope attribute and its value
+    """
+    envelope = envelope_v2_pb2.Rainbow()
+    envelope.ParseFromString(message)
+    color = envelope.WhichOneof('data')
+    if color not in accepted_types:
+        raise ValidationError('Unexpected envelope type arrived')
+    data = getattr(envelope, color)
+    if configuration['rabbitmq']['validation']:
+        env.validator_v2(data, color)
+
+    if color == 'white':
+        return {'action': envelope_v2_pb2.Action.Name(data.action)}
+    elif color == 'blue':
+        result = {'state': V2_STATE_NAMES[data.state]}
+        if data.states:
+            result['states'] = {get_path_id(node.id): V2_STATE_NAMES[node.state] for node in data.states}
+        return result
+    elif color == 'red':
+        return get_red_dict_v2(data)
+    elif color == 'purple':
+        return {'red': [get_red_dict_v2(red) for red in data.red]}
+    return {'type': 'Input', 'name': V2_STATE_NAMES[data.name], 'parameters': {'chance_to_fail': data.chance_to_fail}}
+
+
+def get_red_dict_v2(data: envelope_v2_pb2.Red) -> dict:
+    """
+    Convert red envelope v2 to the same dictionary as the red envelope v1 produces
+
+    :param data: red envelope
+    :return: dictionary with key = envelope attribute and its value
+    """
+    return {'type': 'Notification', 'sender': get_path_id(data.sender), 'toState': V2_STATE_NAMES[data.toState],
+            'time_stamp': data.time_stamp}
+
+
+def get_record_from_envelope(message, accepted_types: list[str]):
+    """
+    Decode envelope directly into the record of its type, fields of the parsed message are validated and read in one
+    pass without conversion to dictionary
+
+    :param message: data to convert
+    :param accepted_types: which envelope type can be accepted
+    :return: Notification (red), Notifications (purple), Input (orange), Request (white) or Reply (blue) record
+    """
+    if configuration['rabbitmq']['envelope_format'] == 'json':
+        data = json.loads(message)
+        color = data.get('color')
+        if color not in accepted_types:
+            raise ValidationError('Unexpected envelope type arrived')
+        if color == 'red':
+            return records.Notification(data['toState'].split('.')[-1], get_node_id(data['sender']),
+                                        data['time_stamp'])
+        elif color == 'purple':
+            return records.Notifications([records.Notification(red['toState'].split('.')[-1],
+                                                               get_node_id(red['sender']), red['time_stamp'])
+                                          for red in data['red']])
+        elif color == 'orange':
+            return records.Input(data['name'], data['parameters']['chance_to_fail'])
+        elif color == 'white':
+            return records.Request(data['action'])
+        return records.Reply(data['state'], data.get('states'))
+
+    if get_envelope_version(message) == 2:
+        envelope = envelope_v2_pb2.Rainbow()
+        envelope.ParseFromString(message)
+        color = envelope.WhichOneof('data')
+        if color not in accepted_types:
+            raise ValidationError('Unexpected envelope type arrived')
+        data = getattr(envelope, color)
+        if configuration['rabbitmq']['validation']:
+            env.validator_v2(data, color)
+        if color == 'red':
+            return records.Notification(V2_STATE_NAMES[data.toState], get_path_id(data.sender), data.time_stamp)
+        elif color == 'purple':
+            return records.Notifications([records.Notification(V2_STATE_NAMES[red.toState], get_path_id(red.sender),
+                                                               red.time_stamp) for red in data.red])
+        elif color == 'orange':
+            return records.Input(V2_STATE_NAMES[data.name], data.chance_to_fail)
+        elif color == 'white':
+            return records.Request(envelope_v2_pb2.Action.Name(data.action))
+        states = {get_path_id(node.id): V2_STATE_NAMES[node.state] for node in data.states}
+        return records.Reply(V2_STATE_NAMES[data.state], states or None)
+
+    envelope = envelope_pb2.Rainbow()
+    envelope.ParseFromString(message)
+    color = envelope.color
+    if color not in accepted_types:
+        raise ValidationError('Unexpected envelope type arrived')
+    data = getattr(envelope, color)
+    if configuration['rabbitmq']['validation']:
+        env.validator(data, color)
+    if color == 'red':
+        return records.Notification(data.toState.split('.')[-1], get_node_id(data.sender), data.time_stamp)
+    elif color == 'purple':
+        return records.Notifications([records.Notification(red.toState.split('.')[-1], get_node_id(red.sender),
+                                                           red.time_stamp) for red in data.red])
+    elif color == 'orange':
+        return records.Input(data.name, data.parameters.chance_to_fail)
+    elif color == 'white':
+        return records.Request(data.action)
+    return records.Reply(data.state, dict(data.states) or None)
+
+
+def decode_record(message, accepted_types: list[str]):
+    """
+    Decode received envelope into the record of its type, invalid or undecodable envelopes are reported and ignored
+
+    :param message: received envelope
+    :param accepted_types: which envelope type can be accepted
+    :return: record of the envelope or None if the envelope cannot be processed
+    """
+    try:
+        return exception_filter(lambda: get_record_from_envelope(message, accepted_types))
+    except (DecodeError, ValueError, KeyError) as e:
+        print('Undecodable message: ' + str(e), file=sys.stderr)
+        return None
+
+
+def decode_envelope(message, accepted_types: list[str]) -> dict | None:
+    """
+    Convert received envelope to dictionary, invalid or undecodable envelopes are reported and ignored
+
+    :param message: received envelope
+    :param accepted_types: which envelope type can be accepted
+    :return: dictionary with key = envelope attribute and its value or None if the envelope cannot be processed
+    """
+    try:
+        return exception_filter(lambda: get_dict_from_envelope(message, accepted_types))
+    except (DecodeError, ValueError) as e:
+        print('Undecodable message: ' + str(e), file=sys.stderr)
+        return None
+
+
 def exception_filter(func):
     """
     Execute function and print Validation Error in case it occurs